@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+@register()
+def pdf_fonts_check(app_configs, **kwargs):
+    """The Noto TTFs for non-Latin report text must be in PDF_FONT_DIR."""
+    # Imported here so the URLconf does not pull in ReportLab.
+    from content.pdf_fonts import missing_regular_fonts
+
+    missing = missing_regular_fonts()
+    if not missing:
+        return []
+    level = Error if settings.PDF_FONTS_REQUIRED else Warning
+    return [
+        level(
+            f"{len(missing)} PDF font(s) missing from {settings.PDF_FONT_DIR}: "
+            f"{', '.join(path.name for path in missing)}. Non-Latin red flags would print in Helvetica.",
+            hint="Run `python manage.py fetch_pdf_fonts`, or set PDF_FONT_DIR to a directory with the Noto Sans TTFs.",
+            id="content.E001" if level is Error else "content.W001",
+        )
+    ]
+
+
+@register()
+def report_templates_check(app_configs, **kwargs):
+    """LEGACY_REPORT_RENDERER=template needs explicit paths to blank report PDFs."""
+    if getattr(settings, "LEGACY_REPORT_RENDERER", "canvas") != "template":
+        return []
+    from content.pdf_utils import report_template_problems
+
+    return [
+        Warning(
+            f"LEGACY_REPORT_RENDERER=template cannot run: {problem}. Reports use the canvas renderer.",
+            hint="Set PATIENT_REPORT_TEMPLATE_PATH and DOCTOR_REPORT_TEMPLATE_PATH to blank report PDFs, "
+                 "or unset LEGACY_REPORT_RENDERER.",
+            id="content.W002",
+        )
+        for problem in report_template_problems()
+    ]
@@ -0,0 +1,277 @@
+# content/education.py
+"""
+Doctor education pages: markdown compiled to sanitized HTML, and a per-slug cache.
+
+DoctorEducation.education_markdown comes from the ingest sheet and used to be
+printed with |safe. compile_education() turns it into HTML once, at ingest:
+
+* A small markdown subset: # headings (rendered as h4-h6 under the page's
+  red-flag title), - / * / 1. lists, --- rules, **bold**, *italic*, `code`
+  and [text](url) links. Lines inside a paragraph keep their line breaks, as
+  sheet cells are written that way. Lines starting with "<" pass through as
+  HTML, since authors relied on |safe.
+* The result always goes through an allowlist sanitizer (stdlib HTMLParser):
+  unknown tags are dropped, script/style/iframe are dropped with their
+  content, only a few attributes survive, and links must be relative or
+  http(s)/mailto/tel.
+
+page_entry(slug, lang) returns what the view needs, including an ETag and
+Last-Modified, from the default cache (EDUCATION_PAGE_CACHE_SECONDS). Content
+in the requested language is preferred, with English as the fallback.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DoctorEducation, Language, RedFlagI18n
+
+FALLBACK_LANG = "en"
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "div", "em", "h2", "h3", "h4", "h5", "h6", "hr", "i", "li", "ol",
+    "p", "pre", "small", "span", "strong", "sub", "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr"}
+# Dropped together with everything inside them.
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "textarea", "title", "svg", "math"}
+ALLOWED_ATTRS = {
+    "a": {"href", "title"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
+URL_SCHEME_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):")
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+BULLET_RE = re.compile(r"^[-*+]\s+(.*)$")
+NUMBERED_RE = re.compile(r"^\d+[.)]\s+(.*)$")
+RULE_RE = re.compile(r"^(?:-{3,}|\*{3,}|_{3,})$")
+LINK_RE = re.compile(r'\[([^\]]+)\]\(\s*([^)\s]+)(?:\s+"([^"]*)")?\s*\)')
+BOLD_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__")
+ITALIC_RE = re.compile(r"(?<![*\w])\*(?=\S)(.+?)(?<=\S)\*(?![*\w])")
+
+
+def _safe_url(value: str) -> bool:
+    compact = re.sub(r"[\x00-\x20]+", "", value or "")
+    match = URL_SCHEME_RE.match(compact)
+    return not match or match.group(1).lower() in SAFE_URL_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: list[str] = []
+        self.open_tags: list[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        kept = []
+        external = False
+        for name, value in attrs:
+            if value is None or name not in ALLOWED_ATTRS.get(tag, ()):
+                continue
+            if name == "href":
+                if not _safe_url(value):
+                    continue
+                external = bool(URL_SCHEME_RE.match(value.strip()))
+            kept.append(f' {name}="{escape(value)}"')
+        if external:
+            kept.append(' target="_blank" rel="noopener noreferrer"')
+        self.out.append(f"<{tag}{''.join(kept)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            closed = self.open_tags.pop()
+            self.out.append(f"</{closed}>")
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        while self.open_tags:
+            self.out.append(f"</{self.open_tags.pop()}>")
+        return "".join(self.out)
+
+
+def sanitize_html(html: str) -> str:
+    sanitizer = _Sanitizer()
+    sanitizer.feed(html or "")
+    return sanitizer.result()
+
+
+def _inline(text: str) -> str:
+    # Odd-numbered pieces are code spans; markup inside them is shown literally.
+    pieces = text.split("`")
+    if len(pieces) % 2 == 0:
+        pieces[-2] += "`" + pieces.pop()
+    out = []
+    for idx, piece in enumerate(pieces):
+        if idx % 2:
+            out.append(f"<code>{escape(piece)}</code>")
+            continue
+        piece = LINK_RE.sub(
+            lambda m: f'<a href="{escape(m.group(2))}"'
+                      + (f' title="{escape(m.group(3))}"' if m.group(3) else "")
+                      + f">{m.group(1)}</a>",
+            piece,
+        )
+        piece = BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", piece)
+        piece = ITALIC_RE.sub(r"<em>\1</em>", piece)
+        out.append(piece)
+    return "".join(out)
+
+
+def markdown_to_html(text: str) -> str:
+    blocks: list[str] = []
+    paragraph: list[str] = []
+    list_tag = ""
+    items: list[str] = []
+
+    def flush():
+        nonlocal list_tag
+        if paragraph:
+            blocks.append("<p>" + "<br>\n".join(_inline(line) for line in paragraph) + "</p>")
+            paragraph.clear()
+        if items:
+            blocks.append(f"<{list_tag}>" + "".join(f"<li>{item}</li>" for item in items) + f"</{list_tag}>")
+            items.clear()
+        list_tag = ""
+
+    for raw in (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = raw.strip()
+        if not line:
+            flush()
+            continue
+        if line.startswith("<"):
+            flush()
+            blocks.append(line)
+            continue
+        if RULE_RE.match(line):
+            flush()
+            blocks.append("<hr>")
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            flush()
+            level = min(len(heading.group(1)) + 3, 6)
+            blocks.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+            continue
+        bullet = BULLET_RE.match(line)
+        numbered = None if bullet else NUMBERED_RE.match(line)
+        if bullet or numbered:
+            tag = "ul" if bullet else "ol"
+            if paragraph or (list_tag and list_tag != tag):
+                flush()
+            list_tag = tag
+            items.append(_inline((bullet or numbered).group(1)))
+            continue
+        if items:
+            flush()
+        paragraph.append(line)
+    flush()
+    return "\n".join(blocks)
+
+
+def compile_education(markdown: str) -> str:
+    return sanitize_html(markdown_to_html(markdown))
+
+
+def _cache_key(slug: str, lang: str) -> str:
+    return f"education_page:{slug}:{lang}"
+
+
+def invalidate_slugs(slugs):
+    codes = list(Language.objects.values_list("lang_code", flat=True))
+    cache.delete_many([_cache_key(slug, code) for slug in set(slugs) for code in codes])
+
+
+def compile_all() -> int:
+    """Recompile every DoctorEducation row; returns how many changed. Cached pages for those slugs are dropped on commit."""
+    now = timezone.now()
+    changed = []
+    for row in DoctorEducation.objects.select_related("red_flag"):
+        html = compile_education(row.education_markdown)
+        if html != row.education_html or row.html_compiled_at is None:
+            row.education_html = html
+            row.html_compiled_at = now
+            changed.append(row)
+    DoctorEducation.objects.bulk_update(changed, ["education_html", "html_compiled_at"], batch_size=200)
+    slugs = [row.red_flag.education_url_slug for row in changed]
+    if slugs:
+        transaction.on_commit(lambda: invalidate_slugs(slugs))
+    return len(changed)
+
+
+def _load_entry(slug: str, lang: str) -> dict | None:
+    rows = {
+        row.lang_id: row
+        for row in DoctorEducation.objects.select_related("red_flag").filter(
+            red_flag__education_url_slug=slug, lang_id__in={lang, FALLBACK_LANG}
+        )
+    }
+    de = rows.get(lang) or rows.get(FALLBACK_LANG)
+    if de is None:
+        return None
+    if de.html_compiled_at is None:
+        # Rows ingested before compilation existed; compile once on first view.
+        de.education_html = compile_education(de.education_markdown)
+        de.html_compiled_at = timezone.now()
+        de.save(update_fields=["education_html", "html_compiled_at"])
+
+    labels = dict(
+        RedFlagI18n.objects.filter(red_flag_id=de.red_flag_id, lang_id__in={de.lang_id, FALLBACK_LANG})
+        .values_list("lang_id", "parent_label")
+    )
+    entry = {
+        "lang": de.lang_id,
+        "title": labels.get(de.lang_id) or labels.get(FALLBACK_LANG) or de.red_flag_id,
+        "html": de.education_html,
+        "reference_1": de.reference_1 or "",
+        "reference_2": de.reference_2 or "",
+        "last_modified": int(de.html_compiled_at.timestamp()),
+    }
+    digest = hashlib.sha256(repr(sorted(entry.items())).encode("utf-8")).hexdigest()
+    entry["etag"] = f'"{digest[:32]}"'
+    return entry
+
+
+def page_entry(slug: str, lang: str) -> dict | None:
+    ttl = getattr(settings, "EDUCATION_PAGE_CACHE_SECONDS", 0)
+    if ttl <= 0:
+        return _load_entry(slug, lang)
+    key = _cache_key(slug, lang)
+    entry = cache.get(key)
+    if entry is None:
+        entry = _load_entry(slug, lang)
+        if entry is not None:
+            cache.set(key, entry, ttl)
+    return entry
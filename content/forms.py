@@ -1,6 +1,8 @@
 import re
 from django import forms
+from django.core.exceptions import ValidationError
 from .models import RegisteredProfessional
+from .profile_photos import normalize_upload
 from .utils import normalize_phone
 from .state_districts import state_choices, district_choices, is_valid_pair
 from paid.pricing import PRICE_CHOICES, PRICE_INR_499
@@ -54,6 +56,12 @@ class PediatricianForm(forms.ModelForm):
         val = self.cleaned_data.get("receptionist_whatsapp")
         return normalize_phone(val) if val else val
 
+    def clean_photo_url(self):
+        try:
+            return normalize_upload(self.cleaned_data.get("photo_url"))
+        except ValidationError as exc:
+            raise forms.ValidationError(exc.messages)
+
     def clean(self):
         data = super().clean()
         if not data.get("receptionist_whatsapp"):
@@ -108,6 +116,12 @@ class CaregiverForm(forms.ModelForm):
         val = self.cleaned_data.get("receptionist_whatsapp")
         return normalize_phone(val) if val else val
 
+    def clean_photo_url(self):
+        try:
+            return normalize_upload(self.cleaned_data.get("photo_url"))
+        except ValidationError as exc:
+            raise forms.ValidationError(exc.messages)
+
     def clean(self):
         data = super().clean()
         if not data.get("receptionist_whatsapp"):
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from content.models import RegisteredProfessional
+from content.profile_photos import ensure_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate avatar/header WebP and JPEG derivatives for professionals' profile photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Professionals loaded per batch")
+        parser.add_argument("--force", action="store_true", help="Re-encode derivatives that already exist")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        pros = RegisteredProfessional.objects.exclude(photo_url="").exclude(photo_url__isnull=True).order_by("pk")
+
+        processed = updated = 0
+        last_pk = 0
+        while True:
+            batch = list(pros.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for pro in batch:
+                updated += ensure_derivatives(pro, force=options["force"])
+            processed += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Checked {processed} professionals (last id {last_pk})")
+
+        missing = sum(
+            1 for pro in pros.only("pk", "photo_url", "photo_derivatives")
+            if (pro.photo_derivatives or {}).get("source") != pro.photo_url.name
+        )
+        self.stdout.write(self.style.SUCCESS(f"Profile photo derivatives updated for {updated} of {processed} professionals."))
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} professionals still use their original photo (file missing or unreadable)."))
@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from content.pdf_fonts import FONT_SOURCE_URL, SCRIPT_FONT_FILES
+
+# sfnt version tags: TrueType outlines, Apple TrueType, CFF (OpenType).
+FONT_MAGIC = (b"\x00\x01\x00\x00", b"true", b"OTTO")
+
+
+class Command(BaseCommand):
+    help = "Download the Noto Sans TTFs used for non-Latin report text into PDF_FONT_DIR"
+    # With PDF_FONTS_REQUIRED (deploy) the fonts check is an error until this command has run.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Download files that already exist")
+        parser.add_argument("--timeout", type=float, default=30, help="Seconds per download")
+
+    def _download(self, filename, dest, timeout):
+        url = FONT_SOURCE_URL.format(family=filename.split("-")[0], filename=filename)
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        if response.content[:4] not in FONT_MAGIC:
+            raise ValueError(f"{url} did not return a font file")
+        partial = dest.with_name(dest.name + ".part")
+        partial.write_bytes(response.content)
+        os.replace(partial, dest)
+        return len(response.content)
+
+    def handle(self, *args, **options):
+        font_dir = Path(settings.PDF_FONT_DIR)
+        font_dir.mkdir(parents=True, exist_ok=True)
+
+        failed_regular = []
+        for regular, bold in SCRIPT_FONT_FILES.values():
+            for filename in (regular, bold):
+                dest = font_dir / filename
+                if dest.is_file() and not options["force"]:
+                    continue
+                try:
+                    size = self._download(filename, dest, options["timeout"])
+                except (requests.RequestException, ValueError) as exc:
+                    self.stderr.write(f"{filename}: {exc}")
+                    if filename == regular:
+                        failed_regular.append(filename)
+                    continue
+                self.stdout.write(f"{filename}: {size / 1024:,.0f} KB")
+
+        if failed_regular:
+            raise CommandError(f"Could not fetch {', '.join(failed_regular)} into {font_dir}.")
+        self.stdout.write(self.style.SUCCESS(f"PDF fonts are in {font_dir}."))
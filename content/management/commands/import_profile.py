@@ -0,0 +1,124 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+FIRST_PARTY = ("content", "paid", "emoscreen")
+# Third-party packages that only some requests need; none of them should load with the URLconf.
+HEAVY_PACKAGES = ("reportlab", "pypdf", "qrcode", "requests", "urllib3", "sendgrid", "pandas", "openpyxl", "PIL")
+
+CHILD_SCRIPT = """
+import importlib, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+print(f"{(time.perf_counter() - started) * 1000:.3f}")
+"""
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Rows of -X importtime output with self/cumulative ms and the importing module."""
+    rows, pending = [], {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        depth = (len(match.group(3)) - 1) // 2
+        row = {
+            "module": match.group(4),
+            "self_ms": int(match.group(1)) / 1000,
+            "cumulative_ms": int(match.group(2)) / 1000,
+            "depth": depth,
+            "parent": None,
+        }
+        # Output is post-order: a module's imports are printed above it, one level deeper.
+        for child in pending.pop(depth + 1, []):
+            child["parent"] = row
+        pending.setdefault(depth, []).append(row)
+        rows.append(row)
+    return rows
+
+
+def importer_chain(row: dict) -> str:
+    """The first-party modules that pulled row in, else the third-party module that did."""
+    ancestors = []
+    node = row["parent"]
+    while node is not None:
+        ancestors.append(node["module"])
+        node = node["parent"]
+    first_party = [name for name in ancestors if name.split(".")[0] in FIRST_PARTY]
+    if first_party:
+        return " <- ".join(first_party[:3])
+    return ancestors[0] if ancestors else "(top level)"
+
+
+def heavy_packages(rows: list[dict]) -> list[tuple[str, float, dict]]:
+    """(package, total self ms across its modules, outermost row) for HEAVY_PACKAGES that were imported."""
+    found = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        if package not in HEAVY_PACKAGES:
+            continue
+        total, outer = found.get(package, (0.0, row))
+        if row["depth"] < outer["depth"]:
+            outer = row
+        found[package] = (total + row["self_ms"], outer)
+    return sorted(((pkg, total, outer) for pkg, (total, outer) in found.items()), key=lambda item: -item[1])
+
+
+class Command(BaseCommand):
+    help = "Profile cold import time (python -X importtime) of the WSGI app and URLconf and list the slowest imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules", nargs="*",
+            help="Modules to import in order (default: emoscreen.wsgi and ROOT_URLCONF, as a worker's first request does)",
+        )
+        parser.add_argument("--top", type=int, default=20, help="How many of the slowest imports to list")
+        parser.add_argument("--repeat", type=int, default=3, help="Cold runs; the median total is reported")
+        parser.add_argument(
+            "--max-ms", type=float, default=settings.IMPORT_TIME_BUDGET_MS,
+            help="Exit with an error when the median cold import exceeds this (0 = report only)",
+        )
+
+    def _run(self, modules):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "emoscreen.settings")}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, *modules],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+        return float(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or ["emoscreen.wsgi", settings.ROOT_URLCONF]
+        runs = [self._run(modules) for _ in range(max(1, options["repeat"]))]
+        totals = [total for total, _rows in runs]
+        total_ms = statistics.median(totals)
+        rows = min(runs, key=lambda run: abs(run[0] - total_ms))[1]
+
+        self.stdout.write(f"Cold import of {', '.join(modules)}: {total_ms:.1f} ms "
+                          f"(median of {len(totals)}: {', '.join(f'{t:.0f}' for t in totals)})")
+
+        self.stdout.write(f"\n{'cumulative_ms':>14}{'self_ms':>10}  module")
+        for row in sorted(rows, key=lambda r: -r["cumulative_ms"])[:options["top"]]:
+            self.stdout.write(f"{row['cumulative_ms']:>14.1f}{row['self_ms']:>10.1f}  {row['module']}")
+
+        heavy = heavy_packages(rows)
+        self.stdout.write("\nHeavy packages loaded at import:")
+        if not heavy:
+            self.stdout.write("  none")
+        for package, package_ms, outer in heavy:
+            self.stdout.write(f"  {package:<12}{package_ms:>8.1f} ms  via {importer_chain(outer)}")
+
+        budget = options["max_ms"]
+        if budget and total_ms > budget:
+            raise CommandError(f"Cold import took {total_ms:.1f} ms, over the {budget:.0f} ms budget.")
+        if budget:
+            self.stdout.write(self.style.SUCCESS(f"\nWithin the {budget:.0f} ms import budget."))
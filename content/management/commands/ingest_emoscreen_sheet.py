@@ -5,6 +5,8 @@ from typing import Dict, List, Tuple, Set, Optional
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import connection, transaction
+from content.education import compile_all as compile_education_pages
+from content.screening_cache import invalidate_catalog_version
 from datetime import datetime
 
 REQUIRED_SHEETS = {
@@ -352,4 +354,8 @@ class Command(BaseCommand):
             self.stdout.write(f"Ingesting ui_strings: {len(rows)}")
             upsert(cur, "ui_strings", REQUIRED_SHEETS["ui_strings"], rows, ["key", "lang_code"])
 
+        self.stdout.write(f"Compiled doctor education pages: {compile_education_pages()}")
+
+        # Screening forms cached under the old catalog fingerprint are re-rendered once this commits.
+        transaction.on_commit(invalidate_catalog_version)
         self.stdout.write(self.style.SUCCESS("Ingestion complete."))
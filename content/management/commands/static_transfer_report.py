@@ -0,0 +1,55 @@
+import os
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.isfile(path) else None
+
+
+def _kb(value):
+    return f"{value / 1024:,.1f} KB"
+
+
+class Command(BaseCommand):
+    help = "Report the bytes a first visit transfers for the collected static files, raw vs gzip vs Brotli"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--files", action="store_true", help="List every file, largest first")
+
+    def handle(self, *args, **options):
+        hashed = sorted(set(getattr(staticfiles_storage, "hashed_files", {}).values()))
+        if not hashed:
+            raise CommandError("No staticfiles manifest found; run `manage.py collectstatic` first.")
+
+        rows = []
+        brotli_variants = 0
+        for name in hashed:
+            path = staticfiles_storage.path(name)
+            raw = _size(path)
+            if raw is None:
+                continue
+            gz = _size(path + ".gz") or raw
+            br = _size(path + ".br")
+            brotli_variants += br is not None
+            rows.append((name, raw, gz, br or gz))
+
+        raw_total = sum(row[1] for row in rows)
+        gz_total = sum(row[2] for row in rows)
+        br_total = sum(row[3] for row in rows)
+
+        if options["files"]:
+            self.stdout.write(f"{'file':<60}{'raw':>12}{'gzip':>12}{'br':>12}")
+            for name, raw, gz, br in sorted(rows, key=lambda row: -row[1]):
+                self.stdout.write(f"{name:<60}{raw:>12,}{gz:>12,}{br:>12,}")
+            self.stdout.write("")
+
+        self.stdout.write(f"Static files:          {len(rows)}")
+        self.stdout.write(f"Before (uncompressed): {_kb(raw_total):>12}")
+        for label, total in (("gzip", gz_total), ("Brotli", br_total)):
+            saved = 1 - total / raw_total if raw_total else 0
+            self.stdout.write(f"After ({label}):{' ' * (15 - len(label))}{_kb(total):>12}  ({saved:.0%} smaller)")
+        self.stdout.write(f"Repeat visits:         {_kb(0):>12}  (hashed names are cached as immutable)")
+        if not brotli_variants:
+            self.stdout.write(self.style.WARNING("No .br variants found; install Brotli and re-run collectstatic."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_alter_submission_professional'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registeredprofessional',
+            index=models.Index(fields=['role', 'created_at'], name='registered__role_bae14b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['created_at'], name='submissions_created_ff86d7_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0007_submission_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctoreducation',
+            name='education_html',
+            field=models.TextField(blank=True, db_default='', default=''),
+        ),
+        migrations.AddField(
+            model_name='doctoreducation',
+            name='html_compiled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
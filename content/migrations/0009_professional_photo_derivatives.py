@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_doctor_education_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registeredprofessional',
+            name='photo_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -28,6 +28,8 @@ class RegisteredProfessional(models.Model):
     district = models.CharField(max_length=64, null=True, blank=True)
     receptionist_whatsapp = models.CharField(max_length=32, null=True, blank=True)
     photo_url = models.ImageField(upload_to="profiles/", null=True, blank=True)
+    # {"source": photo_url.name, "avatar": {"webp": path, "jpg": path}, "header": {...}}; see content.profile_photos
+    photo_derivatives = models.JSONField(default=dict, blank=True)
     unique_doctor_code = models.CharField(max_length=32, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -36,6 +38,9 @@ class RegisteredProfessional(models.Model):
 
     class Meta:
         db_table = "registered_professionals"
+        indexes = [
+            models.Index(fields=["role", "created_at"]),
+        ]
 
 class Question(models.Model):
     question_code = models.CharField(primary_key=True, max_length=64)
@@ -77,6 +82,9 @@ class DoctorEducation(models.Model):
     education_markdown = models.TextField()  # MEDIUMTEXT in DB
     reference_1 = models.CharField(max_length=512, null=True, blank=True)
     reference_2 = models.CharField(max_length=512, null=True, blank=True)
+    # Sanitized HTML compiled from education_markdown at ingest (content.education).
+    education_html = models.TextField(blank=True, default="", db_default="")
+    html_compiled_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "doctor_education"
@@ -130,9 +138,14 @@ class Submission(models.Model):
     email_to = models.CharField(max_length=191)
     email_sent_at = models.DateTimeField(null=True, blank=True)
     sendgrid_message_id = models.CharField(max_length=128, null=True, blank=True)
+    # Token issued with the screening form; a replayed POST finds the stored submission instead of creating another.
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     class Meta:
         db_table = "submissions"
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
 
 class SubmissionAnswer(models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE)
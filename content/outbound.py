@@ -0,0 +1,247 @@
+# content/outbound.py
+"""
+Shared outbound HTTP clients for SendGrid, AiSensy, Razorpay and S3 report storage.
+
+One keep-alive requests.Session per provider per process, so repeat sends
+reuse the TCP+TLS connection instead of handshaking every time. Each client
+has connect/read timeouts, bounded retries with full-jitter backoff, a
+consecutive-failure circuit breaker and in-process latency/error counters
+(see metrics_snapshot()).
+
+Sends are not idempotent (an email or WhatsApp template fired twice reaches
+the patient twice), so by default only failures where the provider cannot
+have acted are retried: connect timeouts/refusals and 429/503 responses. Pass
+idempotent=True for reads.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_MAIL_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# Read timeouts per provider; SendGrid and S3 upload PDFs so get the longest.
+PROVIDERS = {
+    "sendgrid": {"read_timeout": 20.0},
+    "aisensy": {"read_timeout": 10.0},
+    "razorpay": {"read_timeout": 10.0},
+    "s3": {"read_timeout": 20.0},
+}
+
+SAFE_RETRY_STATUSES = {429, 503}
+IDEMPOTENT_RETRY_STATUSES = SAFE_RETRY_STATUSES | {500, 502, 504}
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_CAP_SECONDS = 2.0
+
+
+class ProviderUnavailable(requests.exceptions.ConnectionError):
+    """Raised without a network call while a provider's circuit is open."""
+
+
+def _never_sent(exc: Exception) -> bool:
+    """True when the request cannot have reached the provider (connect timeout / refused / DNS)."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, NewConnectionError)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = max(1, threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_seconds:
+                return False
+            # Half-open lets one probe through; its result closes or re-opens the
+            # circuit. A probe that never reports back is replaced after reset_seconds.
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_seconds:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this failure (re)opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+                self.probe_started_at = None
+                return True
+            return False
+
+
+class ProviderMetrics:
+    def __init__(self, window: int = 512):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latencies_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self.latencies_ms.append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies_ms)
+            counts = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "short_circuited": self.short_circuited,
+            }
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))], 1)
+
+        return {**counts, "p50_ms": pct(50), "p95_ms": pct(95), "max_ms": round(ordered[-1], 1) if ordered else 0.0}
+
+
+class ProviderClient:
+    def __init__(self, name: str, *, connect_timeout: float, read_timeout: float, max_retries: int,
+                 breaker_threshold: int, breaker_reset_seconds: float):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max(0, max_retries)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.metrics = ProviderMetrics()
+        self.session = requests.Session()
+        # Retries are handled in request() so they can honour the breaker and jitter.
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int):
+        time.sleep(random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))))
+
+    def request(self, method: str, url: str, *, idempotent: bool = False, **kwargs) -> requests.Response:
+        retry_statuses = IDEMPOTENT_RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.short_circuited += 1
+                raise ProviderUnavailable(f"{self.name} circuit open after {self.breaker.failures} consecutive failures")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as exc:
+                self.metrics.observe((time.perf_counter() - started) * 1000, ok=False)
+                self._record_failure()
+                retryable = _never_sent(exc) or (
+                    idempotent and isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                )
+                if retryable and attempt < self.max_retries:
+                    attempt += 1
+                    self.metrics.retries += 1
+                    logger.warning("[%s] %s %s failed (%s); retry %s", self.name, method, url, exc, attempt)
+                    self._backoff(attempt)
+                    continue
+                raise
+
+            provider_error = response.status_code >= 500 or response.status_code == 429
+            self.metrics.observe((time.perf_counter() - started) * 1000, ok=not provider_error)
+            if provider_error:
+                self._record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status_code in retry_statuses and attempt < self.max_retries:
+                attempt += 1
+                self.metrics.retries += 1
+                logger.warning("[%s] %s %s returned %s; retry %s", self.name, method, url, response.status_code, attempt)
+                self._backoff(attempt)
+                continue
+            return response
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            logger.error("[%s] circuit open for %ss after %s consecutive failures",
+                         self.name, self.breaker.reset_seconds, self.breaker.failures)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+_clients: dict[str, ProviderClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> ProviderClient:
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = ProviderClient(
+                name,
+                connect_timeout=getattr(settings, "OUTBOUND_CONNECT_TIMEOUT", 3.05),
+                read_timeout=PROVIDERS.get(name, {}).get("read_timeout", 10.0),
+                max_retries=getattr(settings, "OUTBOUND_MAX_RETRIES", 2),
+                breaker_threshold=getattr(settings, "OUTBOUND_BREAKER_THRESHOLD", 5),
+                breaker_reset_seconds=getattr(settings, "OUTBOUND_BREAKER_RESET_SECONDS", 30),
+            )
+        return _clients[name]
+
+
+def sendgrid_send(message) -> requests.Response:
+    """
+    Drop-in for SendGridAPIClient(key).send(message) over the pooled session.
+    Returns the response for every status (callers fall back to SMTP on non-2xx).
+    """
+    return get_client("sendgrid").post(
+        SENDGRID_MAIL_SEND_URL,
+        json=message.get(),
+        headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}", "Accept": "application/json"},
+    )
+
+
+def metrics_snapshot() -> dict:
+    return {
+        name: {**client.metrics.snapshot(), "circuit": client.breaker.state}
+        for name, client in sorted(_clients.items())
+    }
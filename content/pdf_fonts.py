@@ -0,0 +1,120 @@
+# content/pdf_fonts.py
+"""
+Fonts for non-Latin text in the legacy report PDFs.
+
+Red-flag labels come from RedFlagI18n in Hindi/Marathi (Devanagari), Bengali,
+Tamil, Telugu, Kannada and Malayalam, none of which Helvetica can draw.
+font_for(text) picks a font per string from the script it contains:
+
+* Latin-only text keeps the built-in Helvetica, so English reports embed nothing.
+* Other scripts use the Noto Sans TTF for that script from PDF_FONT_DIR. Each
+  file is parsed and registered with ReportLab once per process; ReportLab
+  embeds only the glyphs a document actually uses, so a report carries a
+  small subset rather than the whole font.
+* Without the bold file, bold text uses the regular face of the same script
+  (and the PDF embeds one subset instead of two). Without the regular file
+  the text falls back to Helvetica; either is logged once per process.
+
+The TTFs are not in the repository: `manage.py fetch_pdf_fonts` downloads them
+from FONT_SOURCE_URL (deploy.sh runs it). While a regular file is missing the
+system checks warn (content.W001), or fail with PDF_FONTS_REQUIRED (content.E001).
+
+Indic scripts need shaping: conjuncts (क्ष), vowel signs drawn before their
+consonant (ि) and stacked marks. shaped() runs the text through HarfBuzz
+(uharfbuzz, in requirements.txt) via ReportLab's shapeStr, and every draw call
+for font_for() text passes its string through it. Canvas.drawString's own
+shaping=True flag is not used: it is silently ignored unless rlbidi is also
+installed.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.pdfbase import pdfmetrics, ttfonts
+from reportlab.pdfbase.ttfonts import TTFont, shapeStr
+
+logger = logging.getLogger(__name__)
+
+BASE_FONTS = {False: "Helvetica", True: "Helvetica-Bold"}
+
+# (first code point, last code point, script)
+SCRIPT_RANGES = (
+    (0x0900, 0x097F, "devanagari"),
+    (0x0980, 0x09FF, "bengali"),
+    (0x0B80, 0x0BFF, "tamil"),
+    (0x0C00, 0x0C7F, "telugu"),
+    (0x0C80, 0x0CFF, "kannada"),
+    (0x0D00, 0x0D7F, "malayalam"),
+)
+
+# script -> (regular, bold) file names in PDF_FONT_DIR
+SCRIPT_FONT_FILES = {
+    "devanagari": ("NotoSansDevanagari-Regular.ttf", "NotoSansDevanagari-Bold.ttf"),
+    "bengali": ("NotoSansBengali-Regular.ttf", "NotoSansBengali-Bold.ttf"),
+    "tamil": ("NotoSansTamil-Regular.ttf", "NotoSansTamil-Bold.ttf"),
+    "telugu": ("NotoSansTelugu-Regular.ttf", "NotoSansTelugu-Bold.ttf"),
+    "kannada": ("NotoSansKannada-Regular.ttf", "NotoSansKannada-Bold.ttf"),
+    "malayalam": ("NotoSansMalayalam-Regular.ttf", "NotoSansMalayalam-Bold.ttf"),
+}
+
+# Noto's published builds (SIL Open Font License); {family} is the file name up to the first "-".
+FONT_SOURCE_URL = "https://github.com/notofonts/notofonts.github.io/raw/main/fonts/{family}/hinted/ttf/{filename}"
+
+_registered: dict[tuple[str, bool], str | None] = {}
+_lock = threading.Lock()
+
+
+def script_of(text: str) -> str | None:
+    """The first non-Latin script found in text, or None."""
+    for ch in text or "":
+        cp = ord(ch)
+        if cp < 0x0900:
+            continue
+        for first, last, script in SCRIPT_RANGES:
+            if first <= cp <= last:
+                return script
+    return None
+
+
+def missing_regular_fonts() -> list[Path]:
+    """Regular TTFs that PDF_FONT_DIR lacks; those scripts would render in Helvetica."""
+    font_dir = Path(getattr(settings, "PDF_FONT_DIR", ""))
+    return [font_dir / regular for regular, _bold in SCRIPT_FONT_FILES.values() if not (font_dir / regular).is_file()]
+
+
+def _register(script: str, bold: bool) -> str | None:
+    key = (script, bold)
+    if key in _registered:
+        return _registered[key]
+    with _lock:
+        if key not in _registered:
+            filename = SCRIPT_FONT_FILES[script][1 if bold else 0]
+            path = Path(getattr(settings, "PDF_FONT_DIR", "")) / filename
+            name = Path(filename).stem
+            try:
+                pdfmetrics.registerFont(TTFont(name, str(path)))
+            except Exception as exc:
+                logger.warning("[PDF fonts] cannot load %s: %s", path, exc)
+                name = None
+            _registered[key] = name
+    if _registered[key] is None and bold:
+        return _register(script, False)
+    return _registered[key]
+
+
+def font_for(text: str, bold: bool = False) -> str:
+    """ReportLab font name able to draw text."""
+    script = script_of(text)
+    if script is None:
+        return BASE_FONTS[bold]
+    return _register(script, bold) or BASE_FONTS[bold]
+
+
+def shaped(text: str, font_name: str, size: float) -> str:
+    """text ready to draw in font_name: HarfBuzz-shaped for the Noto fonts, unchanged otherwise."""
+    if not text or font_name in BASE_FONTS.values() or ttfonts.uharfbuzz is None:
+        return text
+    return shapeStr(text, font_name, size)
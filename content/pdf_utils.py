@@ -1,12 +1,19 @@
 # content/pdf_utils.py
 from __future__ import annotations
-import io, re, datetime
+import io, os, re, datetime, logging, threading
+from functools import lru_cache
 from typing import List, Tuple
+from django.conf import settings
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib.utils import simpleSplit
 from pypdf import PdfReader, PdfWriter
+from pypdf.annotations import Link
+
+from .pdf_fonts import font_for, shaped
+
+logger = logging.getLogger(__name__)
 
 # ---------------- Password helpers ----------------
 def _first4_letters(name: str) -> str:
@@ -83,8 +90,9 @@ def _kv_row(c: canvas.Canvas, label: str, value: str, y: float, size: int = 11)
     c.setFont("Helvetica-Bold", size)
     lab_lines = simpleSplit(label_text, "Helvetica-Bold", size, LABEL_COL_W)
     
-    c.setFont("Helvetica", size)
-    val_lines = simpleSplit(value or "", "Helvetica", size, VALUE_COL_W)
+    value_font = font_for(value)
+    c.setFont(value_font, size)
+    val_lines = simpleSplit(value or "", value_font, size, VALUE_COL_W)
     
     # Calculate required space
     max_lines = max(len(lab_lines), len(val_lines), 1)
@@ -102,11 +110,11 @@ def _kv_row(c: canvas.Canvas, label: str, value: str, y: float, size: int = 11)
         current_y -= LH
     
     # Draw value column
-    c.setFont("Helvetica", size)
+    c.setFont(value_font, size)
     current_y = y
     value_x = LM + LABEL_COL_W + GUTTER
     for line in val_lines:
-        c.drawString(value_x, current_y, line)
+        c.drawString(value_x, current_y, shaped(line, value_font, size))
         current_y -= LH
     
     return y - need
@@ -147,19 +155,22 @@ def _bullet_list(c: canvas.Canvas, items: List[str], y: float, size: int = 11) -
             
         # Calculate space needed for this item
         available_width = CONTENT_W - text_indent
-        lines = simpleSplit(item, "Helvetica", size, available_width)
+        item_font = font_for(item)
+        lines = simpleSplit(item, item_font, size, available_width)
         need = len(lines) * LH + 2
         
         y = _ensure_space(c, y, need)
         
         # Draw bullet
         c.setFillColorRGB(0, 0, 0)
+        c.setFont("Helvetica", size)
         c.drawString(LM + bullet_indent, y, "•")
         
         # Draw text lines
+        c.setFont(item_font, size)
         current_y = y
         for i, line in enumerate(lines):
-            c.drawString(LM + text_indent, current_y, line)
+            c.drawString(LM + text_indent, current_y, shaped(line, item_font, size))
             current_y -= LH
         
         y = current_y - 2  # Small gap between items
@@ -185,6 +196,176 @@ def _encrypt(pdf_bytes: bytes, password: str) -> bytes:
     writer.write(out)
     return out.getvalue()
 
+# ---------------- Template overlay renderer ----------------
+# LEGACY_REPORT_RENDERER=template stamps only the dynamic text onto the designed
+# report PDFs (settings.*_REPORT_TEMPLATE_PATH) instead of drawing the whole
+# report. Each template is parsed once per process and its pages reused for
+# every report. A missing/unreadable template, or a red-flag list longer than
+# the designed box, falls back to the canvas builders below.
+# There are no default templates: the PDFs in content/assets/ are filled sample
+# reports, so the mode refuses to run (canvas renderer + content.W002 warning)
+# until both paths point at blank templates.
+
+# Filled sample reports bundled in content/assets/; never valid templates.
+SAMPLE_REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+SAMPLE_REPORT_PDFS = {"DoctorReportBehaviorForm_unlocked.pdf", "PatientReportBehaviorForm_unlocked.pdf"}
+
+# (value key, x, y) in points on page 1, taken from the designed layout.
+PATIENT_TEMPLATE_FIELDS = (
+    ("patient_name", 115.0, 528.2),
+    ("parent_phone", 167.7, 512.4),
+    ("report_code", 94.4, 496.7),
+    ("form_name", 28.4, 466.0),
+)
+PATIENT_TEMPLATE_FLAGS = {"x": 28.6, "top": 373.1, "bottom": 70.0, "width": 538.0, "size": 12, "line": 15.0, "gap": 15.5}
+
+DOCTOR_TEMPLATE_TITLE_CENTER = (274.4, 797.9)
+DOCTOR_TEMPLATE_FIELDS = (
+    ("form_name", 232.4, 773.9),
+    ("report_date", 278.2, 757.7),
+    ("report_code", 285.7, 741.6),
+    ("doctor_full_name", 268.5, 573.5),
+    ("doctor_id", 265.7, 557.3),
+    ("report_date", 278.2, 541.2),
+    ("patient_name", 287.4, 453.0),
+    ("parent_phone", 262.9, 436.9),
+    ("form_name", 221.8, 420.8),
+    ("report_code", 271.8, 404.6),
+)
+DOCTOR_TEMPLATE_FLAGS = {"x": 54.4, "top": 364.6, "bottom": 62.0, "width": 150.0, "size": 10, "line": 16.0, "gap": 0.0}
+DOCTOR_TEMPLATE_BUTTON = {"x": 214.94, "width": 76.7, "below": 2.24, "above": 9.32}
+
+_template_lock = threading.Lock()
+
+
+def report_template_problems() -> List[str]:
+    """Why the configured report templates cannot be used; empty when both are blank templates on disk."""
+    problems = []
+    for name in ("PATIENT_REPORT_TEMPLATE_PATH", "DOCTOR_REPORT_TEMPLATE_PATH"):
+        path = str(getattr(settings, name, "") or "")
+        if not path:
+            problems.append(f"{name} is not set")
+        elif (os.path.dirname(os.path.abspath(path)) == SAMPLE_REPORT_DIR
+              and os.path.basename(path) in SAMPLE_REPORT_PDFS):
+            problems.append(f"{name} points at the bundled sample report {os.path.basename(path)}")
+        elif not os.path.isfile(path):
+            problems.append(f"{name} ({path}) does not exist")
+    return problems
+
+
+def _template_renderer_enabled() -> bool:
+    if getattr(settings, "LEGACY_REPORT_RENDERER", "canvas") != "template":
+        return False
+    problems = report_template_problems()
+    if problems:
+        logger.error("[PDF] LEGACY_REPORT_RENDERER=template refused (%s); using the canvas renderer", "; ".join(problems))
+        return False
+    return True
+
+
+@lru_cache(maxsize=4)
+def _template_pdf(path: str, mtime: float) -> PdfReader:
+    with open(path, "rb") as fh:
+        return PdfReader(io.BytesIO(fh.read()))
+
+
+def _load_template(path) -> PdfReader | None:
+    try:
+        return _template_pdf(str(path), os.path.getmtime(path))
+    except Exception:
+        logger.warning("[PDF] report template %s could not be loaded; using the canvas renderer", path, exc_info=True)
+        return None
+
+
+def _stamp_flags(c: canvas.Canvas, labels: List[str], box: dict, on_item=None) -> bool:
+    """Draw the red-flag list inside box; returns False when it does not fit."""
+    y = box["top"]
+    for label in labels:
+        label_font = font_for(label)
+        lines = simpleSplit(label or "", label_font, box["size"], box["width"]) or [""]
+        if y - (len(lines) - 1) * box["line"] < box["bottom"]:
+            return False
+        c.setFont("Helvetica", box["size"])
+        if on_item:
+            on_item(y)
+        c.setFont(label_font, box["size"])
+        for line in lines:
+            c.drawString(box["x"], y, shaped(line, label_font, box["size"]))
+            y -= box["line"]
+        y -= box["gap"]
+    return True
+
+
+def _overlay_template(path, draw, password: str) -> bytes | None:
+    """Stamp draw(canvas) -> [(rect, url)] or None onto page 1 of the cached template and encrypt."""
+    template = _load_template(path)
+    if template is None:
+        return None
+    buf, c = _new_canvas()
+    links = draw(c)
+    if links is None:
+        return None
+    c.showPage()
+    c.save()
+    stamp = PdfReader(io.BytesIO(buf.getvalue())).pages[0]
+
+    writer = PdfWriter()
+    # The cached reader parses lazily from one shared stream; clone its pages one render at a time.
+    with _template_lock:
+        for page in template.pages:
+            writer.add_page(page)
+    writer.pages[0].merge_page(stamp)
+    for rect, url in links:
+        writer.add_annotation(0, Link(rect=rect, url=url))
+    writer.encrypt(user_password=password, owner_password=password)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _patient_template_pdf(values: dict, rf_labels: List[str], password: str) -> bytes | None:
+    def draw(c):
+        c.setFillColorRGB(0, 0, 0)
+        for key, x, y in PATIENT_TEMPLATE_FIELDS:
+            value_font = font_for(values[key])
+            c.setFont(value_font, 12)
+            c.drawString(x, y, shaped(values[key], value_font, 12))
+        if not _stamp_flags(c, rf_labels or ["None"], PATIENT_TEMPLATE_FLAGS):
+            return None
+        return []
+
+    return _overlay_template(settings.PATIENT_REPORT_TEMPLATE_PATH, draw, password)
+
+
+def _doctor_template_pdf(values: dict, rf_labels: List[str], education_links: List[str], password: str) -> bytes | None:
+    def draw(c):
+        c.setFillColorRGB(0, 0, 0)
+        title = f"{values['patient_name']}’s Red Flag Report"
+        title_font = font_for(title, bold=True)
+        c.setFont(title_font, 10)
+        c.drawCentredString(*DOCTOR_TEMPLATE_TITLE_CENTER, shaped(title, title_font, 10))
+        for key, x, y in DOCTOR_TEMPLATE_FIELDS:
+            value_font = font_for(values[key])
+            c.setFont(value_font, 10)
+            c.drawString(x, y, shaped(values[key], value_font, 10))
+
+        links = []
+        pending = list(education_links or [])
+        button = DOCTOR_TEMPLATE_BUTTON
+
+        def education_button(y):
+            link = pending.pop(0) if pending else ""
+            if link:
+                c.drawString(button["x"], y, "Doctor Education")
+                links.append(((button["x"], y - button["below"], button["x"] + button["width"], y + button["above"]), link))
+
+        if not _stamp_flags(c, rf_labels or ["None"], DOCTOR_TEMPLATE_FLAGS, on_item=education_button if rf_labels else None):
+            return None
+        return links
+
+    return _overlay_template(settings.DOCTOR_REPORT_TEMPLATE_PATH, draw, password)
+
+
 # --------- Enhanced Report Generators ---------
 PATIENT_DISCLAIMER = (
     "The report is based on form submissions received from the patient. "
@@ -203,14 +384,30 @@ def build_patient_report_pdf_bytes(
     report_date: datetime.datetime | None = None
 ) -> Tuple[bytes, str]:
     """Return (encrypted_pdf_bytes, password)."""
+    if _template_renderer_enabled():
+        pwd = patient_pdf_password(patient_name or "", parent_phone or "")
+        stamped = _patient_template_pdf(
+            {
+                "patient_name": patient_name or "(not stored)",
+                "parent_phone": parent_phone or "(not stored)",
+                "report_code": report_code,
+                "form_name": form_name,
+            },
+            rf_labels,
+            pwd,
+        )
+        if stamped is not None:
+            return stamped, pwd
+
     buf, c = _new_canvas()
     y = _title(c, "Patient Report")
     
     # Enhanced subtitle with better spacing
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColorRGB(0.2, 0.2, 0.2)
     subtitle = f"{(patient_name or 'Patient').strip()}'s Red Flag Report"
-    c.drawString(LM, y, subtitle)
+    subtitle_font = font_for(subtitle, bold=True)
+    c.setFont(subtitle_font, 16)
+    c.setFillColorRGB(0.2, 0.2, 0.2)
+    c.drawString(LM, y, shaped(subtitle, subtitle_font, 16))
     y -= 20
     
     # Report metadata
@@ -276,7 +473,8 @@ def _rf_list_with_education_buttons(
     for label, link in zip(labels, links or []):
         # width available for text after reserving right-side button
         available_w = CONTENT_W - text_indent - BTN_W - RIGHT_GUTTER
-        lines = simpleSplit(label or "", "Helvetica", size, available_w) or [""]
+        label_font = font_for(label)
+        lines = simpleSplit(label or "", label_font, size, available_w) or [""]
 
         # total height this item will occupy
         block_h = max(1, len(lines)) * LH
@@ -284,12 +482,14 @@ def _rf_list_with_education_buttons(
 
         # bullet
         c.setFillColorRGB(0, 0, 0)
+        c.setFont("Helvetica", size)
         c.drawString(LM + bullet_indent, y, "•")
 
         # text (may wrap)
+        c.setFont(label_font, size)
         ty = y
         for ln in lines:
-            c.drawString(LM + text_indent, ty, ln)
+            c.drawString(LM + text_indent, ty, shaped(ln, label_font, size))
             ty -= LH
 
         # button: vertically centered against the text block
@@ -319,6 +519,25 @@ def build_doctor_report_pdf_bytes(
     report_date=None
 ):
     """Return (encrypted_pdf_bytes, password). Password uses the doctor's FIRST NAME."""
+    if _template_renderer_enabled():
+        pwd = doctor_pdf_password(doctor_first_name or "", doctor_whatsapp or "")
+        stamped = _doctor_template_pdf(
+            {
+                "form_name": form_name,
+                "report_date": datetime.datetime.utcnow().strftime("%Y-%m-%d"),
+                "report_code": report_code,
+                "doctor_full_name": doctor_full_name or "(not set)",
+                "doctor_id": doctor_id or "(not set)",
+                "patient_name": patient_name or "(not stored)",
+                "parent_phone": parent_phone or "(not stored)",
+            },
+            rf_labels,
+            education_links,
+            pwd,
+        )
+        if stamped is not None:
+            return stamped, pwd
+
     buf, c = _new_canvas()
     y = _title(c, "Doctor Report")
 
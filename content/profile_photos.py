@@ -0,0 +1,165 @@
+# content/profile_photos.py
+"""
+Doctor profile photos: validated, re-encoded uploads and fixed-size derivatives.
+
+Every parent-facing page shows the provider photo in an 86px box (72px on
+phones), so parents should never download the original upload.
+
+* normalize_upload() runs from the registration forms. It rejects files that
+  are not JPEG/PNG/WebP, too large, or too many pixels. It applies the EXIF
+  orientation, then stores a JPEG no larger than MAX_EDGE px with the
+  metadata (camera, GPS) stripped.
+* ensure_derivatives() writes square crops for DERIVATIVES (avatar = 1x,
+  header = 2x) as WebP and JPEG under profiles/derived/<digest of the source
+  name>/. The paths are recorded in RegisteredProfessional.photo_derivatives
+  together with the source name. Rows sharing a photo (the bulk-upload
+  default) share the files. Registration calls it once; existing rows go
+  through `manage.py backfill_profile_photos`.
+* photo_context() is what white_label_context() uses: derivative URLs when
+  they match the current photo, otherwise the original URL.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP"}
+MAX_PIXELS = 40_000_000
+MAX_EDGE = 1024
+DERIVATIVES = {"avatar": 96, "header": 192}
+DERIVED_DIR = "profiles/derived"
+ENCODINGS = (
+    ("webp", "WEBP", {"quality": 80, "method": 6}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+
+def _to_rgb(image):
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _open(fileobj):
+    from PIL import Image, ImageOps
+
+    image = Image.open(fileobj)
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError("Please upload a JPEG, PNG or WebP photo.")
+    if image.width * image.height > MAX_PIXELS:
+        raise ValidationError("This photo is too large; please upload one under 40 megapixels.")
+    image = ImageOps.exif_transpose(image)
+    return _to_rgb(image)
+
+
+def normalize_upload(upload):
+    """Validate an uploaded photo and return it re-encoded as a metadata-free JPEG."""
+    if not upload or not hasattr(upload, "size"):
+        return upload
+    max_bytes = settings.PROFILE_PHOTO_MAX_UPLOAD_MB * 1024 * 1024
+    if upload.size > max_bytes:
+        raise ValidationError(f"Please upload a photo under {settings.PROFILE_PHOTO_MAX_UPLOAD_MB} MB.")
+
+    from PIL import Image, UnidentifiedImageError
+
+    upload.seek(0)
+    try:
+        image = _open(upload)
+        image.thumbnail((MAX_EDGE, MAX_EDGE), Image.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValidationError("This file could not be read as an image.")
+
+    out = BytesIO()
+    image.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+    stem = os.path.splitext(os.path.basename(upload.name or "photo"))[0] or "photo"
+    return ContentFile(out.getvalue(), name=f"{stem}.jpg")
+
+
+def _derived_paths(source_name: str) -> dict:
+    digest = hashlib.sha256(source_name.encode("utf-8")).hexdigest()[:16]
+    return {
+        label: {ext: f"{DERIVED_DIR}/{digest}/{label}.{ext}" for ext, _fmt, _opts in ENCODINGS}
+        for label in DERIVATIVES
+    }
+
+
+def build_derivatives(source_name: str, force: bool = False) -> dict:
+    """Write (or reuse) the derivatives of source_name; returns the photo_derivatives value."""
+    from PIL import Image, ImageOps
+
+    paths = _derived_paths(source_name)
+    missing = [
+        path for variants in paths.values() for path in variants.values()
+        if force or not default_storage.exists(path)
+    ]
+    if missing:
+        with default_storage.open(source_name, "rb") as handle:
+            image = _open(handle)
+        for label, edge in DERIVATIVES.items():
+            square = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+            for ext, fmt, opts in ENCODINGS:
+                path = paths[label][ext]
+                if path not in missing:
+                    continue
+                out = BytesIO()
+                square.save(out, fmt, **opts)
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                default_storage.save(path, ContentFile(out.getvalue()))
+    return {"source": source_name, **paths}
+
+
+def ensure_derivatives(pro, force: bool = False) -> bool:
+    """Bring pro.photo_derivatives in line with pro.photo_url; returns whether the row changed."""
+    source = pro.photo_url.name if pro.photo_url else ""
+    current = pro.photo_derivatives or {}
+    if not source:
+        if not current:
+            return False
+        derivatives = {}
+    elif current.get("source") == source and not force:
+        return False
+    else:
+        try:
+            derivatives = build_derivatives(source, force=force)
+        except (OSError, ValidationError) as exc:
+            logger.warning("Profile photo derivatives failed for %s (%s): %s", pro.unique_doctor_code, source, exc)
+            return False
+    pro.photo_derivatives = derivatives
+    pro.save(update_fields=["photo_derivatives"])
+    return True
+
+
+def photo_context(pro) -> dict:
+    """pro_photo_url (smallest JPEG) plus 1x/2x srcsets, falling back to the original upload."""
+    if not pro.photo_url:
+        return {"pro_photo_url": "", "pro_photo_srcset": "", "pro_photo_webp_srcset": ""}
+    derivatives = pro.photo_derivatives or {}
+    if derivatives.get("source") != pro.photo_url.name:
+        return {"pro_photo_url": pro.photo_url.url, "pro_photo_srcset": "", "pro_photo_webp_srcset": ""}
+
+    def srcset(ext):
+        return ", ".join(
+            f"{default_storage.url(derivatives[label][ext])} {density}x"
+            for density, label in enumerate(DERIVATIVES, start=1)
+        )
+
+    return {
+        "pro_photo_url": default_storage.url(derivatives["avatar"]["jpg"]),
+        "pro_photo_srcset": srcset("jpg"),
+        "pro_photo_webp_srcset": srcset("webp"),
+    }
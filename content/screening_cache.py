@@ -0,0 +1,89 @@
+# content/screening_cache.py
+"""
+The question block of the legacy screening form, rendered once per language
+and catalog version.
+
+Everything between "Questions" and the submit button is the same for every
+parent using a language, so screening_questions(lang) keeps the rendered HTML
+(and the field list POST validation needs) in the default cache under
+(lang, catalog_version()). The view still renders screening_form.html per
+request for the clinic white-label header, CSRF token and submission token,
+but no longer loops over questions and options.
+
+catalog_version() is a fingerprint of the active questions, options and their
+translations, itself cached for SCREENING_CATALOG_VERSION_SECONDS. An edited
+catalog therefore gets new keys: at once where ingest_emoscreen_sheet can
+clear the shared cache, otherwise once the fingerprint expires.
+SCREENING_FORM_CACHE_SECONDS=0 renders the block on every request.
+"""
+from __future__ import annotations
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Option, OptionI18n, Question, QuestionI18n
+
+CATALOG_VERSION_KEY = "screening_catalog_version"
+QUESTIONS_TEMPLATE = "content/screening_questions.html"
+
+
+def build_screening_fields(lang_code):
+    questions = list(Question.objects.filter(active=True).order_by("display_order"))
+    fields = []
+    for q in questions:
+        qi = QuestionI18n.objects.get(question=q, lang_id=lang_code)
+        opts = Option.objects.filter(question=q).order_by("display_order")
+        oi = OptionI18n.objects.filter(option__in=opts, lang_id=lang_code)
+        by_option = {x.option_id: x.option_text for x in oi}
+        fields.append({
+            "question_code": q.question_code,
+            "question_text": qi.question_text,
+            "options": [{"code": o.option_code, "text": by_option.get(o.option_code, o.option_code)} for o in opts],
+        })
+    return fields
+
+
+def _catalog_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for rows in (
+        Question.objects.filter(active=True).order_by("pk").values_list("question_code", "display_order"),
+        QuestionI18n.objects.order_by("pk").values_list("question_id", "lang_id", "question_text"),
+        Option.objects.order_by("pk").values_list("option_code", "question_id", "display_order"),
+        OptionI18n.objects.order_by("pk").values_list("option_id", "lang_id", "option_text"),
+    ):
+        for row in rows:
+            digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def catalog_version() -> str:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = _catalog_fingerprint()
+        cache.set(CATALOG_VERSION_KEY, version, getattr(settings, "SCREENING_CATALOG_VERSION_SECONDS", 300))
+    return version
+
+
+def invalidate_catalog_version():
+    cache.delete(CATALOG_VERSION_KEY)
+
+
+def screening_questions(lang: str) -> dict:
+    """{"fields": [...], "html": rendered question block} for lang."""
+    ttl = getattr(settings, "SCREENING_FORM_CACHE_SECONDS", 0)
+    cache_key = ""
+    if ttl > 0:
+        cache_key = f"screening_questions:{lang}:{catalog_version()}"
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return {"fields": entry["fields"], "html": mark_safe(entry["html"])}
+
+    fields = build_screening_fields(lang)
+    html = render_to_string(QUESTIONS_TEMPLATE, {"fields": fields})
+    if cache_key:
+        cache.set(cache_key, {"fields": fields, "html": str(html)}, ttl)
+    return {"fields": fields, "html": html}
@@ -3,10 +3,11 @@
 import re
 import secrets
 import urllib.parse
-import requests
 from django.conf import settings
 from django.core import signing
 from django.core import signing  # NEW import added here
+from . import outbound
+from .profile_photos import photo_context
 _VERI_SALT = "verify-phone-v1"  # keep your existing salt
 
 def last10_digits(s: str) -> str:
@@ -101,7 +102,7 @@ def parent_message(lang_code: str, link: str) -> str:
     return tpl.format(link=link)
 
 def white_label_context(pro):
-    """Header block data for white-labeled pages; always provide a plain URL for photo."""
+    """Header block data for white-labeled pages; the photo is the smallest derivative with 1x/2x srcsets."""
     display_name = (pro.first_name or "")
     if pro.last_name:
         display_name = f"{display_name} {pro.last_name}".strip()
@@ -109,16 +110,14 @@ def white_label_context(pro):
     if pro.role == "CAREGIVER" and not pro.first_name:
         display_name = "Caregiver"
 
-    photo_url = ""
     try:
-        if pro.photo_url:
-            photo_url = pro.photo_url.url if hasattr(pro.photo_url, "url") else str(pro.photo_url)
+        photo = photo_context(pro)
     except Exception:
-        photo_url = str(pro.photo_url or "")
+        photo = {"pro_photo_url": str(pro.photo_url or ""), "pro_photo_srcset": "", "pro_photo_webp_srcset": ""}
 
     return {
         "pro_name": f"{pro.salutation or ''} {display_name}".strip(),
-        "pro_photo_url": photo_url,
+        **photo,
         "clinic_address": pro.clinic_address,
         "appointment_number": pro.appointment_booking_number,
         "pro": pro,
@@ -142,7 +141,6 @@ def _sendgrid_send(to_email: str, subject: str, html: str):
         print("To:", to_email); print("Subject:", subject); print("HTML:\n", html)
         return False
     try:
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail, Email, To
         message = Mail(
             from_email=Email(settings.DEFAULT_FROM_EMAIL, settings.REPORT_FROM_NAME),
@@ -150,8 +148,7 @@ def _sendgrid_send(to_email: str, subject: str, html: str):
             subject=subject,
             html_content=html,
         )
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        resp = sg.send(message)
+        resp = outbound.sendgrid_send(message)
         print(f"[SendGrid] status={resp.status_code}")
         return 200 <= resp.status_code < 300
     except Exception as e:
@@ -173,6 +170,8 @@ def _ensure_param_count(params, expected):
         p = p[:expected]
     return p
 
+_AISENSY_SHAPE = {"preferred": "primary"}
+
 def _aisensy_send(destination_digits: str, username: str, template_params, *, campaign_name=None, param_count=None):
     """
     Trigger an AiSensy campaign template.
@@ -207,22 +206,28 @@ def _aisensy_send(destination_digits: str, username: str, template_params, *, ca
         "userName": str(username or ""),
         "templateParams": params,
     }
+    # --- fallback shape (some tenants require 'destinations': [dest]) ---
+    body2 = {
+        "apiKey": api_key,
+        "campaignName": campaign,
+        "destinations": [dest],
+        "userName": str(username or ""),
+        "templateParams": params,
+    }
+    # Try whichever shape last worked for this tenant first, so the second
+    # POST only happens until the process has learned the right one.
+    shapes = [("primary", body), ("fallback", body2)]
+    if _AISENSY_SHAPE["preferred"] == "fallback":
+        shapes.reverse()
+    client = outbound.get_client("aisensy")
     try:
-        r = requests.post(url, json=body, timeout=20, headers=headers)
-        print("[AiSensy] primary status:", r.status_code, "resp:", r.text[:500])
-        if r.ok:
-            return True
-        # --- fallback shape (some tenants require 'destinations': [dest]) ---
-        body2 = {
-            "apiKey": api_key,
-            "campaignName": campaign,
-            "destinations": [dest],
-            "userName": str(username or ""),
-            "templateParams": params,
-        }
-        r2 = requests.post(url, json=body2, timeout=20, headers=headers)
-        print("[AiSensy] fallback status:", r2.status_code, "resp:", r2.text[:500])
-        return r2.ok
+        for shape, payload in shapes:
+            r = client.post(url, json=payload, headers=headers)
+            print(f"[AiSensy] {shape} status:", r.status_code, "resp:", r.text[:500])
+            if r.ok:
+                _AISENSY_SHAPE["preferred"] = shape
+                return True
+        return False
     except Exception as e:
         print("[AiSensy] error:", e)
         return False
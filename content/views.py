@@ -2,22 +2,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from datetime import datetime
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 import csv
 import io
 import os
+import secrets
 # content/views.py  (new imports)
 from io import BytesIO
-import qrcode
 import re
 from django.db.models import Q
 import csv
 import io
-import qrcode
-from qrcode.image.svg import SvgImage
 from django.views.decorators.http import require_http_methods
 from datetime import datetime, timedelta
 from django.utils import timezone
@@ -54,6 +52,8 @@ from .utils import (
     clinic_contact_numbers, booking_message_for_clinic, notify_registration,
     make_verify_token, read_verify_token, last10_digits,clinic_valid_last10_set,get_public_professional   # <-- NEW imports
 )
+from .screening_cache import screening_questions
+from .profile_photos import ensure_derivatives
 
 JOURNEY_LOCKED_CONTEXT = {"hide_journey_nav": True}
 
@@ -70,9 +70,18 @@ def _completed_legacy_response(request, workflow_case):
 
 
 def _legacy_patient_result_response(request, workflow_case):
-    submission = workflow_case.legacy_submission
+    return _legacy_result_page(
+        request,
+        workflow_case.legacy_submission,
+        workflow_case.patient_name,
+        fallback_lang=workflow_case.language,
+    )
+
+
+def _legacy_result_page(request, submission, patient_name, fallback_lang="en"):
+    """Render the stored result of a legacy submission without recomputing or re-sending anything."""
     pro = submission.professional
-    lang = submission.lang_id or workflow_case.language or "en"
+    lang = submission.lang_id or fallback_lang or "en"
     rf_ids = list(
         SubmissionRedFlag.objects
         .filter(submission=submission)
@@ -95,7 +104,7 @@ def _legacy_patient_result_response(request, workflow_case):
     doctor_name = re.sub(r"^(dr\.?|doctor)\s*", "", doctor_name, flags=re.I).strip()
     doctor_email_notice = _interp_doctor_name(doctor_email_notice, doctor_name)
 
-    patient_name = workflow_case.patient_name or "patient"
+    patient_name = patient_name or "patient"
     tel_digits, wa_digits = clinic_contact_numbers(pro)
     call_link = f"tel:{tel_digits}" if (flags_count > 0 and tel_digits) else ""
     wa_msg = booking_message_for_clinic(patient_name)
@@ -139,6 +148,7 @@ def register_pediatrician(request):
             pro.role = "PEDIATRICIAN"
             pro.unique_doctor_code = generate_doctor_code()
             pro.save()
+            ensure_derivatives(pro)
             clinic_url = request.build_absolute_uri(_clinic_link_path(pro.unique_doctor_code))
             # NEW: send onboarding notifications (SendGrid + optional AiSensy)
             notify_registration(pro, clinic_url)
@@ -162,6 +172,7 @@ def register_caregiver(request):
                 pro.last_name = parts[1]
             pro.unique_doctor_code = generate_doctor_code()
             pro.save()
+            ensure_derivatives(pro)
             clinic_url = request.build_absolute_uri(_clinic_link_path(pro.unique_doctor_code))
             notify_registration(pro, clinic_url)
             return render(request, "content/registration_done.html", {"clinic_url": clinic_url, "pro": pro})
@@ -554,68 +565,9 @@ def parent_language_select(request, code):
     ctx = {"pro": pro, "languages": languages, **JOURNEY_LOCKED_CONTEXT, **white_label_context(pro)}
     return render(request, "content/parent_language_select.html", ctx)
 
-def _build_screening_form(lang_code):
-    questions = list(Question.objects.filter(active=True).order_by("display_order"))
-    fields = []
-    for q in questions:
-        qi = QuestionI18n.objects.get(question=q, lang_id=lang_code)
-        opts = Option.objects.filter(question=q).order_by("display_order")
-        oi = OptionI18n.objects.filter(option__in=opts, lang_id=lang_code)
-        by_option = {x.option_id: x.option_text for x in oi}
-        fields.append({
-            "question_code": q.question_code,
-            "question_text": qi.question_text,
-            "options": [{"code": o.option_code, "text": by_option.get(o.option_code, o.option_code)} for o in opts],
-        })
-    return fields, questions
-
-from .pdf_utils import build_patient_report_pdf_bytes  # add near the top with other imports
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Attachment, FileContent, FileName, FileType, Disposition
-import base64
 from datetime import datetime
 
-
-SIMULATED_EMAIL_BACKENDS = {
-    "django.core.mail.backends.console.EmailBackend",
-    "django.core.mail.backends.locmem.EmailBackend",
-    "django.core.mail.backends.filebased.EmailBackend",
-    "django.core.mail.backends.dummy.EmailBackend",
-}
-
-
-def _smtp_send_report_email(to_email, subject, html, attachments):
-    backend_path = getattr(settings, "EMAIL_BACKEND", "")
-    if backend_path in SIMULATED_EMAIL_BACKENDS:
-        print(f"[Email] EMAIL_BACKEND={backend_path} does not deliver externally; report email not sent.")
-        return False
-
-    try:
-        from django.core.mail import EmailMultiAlternatives
-
-        from_email = (
-            getattr(settings, "DEFAULT_FROM_EMAIL", "")
-            or getattr(settings, "SERVER_EMAIL", "")
-            or "no-reply@emoscreen.local"
-        )
-        message = EmailMultiAlternatives(
-            subject=subject,
-            body="Please see attached report.",
-            from_email=from_email,
-            to=[to_email],
-        )
-        message.attach_alternative(html, "text/html")
-        for filename, payload in attachments:
-            message.attach(filename=filename, content=payload, mimetype="application/pdf")
-        sent = message.send(fail_silently=False)
-        if sent:
-            print(f"[Email] SMTP/backend report email sent to {to_email}")
-            return True
-        print(f"[Email] SMTP/backend returned sent=0 for {to_email}")
-        return False
-    except Exception as exc:
-        print("[Email] SMTP/backend report email error:", exc)
-        return False
+from paid.services.mail_dispatch import OutgoingEmail, send_messages
 
 
 def _send_patient_report_email_only(submission, patient_email, patient_name, parent_phone, rf_labels, request):
@@ -623,6 +575,8 @@ def _send_patient_report_email_only(submission, patient_email, patient_name, par
     if not patient_email:
         return False
 
+    from .pdf_utils import build_patient_report_pdf_bytes
+
     patient_pdf_bytes, patient_pdf_pwd = build_patient_report_pdf_bytes(
         patient_name=patient_name or "",
         parent_phone=parent_phone or "",
@@ -645,39 +599,11 @@ def _send_patient_report_email_only(submission, patient_email, patient_name, par
     subject = "Your EmoScreen Report"
     attachments = [(f"PatientReport_{submission.report_code}.pdf", patient_pdf_bytes)]
 
-    if not settings.SENDGRID_API_KEY:
-        print("[SendGrid] missing SENDGRID_API_KEY; trying configured Django email backend for patient-only report.")
-        return _smtp_send_report_email(patient_email, subject, html, attachments)
-
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        msg = Mail(
-            from_email=Email(settings.DEFAULT_FROM_EMAIL, getattr(settings, "REPORT_FROM_NAME", "EmoScreen")),
-            to_emails=To(patient_email),
-            subject=subject,
-            html_content=html,
-        )
-        att = Attachment(
-            FileContent(base64.b64encode(patient_pdf_bytes).decode()),
-            FileName(f"PatientReport_{submission.report_code}.pdf"),
-            FileType("application/pdf"),
-            Disposition("attachment"),
-        )
-        try:
-            msg.add_attachment(att)
-        except AttributeError:
-            msg.attachments = [att]
-
-        resp = sg.send(msg)
-        print(f"[SendGrid] patient-only status={resp.status_code} (PDF attached).")
-        if 200 <= resp.status_code < 300:
-            Submission.objects.filter(pk=submission.pk).update(email_sent_at=timezone.now())
-            return True
-        print("[SendGrid] patient-only non-success; trying configured Django email backend.")
-        return _smtp_send_report_email(patient_email, subject, html, attachments)
-    except Exception as e:
-        print("SendGrid patient-only error:", e)
-        return _smtp_send_report_email(patient_email, subject, html, attachments)
+    result = send_messages([OutgoingEmail(patient_email, subject, html, attachments)])[0]
+    print(f"[Email] patient-only report via {result.provider}: ok={result.ok} ({result.meta})")
+    if result.ok:
+        Submission.objects.filter(pk=submission.pk).update(email_sent_at=timezone.now())
+    return result.ok
 
 
 @transaction.atomic
@@ -685,7 +611,8 @@ def screening_form(request, code, lang):
     pro = get_object_or_404(RegisteredProfessional, unique_doctor_code=code)
     required_demographics = ["patient_name", "parent_phone", "patient_email", "dob", "gender"]
 
-    fields, questions = _build_screening_form(lang)
+    questions = screening_questions(lang)
+    fields = questions["fields"]
     ui = get_ui_labels(lang)
 
     # NEW: Form title and purpose
@@ -707,18 +634,31 @@ def screening_form(request, code, lang):
     if completed_response:
         return completed_response
 
+    # Issued with the form (GET) and echoed back on POST; a double-tapped Submit replays the stored result.
+    posted_token = (request.POST.get("submission_token") or "")[:64] if request.method == "POST" else ""
+    if posted_token:
+        replayed = (
+            Submission.objects.filter(idempotency_key=posted_token, professional__unique_doctor_code=code)
+            .select_related("professional")
+            .first()
+        )
+        if replayed:
+            return _legacy_result_page(request, replayed, request.POST.get("patient_name", ""), fallback_lang=lang)
+    submission_token = posted_token or secrets.token_urlsafe(32)
+
     if request.method == "POST":
         missing = [k for k in required_demographics if not request.POST.get(k)]
         missing += [f["question_code"] for f in fields if not request.POST.get(f["question_code"])]
         if missing:
             ctx = {
                 "error": "Please fill all required fields.",
-                "fields": fields,
+                "questions_html": questions["html"],
                 "lang": lang,
                 "pro": pro,
                 "ui": ui,
                 "form_title": form_title,
                 "form_purpose": form_purpose,
+                "submission_token": submission_token,
                 **JOURNEY_LOCKED_CONTEXT,
                 **white_label_context(pro),
             }
@@ -732,12 +672,13 @@ def screening_form(request, code, lang):
         except ValidationError:
             ctx = {
                 "error": "Please enter a valid email address.",
-                "fields": fields,
+                "questions_html": questions["html"],
                 "lang": lang,
                 "pro": pro,
                 "ui": ui,
                 "form_title": form_title,
                 "form_purpose": form_purpose,
+                "submission_token": submission_token,
                 **JOURNEY_LOCKED_CONTEXT,
                 **white_label_context(pro)
             }
@@ -774,13 +715,30 @@ def screening_form(request, code, lang):
         flags_count = len(flags)
 
         report_code = generate_report_code()
-        submission = Submission.objects.create(
-            report_code=report_code,
-            professional=pro,
-            lang_id=lang,
-            flags_count=flags_count,
-            email_to=pro.email,
-        )
+        try:
+            # Savepoint: a concurrent POST with the same token loses on the unique key, not on a race.
+            with transaction.atomic():
+                submission = Submission.objects.create(
+                    report_code=report_code,
+                    professional=pro,
+                    lang_id=lang,
+                    flags_count=flags_count,
+                    email_to=pro.email,
+                    idempotency_key=posted_token or None,
+                )
+        except IntegrityError:
+            if not posted_token:
+                raise
+            # Locking read: sees the winner's committed row even inside this transaction's snapshot.
+            replayed = (
+                Submission.objects.select_for_update()
+                .select_related("professional")
+                .filter(idempotency_key=posted_token, professional__unique_doctor_code=code)
+                .first()
+            )
+            if replayed is None:
+                raise  # the token belongs to another clinic's submission; never replay it here
+            return _legacy_result_page(request, replayed, patient_name, fallback_lang=lang)
 
         for opt in options:
             SubmissionAnswer.objects.create(
@@ -823,9 +781,19 @@ def screening_form(request, code, lang):
                 request,
             )
         else:
-            # DOCTOR FLOW (existing behavior)
+            # DOCTOR FLOW: doctor copy (only with red flags) and patient copy go out as one batch.
+            # Both carry the same patient PDF, so it is rendered once.
+            from .pdf_utils import build_patient_report_pdf_bytes
+
+            patient_pdf_bytes, _patient_pdf_pwd = build_patient_report_pdf_bytes(
+                patient_name=patient_name or "",
+                parent_phone=parent_phone or "",
+                report_code=report_code,
+                rf_labels=list(rf_labels or []),
+            )
+            messages = []
             if flags_count > 0:
-                doctor_email_sent = _send_doctor_report_email(
+                messages.append(_doctor_report_message(
                     submission,
                     pro,
                     lang,
@@ -834,17 +802,27 @@ def screening_form(request, code, lang):
                     patient_name,
                     parent_phone,
                     request,
-                )
+                    patient_pdf_bytes=patient_pdf_bytes,
+                ))
 
             # Patient email still sent in doctor flow
-            patient_email_sent = _send_patient_report_email(
+            messages.append(_patient_report_message(
                 to_email=patient_email,
                 patient_name=patient_name,
                 parent_phone=parent_phone,
                 report_code=report_code,
                 rf_labels=rf_labels,
                 request=request,
-            )
+                pdf_bytes=patient_pdf_bytes,
+            ))
+            results = send_messages(messages)
+            for result in results:
+                print(f"[Email] report to {result.message.to_email} via {result.provider}: ok={result.ok} ({result.meta})")
+            patient_email_sent = results[-1].ok
+            if flags_count > 0:
+                doctor_email_sent = results[0].ok
+                if doctor_email_sent:
+                    Submission.objects.filter(pk=submission.pk).update(email_sent_at=timezone.now())
         # ----------------------------------------------------
         # END NEW BRANCH
         # ----------------------------------------------------
@@ -865,27 +843,28 @@ def screening_form(request, code, lang):
                         patient_status="SENT" if patient_email_sent else "FAILED",
                         doctor_status="SENT" if doctor_email_sent else "FAILED",
                     )
-                audit.record_delivery(
-                    workflow_case,
-                    channel="EMAIL",
-                    recipient=patient_email,
-                    subject="Your EmoScreen Report",
-                    status="SENT" if patient_email_sent else "FAILED",
-                    provider="sendgrid" if settings.SENDGRID_API_KEY else "django-email-backend",
-                    error_text="" if patient_email_sent else "Report email was not delivered. Check SENDGRID_API_KEY or SMTP EMAIL_* settings.",
-                    metadata={"email_type": "LEGACY_PATIENT_REPORT", "report_code": report_code},
-                )
+                deliveries = [{
+                    "case": workflow_case,
+                    "channel": "EMAIL",
+                    "recipient": patient_email,
+                    "subject": "Your EmoScreen Report",
+                    "status": "SENT" if patient_email_sent else "FAILED",
+                    "provider": "sendgrid" if settings.SENDGRID_API_KEY else "django-email-backend",
+                    "error_text": "" if patient_email_sent else "Report email was not delivered. Check SENDGRID_API_KEY or SMTP EMAIL_* settings.",
+                    "metadata": {"email_type": "LEGACY_PATIENT_REPORT", "report_code": report_code},
+                }]
                 if pro.unique_doctor_code != public_code and flags_count > 0:
-                    audit.record_delivery(
-                        workflow_case,
-                        channel="EMAIL",
-                        recipient=pro.email,
-                        subject=f"Red Flags report for {patient_name or 'patient'}",
-                        status="SENT" if doctor_email_sent else "FAILED",
-                        provider="sendgrid" if settings.SENDGRID_API_KEY else "django-email-backend",
-                        error_text="" if doctor_email_sent else "Doctor report email was not delivered. Check SENDGRID_API_KEY or SMTP EMAIL_* settings.",
-                        metadata={"email_type": "LEGACY_DOCTOR_REPORT", "report_code": report_code},
-                    )
+                    deliveries.append({
+                        "case": workflow_case,
+                        "channel": "EMAIL",
+                        "recipient": pro.email,
+                        "subject": f"Red Flags report for {patient_name or 'patient'}",
+                        "status": "SENT" if doctor_email_sent else "FAILED",
+                        "provider": "sendgrid" if settings.SENDGRID_API_KEY else "django-email-backend",
+                        "error_text": "" if doctor_email_sent else "Doctor report email was not delivered. Check SENDGRID_API_KEY or SMTP EMAIL_* settings.",
+                        "metadata": {"email_type": "LEGACY_DOCTOR_REPORT", "report_code": report_code},
+                    })
+                audit.record_deliveries(deliveries)
         except Exception as exc:
             print("Workflow audit error (screen submit):", exc)
 
@@ -937,12 +916,13 @@ def screening_form(request, code, lang):
 
     # GET branch
     ctx = {
-        "fields": fields,
+        "questions_html": questions["html"],
         "lang": lang,
         "pro": pro,
         "ui": ui,
         "form_title": form_title,
         "form_purpose": form_purpose,
+        "submission_token": submission_token,
         **JOURNEY_LOCKED_CONTEXT,
         **white_label_context(pro),
     }
@@ -951,12 +931,12 @@ def screening_form(request, code, lang):
 
 
 # content/views.py  (drop-in replacement for _send_doctor_report_email)
-def _send_doctor_report_email(submission, pro, lang, rf_labels, education_links, patient_name, parent_phone, request):
-    """Build and send doctor report (SendGrid) with two password-protected PDF attachments."""
-    import base64
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, Email, To, Attachment, FileContent, FileName, FileType, Disposition
-
+def _doctor_report_message(submission, pro, lang, rf_labels, education_links, patient_name, parent_phone, request,
+                           patient_pdf_bytes=None):
+    """
+    Build the doctor report email with two password-protected PDF attachments.
+    Pass patient_pdf_bytes when the patient PDF is already rendered (it is the same file the patient gets).
+    """
     from .utils import ADVISE_PATIENT_TEXT, whatsapp_link, normalize_phone
     from .pdf_utils import build_doctor_report_pdf_bytes, build_patient_report_pdf_bytes
     from datetime import datetime
@@ -1027,79 +1007,49 @@ def _send_doctor_report_email(submission, pro, lang, rf_labels, education_links,
     education_links=education_links,   # <— pass the links here
     )
 
-    patient_pdf_bytes, patient_pdf_pwd = build_patient_report_pdf_bytes(
-        patient_name=patient_name or "",
-        parent_phone=parent_phone or "",
-        report_code=submission.report_code,
-        rf_labels=rf_labels,
-    )
+    if patient_pdf_bytes is None:
+        patient_pdf_bytes, patient_pdf_pwd = build_patient_report_pdf_bytes(
+            patient_name=patient_name or "",
+            parent_phone=parent_phone or "",
+            report_code=submission.report_code,
+            rf_labels=rf_labels,
+        )
     subject = f"Red Flags report for {patient_name or 'patient'}"
     attachments = [
         (f"DoctorReport_{submission.report_code}.pdf", doctor_pdf_bytes),
         (f"PatientReport_{submission.report_code}.pdf", patient_pdf_bytes),
     ]
-    if not settings.SENDGRID_API_KEY:
-        print("[SendGrid] missing SENDGRID_API_KEY; trying configured Django email backend for doctor report.")
-        return _smtp_send_report_email(pro.email, subject, html, attachments)
+    return OutgoingEmail(pro.email, subject, html, attachments)
 
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        msg = Mail(
-            from_email=Email(settings.DEFAULT_FROM_EMAIL, settings.REPORT_FROM_NAME),
-            to_emails=To(pro.email),
-            subject=subject,
-            html_content=html,
-        )
-        att1 = Attachment(
-            FileContent(base64.b64encode(doctor_pdf_bytes).decode()),
-            FileName(f"DoctorReport_{submission.report_code}.pdf"),
-            FileType("application/pdf"),
-            Disposition("attachment"),
-        )
-        att2 = Attachment(
-            FileContent(base64.b64encode(patient_pdf_bytes).decode()),
-            FileName(f"PatientReport_{submission.report_code}.pdf"),
-            FileType("application/pdf"),
-            Disposition("attachment"),
-        )
-        try:
-            msg.add_attachment(att1)
-            msg.add_attachment(att2)
-        except AttributeError:
-            msg.attachments = [att1, att2]
-
-        resp = sg.send(msg)
-        print(f"[SendGrid] status={resp.status_code} (PDFs attached). DoctorPDFPwd={doctor_pdf_pwd} PatientPDFPwd={patient_pdf_pwd}")
-        from .models import Submission
-        if 200 <= resp.status_code < 300:
-            Submission.objects.filter(pk=submission.pk).update(email_sent_at=timezone.now())
-            return True
-        print("[SendGrid] doctor report non-success; trying configured Django email backend.")
-        return _smtp_send_report_email(pro.email, subject, html, attachments)
-    except Exception as e:
-        print("SendGrid error:", e)
-        return _smtp_send_report_email(pro.email, subject, html, attachments)
 
-def _send_patient_report_email(to_email: str, patient_name: str, parent_phone: str,
-                               report_code: str, rf_labels, request):
+def _send_doctor_report_email(submission, pro, lang, rf_labels, education_links, patient_name, parent_phone, request):
+    """Build and send doctor report (SendGrid, Django email backend as fallback)."""
+    message = _doctor_report_message(submission, pro, lang, rf_labels, education_links, patient_name, parent_phone, request)
+    result = send_messages([message])[0]
+    print(f"[Email] doctor report via {result.provider}: ok={result.ok} ({result.meta})")
+    if result.ok:
+        Submission.objects.filter(pk=submission.pk).update(email_sent_at=timezone.now())
+    return result.ok
+
+
+def _patient_report_message(to_email: str, patient_name: str, parent_phone: str,
+                            report_code: str, rf_labels, request, pdf_bytes=None):
     """
-    Email ONLY the patient PDF to the patient's email.
+    Build the email carrying ONLY the patient PDF, for the patient's email.
     PDF is password-protected: first 4 letters of patient’s name + last 4 digits of parent’s WhatsApp.
     """
-    import base64
     from datetime import datetime
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, Email, To, Attachment, FileContent, FileName, FileType, Disposition
 
     from .pdf_utils import build_patient_report_pdf_bytes
 
     # Build the dynamic, encrypted Patient PDF
-    pdf_bytes, pdf_pwd = build_patient_report_pdf_bytes(
-        patient_name=patient_name or "",
-        parent_phone=parent_phone or "",
-        report_code=report_code,
-        rf_labels=list(rf_labels or []),
-    )
+    if pdf_bytes is None:
+        pdf_bytes, pdf_pwd = build_patient_report_pdf_bytes(
+            patient_name=patient_name or "",
+            parent_phone=parent_phone or "",
+            report_code=report_code,
+            rf_labels=list(rf_labels or []),
+        )
 
     # Simple patient-facing email body
     flags_html = ""
@@ -1123,38 +1073,16 @@ def _send_patient_report_email(to_email: str, patient_name: str, parent_phone: s
     subject = f"Your Emoscreen report ({report_code})"
     attachments = [(f"YourReport_{report_code}.pdf", pdf_bytes)]
 
-    if not settings.SENDGRID_API_KEY:
-        print("[SendGrid] missing SENDGRID_API_KEY; trying configured Django email backend for patient report.")
-        return _smtp_send_report_email(to_email, subject, html, attachments)
+    return OutgoingEmail(to_email, subject, html, attachments)
 
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        msg = Mail(
-            from_email=Email(settings.DEFAULT_FROM_EMAIL, settings.REPORT_FROM_NAME),
-            to_emails=To(to_email),
-            subject=subject,
-            html_content=html,
-        )
-        att = Attachment(
-            FileContent(base64.b64encode(pdf_bytes).decode()),
-            FileName(f"YourReport_{report_code}.pdf"),
-            FileType("application/pdf"),
-            Disposition("attachment"),
-        )
-        try:
-            msg.add_attachment(att)
-        except AttributeError:
-            msg.attachments = [att]
 
-        resp = sg.send(msg)
-        print(f"[SendGrid] patient status={resp.status_code} (patient PDF attached).")
-        if 200 <= resp.status_code < 300:
-            return True
-        print("[SendGrid] patient report non-success; trying configured Django email backend.")
-        return _smtp_send_report_email(to_email, subject, html, attachments)
-    except Exception as e:
-        print("[SendGrid] patient email error:", e)
-        return _smtp_send_report_email(to_email, subject, html, attachments)
+def _send_patient_report_email(to_email: str, patient_name: str, parent_phone: str,
+                               report_code: str, rf_labels, request):
+    """Email ONLY the patient PDF to the patient's email."""
+    message = _patient_report_message(to_email, patient_name, parent_phone, report_code, rf_labels, request)
+    result = send_messages([message])[0]
+    print(f"[Email] patient report via {result.provider}: ok={result.ok} ({result.meta})")
+    return result.ok
 
 
 
@@ -1177,21 +1105,37 @@ def view_result(request, report_code):
     return render(request, "content/result_readonly.html", ctx)
 
 
-from django.shortcuts import render, get_object_or_404
-from .models import RedFlag, DoctorEducation, RedFlagI18n
+from urllib.parse import urlencode
 
-def education_page(request, slug):
-    rf = get_object_or_404(RedFlag, education_url_slug=slug)
-    de = get_object_or_404(DoctorEducation, red_flag=rf, lang_id="en")
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
 
-    rf_i18n = RedFlagI18n.objects.filter(red_flag=rf, lang_id="en").first()
-    rf_title = rf_i18n.parent_label if rf_i18n else rf.red_flag_code
+from . import education
 
-    return render(request, "content/education_page.html", {
-        "rf": rf,
-        "de": de,
-        "rf_title": rf_title,
-    })
+def education_page(request, slug):
+    # Links in reports carry the report's language; content falls back to English.
+    lang = request.GET.get("lang") or education.FALLBACK_LANG
+    if not re.fullmatch(r"[A-Za-z_-]{1,16}", lang):
+        lang = education.FALLBACK_LANG
+    entry = education.page_entry(slug, lang)
+    if entry is None:
+        raise Http404("No education page for this red flag")
+
+    response = get_conditional_response(request, etag=entry["etag"], last_modified=entry["last_modified"])
+    if response is None:
+        response = render(request, "content/education_page.html", {
+            "rf_title": entry["title"],
+            "education_html": mark_safe(entry["html"]),
+            "reference_1": entry["reference_1"],
+            "reference_2": entry["reference_2"],
+            "lang": entry["lang"],
+        })
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_cache_control(response, public=True, max_age=getattr(settings, "EDUCATION_PAGE_MAX_AGE", 86400))
+    return response
 
 
 
@@ -1416,6 +1360,7 @@ def bulk_doctor_upload(request):
                     pass
 
                 pro.save()
+                ensure_derivatives(pro)
 
                 # Build clinic link and notify (email + AiSensy)
                 clinic_url = _make_clinic_url(request, pro.unique_doctor_code)
@@ -1509,7 +1454,7 @@ def _aligned_rf_labels_and_links(rf_ids, lang, request):
     rf_labels = [labels_by_id.get(rf, rf) for rf in rf_ids]
     education_links = [
         request.build_absolute_uri(
-            reverse("content:education_page", args=[slugs_by_id.get(rf, "")])
+            reverse("content:education_page", args=[slugs_by_id.get(rf, "")]) + "?" + urlencode({"lang": lang})
         ) for rf in rf_ids
         if slugs_by_id.get(rf, "")
     ]
@@ -1556,6 +1501,7 @@ from datetime import datetime, timedelta
 from django.utils import timezone
 from django.http import HttpResponse, Http404
 from django.contrib.admin.views.decorators import staff_member_required
+from emoscreen.db_router import replica_reads
 
 from .forms import ReportFilterForm
 from .models import RegisteredProfessional, Submission
@@ -1655,6 +1601,7 @@ def _csv_filename(category):
     return f"{category}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
 
 @staff_member_required
+@replica_reads
 def reports_dashboard(request):
     """
     Admin dashboard with totals and optional detail tables.
@@ -1732,6 +1679,7 @@ def reports_dashboard(request):
     return render(request, "content/admin_reports.html", ctx)
 
 @staff_member_required
+@replica_reads
 def reports_export(request):
     """
     CSV download. Accepts category + optional date_from/date_to + optional quick=24h.
@@ -1809,6 +1757,16 @@ def share_landing(request, code):
     ctx = {"pro": pro, "error": error, **JOURNEY_LOCKED_CONTEXT, **white_label_context(pro)}
     return render(request, "content/share_landing.html", ctx)
 
+def _qr_svg_bytes(url: str) -> bytes:
+    # qrcode is imported on the first QR request rather than with the URLconf.
+    import qrcode
+    from qrcode.image.svg import SvgImage
+
+    img = qrcode.make(url, image_factory=SvgImage, box_size=10, border=2)
+    buf = io.BytesIO()
+    img.save(buf)
+    return buf.getvalue()
+
 def doctor_qr_svg(request, code):
     """
     Returns an SVG QR that encodes the public share URL (/share/<code>/).
@@ -1826,11 +1784,9 @@ def doctor_qr_svg(request, code):
         reverse("content:share_landing", args=[code])
     )
 
-    img = qrcode.make(share_url, image_factory=SvgImage, box_size=10, border=2)
-    buf = io.BytesIO()
-    img.save(buf)
+    svg = _qr_svg_bytes(share_url)
 
-    resp = HttpResponse(buf.getvalue(), content_type="image/svg+xml")
+    resp = HttpResponse(svg, content_type="image/svg+xml")
 
     # Keep download behavior from original version
     if request.GET.get("download"):
@@ -1898,10 +1854,8 @@ def global_start(request):
 def global_qr_svg(request):
     """Permanent QR that encodes the absolute /start/ URL."""
     url = request.build_absolute_uri(reverse("content:global_start"))
-    img = qrcode.make(url, image_factory=SvgImage, box_size=10, border=2)
-    buf = io.BytesIO()
-    img.save(buf)
-    resp = HttpResponse(buf.getvalue(), content_type="image/svg+xml")
+    svg = _qr_svg_bytes(url)
+    resp = HttpResponse(svg, content_type="image/svg+xml")
     if request.GET.get("download"):
         resp["Content-Disposition"] = 'attachment; filename="EmoScreen_Global_QR.svg"'
     return resp
@@ -1981,10 +1935,8 @@ def universal_entry(request):
 def self_qr_svg(request):
     """Permanent QR that encodes /start/self/."""
     url = request.build_absolute_uri(reverse("content:self_start"))
-    img = qrcode.make(url, image_factory=SvgImage, box_size=10, border=2)
-    buf = io.BytesIO()
-    img.save(buf)
-    resp = HttpResponse(buf.getvalue(), content_type="image/svg+xml")
+    svg = _qr_svg_bytes(url)
+    resp = HttpResponse(svg, content_type="image/svg+xml")
     if request.GET.get("download"):
         resp["Content-Disposition"] = 'attachment; filename="EmoScreen_Self_QR.svg"'
     return resp
@@ -0,0 +1,101 @@
+"""
+Primary/replica routing.
+
+Writes always go to "default". Reads go to "replica" only inside
+replica_reads()/use_replica() (staff dashboards and CSV exports) and only when
+a "replica" alias is configured, so a single-database deployment behaves
+exactly as before.
+
+Read-your-writes: once a request writes, the rest of it reads from the
+primary, and ReplicaStickinessMiddleware keeps the browser on the primary for
+DB_REPLICA_STICKY_SECONDS after any POST (cookie, no session write).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+_replica_reads = ContextVar("db_replica_reads", default=False)
+_primary_only = ContextVar("db_primary_only", default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view_func):
+    """Route the view's reads to the replica. Put it under @staff_member_required so the auth check reads the primary."""
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        with use_replica():
+            return view_func(request, *args, **kwargs)
+
+    return _wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _primary_only.get() or not replica_configured():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _primary_only.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary; schema changes reach it through replication.
+        return db != REPLICA_ALIAS
+
+
+class ReplicaStickinessMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        token = _primary_only.set(sticky)
+        try:
+            response = self.get_response(request)
+        finally:
+            _primary_only.reset(token)
+
+        if request.method not in SAFE_METHODS and replica_configured():
+            seconds = getattr(settings, "DB_REPLICA_STICKY_SECONDS", 15)
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
@@ -88,10 +88,14 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "emoscreen.db_router.ReplicaStickinessMiddleware",
+    "paid.middleware.IdentityMapMiddleware",
 ]
 
 ROOT_URLCONF = "emoscreen.urls"
 WSGI_APPLICATION = "emoscreen.wsgi.application"
+# `manage.py import_profile` fails when a cold import of the WSGI app + URLconf takes longer (0 = report only).
+IMPORT_TIME_BUDGET_MS = int_env("IMPORT_TIME_BUDGET_MS", 350)
 
 # --------------------------------------------------
 # Templates
@@ -113,6 +117,16 @@ TEMPLATES = [{
     },
 }]
 
+# Rendered question block of the legacy screening form per (language, catalog version),
+# kept in the default cache (content.screening_cache); 0 disables.
+SCREENING_FORM_CACHE_SECONDS = int_env("SCREENING_FORM_CACHE_SECONDS", 86400)
+# How long the catalog fingerprint is trusted before being recomputed from the database.
+SCREENING_CATALOG_VERSION_SECONDS = int_env("SCREENING_CATALOG_VERSION_SECONDS", 300)
+
+# Doctor education pages (content.education): per-slug server cache, and the browser/CDN max-age.
+EDUCATION_PAGE_CACHE_SECONDS = int_env("EDUCATION_PAGE_CACHE_SECONDS", 3600)
+EDUCATION_PAGE_MAX_AGE = int_env("EDUCATION_PAGE_MAX_AGE", 86400)
+
 # --------------------------------------------------
 # Database
 # --------------------------------------------------
@@ -120,16 +134,34 @@ TEMPLATES = [{
 DB_ENGINE = os.getenv("DB_ENGINE", "sqlite" if not os.getenv("DB_NAME") else "mysql").lower()
 SQLITE_PATH = os.getenv("SQLITE_PATH", "db.sqlite3")
 
+SQLITE_REPLICA_PATH = os.getenv("SQLITE_REPLICA_PATH", "")
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+
+# Persistent connections; the health check re-opens a connection the server dropped.
+DB_CONN_MAX_AGE = int_env("DB_CONN_MAX_AGE", 60)
+DB_CONN_HEALTH_CHECKS = bool_env("DB_CONN_HEALTH_CHECKS", True)
+
+
+def sqlite_path(raw):
+    name = Path(raw)
+    return name if name.is_absolute() else BASE_DIR / name
+
+
 if DB_ENGINE == "sqlite":
-    sqlite_name = Path(SQLITE_PATH)
-    if not sqlite_name.is_absolute():
-        sqlite_name = BASE_DIR / sqlite_name
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
-            "NAME": sqlite_name,
+            "NAME": sqlite_path(SQLITE_PATH),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
         }
     }
+    if SQLITE_REPLICA_PATH:
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": sqlite_path(SQLITE_REPLICA_PATH),
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     DATABASES = {
         "default": {
@@ -139,12 +171,30 @@ else:
             "PASSWORD": os.getenv("DB_PASSWORD"),
             "HOST": os.getenv("DB_HOST"),
             "PORT": os.getenv("DB_PORT", "3306"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
             "OPTIONS": {
                 "charset": "utf8mb4",
                 "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
             },
         }
     }
+    if DB_REPLICA_HOST:
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": os.getenv("DB_REPLICA_NAME", os.getenv("DB_NAME")),
+            "USER": os.getenv("DB_REPLICA_USER", os.getenv("DB_USER")),
+            "PASSWORD": os.getenv("DB_REPLICA_PASSWORD", os.getenv("DB_PASSWORD")),
+            "HOST": DB_REPLICA_HOST,
+            "PORT": os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT", "3306")),
+            "TEST": {"MIRROR": "default"},
+        }
+
+# Staff dashboards/exports read from "replica" when it is configured. After a
+# POST the browser reads from the primary for DB_REPLICA_STICKY_SECONDS so it
+# sees its own writes despite replication lag.
+DATABASE_ROUTERS = ["emoscreen.db_router.ReplicaRouter"]
+DB_REPLICA_STICKY_SECONDS = int_env("DB_REPLICA_STICKY_SECONDS", 15)
 
 # --------------------------------------------------
 # Static / Media
@@ -153,16 +203,65 @@ else:
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+# collectstatic writes content-hashed names plus .gz/.br variants (emoscreen.static_files).
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "emoscreen.static_files.CompressedManifestStaticFilesStorage"},
+}
+# Serve STATIC_ROOT from Django (precompressed, immutable hashed names) when no proxy handles /static/.
+SERVE_STATIC = bool_env("SERVE_STATIC", False)
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Larger profile photo uploads are rejected; accepted ones are re-encoded (content.profile_photos).
+PROFILE_PHOTO_MAX_UPLOAD_MB = int_env("PROFILE_PHOTO_MAX_UPLOAD_MB", 10)
 
 # --------------------------------------------------
 # Report Templates
 # --------------------------------------------------
 
-DOCTOR_REPORT_TEMPLATE_PATH = BASE_DIR / "content" / "assets" / "DoctorReportBehaviorForm_unlocked.pdf"
-PATIENT_REPORT_TEMPLATE_PATH = BASE_DIR / "content" / "assets" / "PatientReportBehaviorForm_unlocked.pdf"
+# Blank report PDFs for LEGACY_REPORT_RENDERER=template. There is no default: the PDFs in
+# content/assets/ are filled sample reports and are rejected.
+DOCTOR_REPORT_TEMPLATE_PATH = os.getenv("DOCTOR_REPORT_TEMPLATE_PATH", "")
+PATIENT_REPORT_TEMPLATE_PATH = os.getenv("PATIENT_REPORT_TEMPLATE_PATH", "")
+# "template" stamps the legacy reports onto the PDFs above (content.pdf_utils), falling back
+# to "canvas" (draw everything) when a template is unreadable or the red flags do not fit.
+# Without both paths the mode refuses to run and the content.W002 check warns.
+LEGACY_REPORT_RENDERER = os.getenv("LEGACY_REPORT_RENDERER", "canvas").lower()
+# Noto Sans TTFs for non-Latin red-flag labels (content.pdf_fonts); Latin text stays Helvetica.
+PDF_FONT_DIR = Path(os.getenv("PDF_FONT_DIR", BASE_DIR / "content" / "assets" / "fonts"))
+# Missing fonts are a system-check warning (content.W001); set true to make them an error
+# (content.E001), as scripts/deploy.sh does after `manage.py fetch_pdf_fonts`.
+PDF_FONTS_REQUIRED = bool_env("PDF_FONTS_REQUIRED", False)
+
+# Paid submissions are scored, rendered and emailed by the finalize_submissions worker (scripts/systemd).
+# Local development without the worker: set true to run the stages in the submit request after it commits.
+PAID_FINALIZE_INLINE = bool_env("PAID_FINALIZE_INLINE", False)
+
+# --------------------------------------------------
+# Report Storage
+# --------------------------------------------------
+
+# Where paid report PDFs live (paid.services.report_storage): "local" files under
+# REPORT_STORAGE_ROOT (empty = MEDIA_ROOT/paid_reports) or "s3" for an S3-compatible bucket.
+REPORT_STORAGE_BACKEND = os.getenv("REPORT_STORAGE_BACKEND", "local").lower()
+REPORT_STORAGE_ROOT = os.getenv("REPORT_STORAGE_ROOT", "")
+
+REPORT_S3_BUCKET = os.getenv("REPORT_S3_BUCKET", "")
+# Empty for AWS; e.g. http://127.0.0.1:9000 for MinIO or another S3-compatible server.
+REPORT_S3_ENDPOINT_URL = os.getenv("REPORT_S3_ENDPOINT_URL", "")
+REPORT_S3_REGION = os.getenv("REPORT_S3_REGION", "us-east-1")
+REPORT_S3_ACCESS_KEY_ID = os.getenv("REPORT_S3_ACCESS_KEY_ID", "")
+REPORT_S3_SECRET_ACCESS_KEY = os.getenv("REPORT_S3_SECRET_ACCESS_KEY", "")
+REPORT_S3_PREFIX = os.getenv("REPORT_S3_PREFIX", "paid_reports/")
+# Lifetime in seconds of the presigned URLs downloads redirect to.
+REPORT_S3_URL_EXPIRY = int_env("REPORT_S3_URL_EXPIRY", 300)
+
+# Local downloads: "" streams from Django, "nginx" answers with X-Accel-Redirect to
+# REPORT_ACCEL_PREFIX + key (an `internal` location aliased to the storage root),
+# "sendfile" with X-Sendfile (Apache mod_xsendfile, lighttpd).
+REPORT_DOWNLOAD_OFFLOAD = os.getenv("REPORT_DOWNLOAD_OFFLOAD", "").lower()
+REPORT_ACCEL_PREFIX = os.getenv("REPORT_ACCEL_PREFIX", "/protected/paid_reports/")
 
 # --------------------------------------------------
 # Email / SendGrid
@@ -184,6 +283,10 @@ EMAIL_USE_TLS = bool_env("EMAIL_USE_TLS", True)
 EMAIL_USE_SSL = bool_env("EMAIL_USE_SSL", False)
 SERVER_EMAIL = os.getenv("SERVER_EMAIL", DEFAULT_FROM_EMAIL)
 
+# paid.services.mail_dispatch sends distinct messages of a batch concurrently.
+MAIL_DISPATCH_MAX_WORKERS = int_env("MAIL_DISPATCH_MAX_WORKERS", 4)
+MAIL_DISPATCH_TIMEOUT = int_env("MAIL_DISPATCH_TIMEOUT", 30)
+
 # --------------------------------------------------
 # Payments
 # --------------------------------------------------
@@ -207,6 +310,10 @@ RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "")
 RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
 
+# Stored webhook events are applied by the process_razorpay_webhooks worker (scripts/systemd).
+# Local development without the worker: set true to apply them in the webhook request before it is acknowledged.
+RAZORPAY_WEBHOOK_INLINE = bool_env("RAZORPAY_WEBHOOK_INLINE", False)
+
 # --------------------------------------------------
 # AiSensy
 # --------------------------------------------------
@@ -222,6 +329,27 @@ AISENSY_PAID_ASSESSMENT_CAMPAIGN_NAME = os.getenv(
 )
 AISENSY_PAID_ASSESSMENT_PARAM_COUNT = int_env("AISENSY_PAID_ASSESSMENT_PARAM_COUNT", 2)
 
+# --------------------------------------------------
+# Outbound HTTP (SendGrid / AiSensy / Razorpay)
+# --------------------------------------------------
+
+# Shared by content.outbound. Read timeouts are per provider; see PROVIDERS there.
+OUTBOUND_CONNECT_TIMEOUT = float(os.getenv("OUTBOUND_CONNECT_TIMEOUT", "3.05"))
+OUTBOUND_MAX_RETRIES = int_env("OUTBOUND_MAX_RETRIES", 2)
+OUTBOUND_BREAKER_THRESHOLD = int_env("OUTBOUND_BREAKER_THRESHOLD", 5)
+OUTBOUND_BREAKER_RESET_SECONDS = int_env("OUTBOUND_BREAKER_RESET_SECONDS", 30)
+
+# --------------------------------------------------
+# Workflow support dashboard
+# --------------------------------------------------
+
+# Seconds to cache the dashboard counters per filter set (uses the default cache); 0 disables.
+WORKFLOW_DASHBOARD_STATS_CACHE_SECONDS = int_env("WORKFLOW_DASHBOARD_STATS_CACHE_SECONDS", 30)
+
+# archive_workflow_history writes old events/delivery attempts here as .jsonl.gz files.
+WORKFLOW_ARCHIVE_DIR = Path(os.getenv("WORKFLOW_ARCHIVE_DIR", str(BASE_DIR / "archives" / "workflow")))
+WORKFLOW_ARCHIVE_AFTER_DAYS = int_env("WORKFLOW_ARCHIVE_AFTER_DAYS", 180)
+
 # --------------------------------------------------
 # Public Self Screen Defaults
 # --------------------------------------------------
@@ -0,0 +1,152 @@
+# emoscreen/static_files.py
+"""
+Static assets: content-hashed, precompressed at collectstatic, cached forever.
+
+CompressedManifestStaticFilesStorage is the STORAGES["staticfiles"] backend.
+On top of Django's manifest storage (app.css -> app.3f2a9c1e4b7d.css, with
+url() references in CSS rewritten) it writes a .gz and, when the Brotli
+package is installed, a .br next to every compressible file, keeping a
+variant only if it is actually smaller. Compression happens once per deploy
+in `collectstatic`, not per request.
+
+serve_static() serves STATIC_ROOT from the app for deployments without a
+front proxy on /static/ (SERVE_STATIC=true). It picks the .br/.gz variant the
+client accepts, sends `Vary: Accept-Encoding` and ETag/Last-Modified, and marks
+names listed in the manifest `immutable` for a year; anything else must
+revalidate. With nginx in front, `gzip_static on; brotli_static on;` and an
+`expires max` on /static/ do the same from the files collectstatic wrote.
+
+Templates keep working before collectstatic has run (local DEBUG=False runs,
+benchmarks): a name missing from the manifest falls back to its plain URL.
+`manage.py static_transfer_report` totals the bytes a first visit transfers
+before and after compression.
+"""
+from __future__ import annotations
+
+import gzip
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage,
+    StaticFilesStorage,
+    staticfiles_storage,
+)
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# Already compressed formats gain nothing from another pass.
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".html", ".txt", ".xml", ".ico", ".ttf", ".otf", ".eot",
+}
+MIN_COMPRESS_BYTES = 256
+# Preference order when the client accepts several.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+ZERO_Q_RE = re.compile(r"q=0(?:\.0{0,3})?")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress_variants(data: bytes) -> dict[str, bytes]:
+    """{suffix: bytes} for the encodings that make data smaller."""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        if _brotli() is None:
+            logger.warning("brotli is not installed; static files get .gz variants only.")
+        # Both names are served: templates use the hashed one, hand-written URLs the plain one.
+        for name in sorted(set(self.hashed_files) | set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+                continue
+            with self.open(name) as handle:
+                data = handle.read()
+            if len(data) < MIN_COMPRESS_BYTES:
+                continue
+            for suffix, blob in compress_variants(data).items():
+                with open(self.path(name + suffix), "wb") as out:
+                    out.write(blob)
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            # Not in the manifest (collectstatic has not run here): serve the plain name.
+            return StaticFilesStorage.url(self, name)
+
+
+@lru_cache(maxsize=1)
+def _immutable_names() -> frozenset[str]:
+    # The manifest is read once per process; a deploy restarts the workers.
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+def _accepts(header: str, coding: str) -> bool:
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        if token.strip().lower() in (coding, "*"):
+            return not ZERO_Q_RE.fullmatch(params.replace(" ", "").lower())
+    return False
+
+
+def serve_static(request, path):
+    name = posixpath.normpath(path).lstrip("/")
+    if name.startswith("..") or os.path.splitext(name)[1] in {".gz", ".br"}:
+        raise Http404("Not found")
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("Not found")
+
+    served, encoding = fullpath, ""
+    accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    for coding, suffix in ENCODINGS:
+        if _accepts(accept, coding) and os.path.isfile(fullpath + suffix):
+            served, encoding = fullpath + suffix, coding
+            break
+
+    stat = os.stat(served)
+    # Each encoding is its own representation, so it gets its own validator.
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{encoding and "-" + encoding}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type, _ = mimetypes.guess_type(fullpath)
+        response = FileResponse(open(served, "rb"), content_type=content_type or "application/octet-stream")
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if name in _immutable_names() else REVALIDATE_CACHE_CONTROL
+    )
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
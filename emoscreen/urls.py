@@ -1,10 +1,11 @@
 # emoscreen/urls.py
 from django.contrib import admin
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from content import views as content_views
+from emoscreen.static_files import serve_static
 from paid import audit_views as paid_audit_views
 
 urlpatterns = [
@@ -25,3 +26,5 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += staticfiles_urlpatterns()
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+elif settings.SERVE_STATIC:
+    urlpatterns += [re_path(r"^%s(?P<path>.*)$" % settings.STATIC_URL.lstrip("/"), serve_static)]
@@ -21,6 +21,7 @@ admin.site.register(models.EsPayOrder)
 admin.site.register(models.EsPayTransaction)
 admin.site.register(models.EsPayRevenueSplit)
 admin.site.register(models.EsPayEmailLog)
+admin.site.register(models.EsPayWebhookEvent)
 admin.site.register(models.EsSubSubmission)
 admin.site.register(models.EsSubAnswer)
 admin.site.register(models.EsSubScaleScore)
@@ -1,12 +1,19 @@
+import hashlib
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q, Sum
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404, render
 from django.utils.dateparse import parse_date
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from emoscreen.db_router import replica_reads
 
 from .forms import PatientEmailForm
 from .models import EsPayEmailLog, EsRepReport, EsSubSubmission, WorkflowCase, WorkflowPayment, WorkflowReport
-from .services.reporting import generate_and_store_reports
-from .services import audit
+from .services import audit, case_search, history_archive
 from .views import (
     _email_log_display_status,
     _read_report_pdf,
@@ -15,14 +22,16 @@ from .views import (
 )
 
 JOURNEY_LOCKED_CONTEXT = {"hide_journey_nav": True}
+DASHBOARD_PAGE_SIZE = 100
 
 
 @staff_member_required
+@replica_reads
 def workflow_dashboard(request):
     cases = (
         WorkflowCase.objects
         .select_related("doctor", "order", "report", "payment", "report_tracking")
-        .order_by("-created_at")
+        .order_by("-created_at", "-pk")
     )
 
     doctor_query = request.GET.get("doctor", "").strip()
@@ -35,21 +44,9 @@ def workflow_dashboard(request):
     form_family = request.GET.get("form_family", "").strip()
 
     if doctor_query:
-        cases = cases.filter(
-            Q(doctor_name_snapshot__icontains=doctor_query)
-            | Q(doctor__first_name__icontains=doctor_query)
-            | Q(doctor__last_name__icontains=doctor_query)
-            | Q(doctor__email__icontains=doctor_query)
-            | Q(doctor__unique_doctor_code__icontains=doctor_query)
-        )
+        cases = case_search.filter_doctor(cases, doctor_query)
     if patient_query:
-        cases = cases.filter(
-            Q(case_code__icontains=patient_query)
-            | Q(patient_name__icontains=patient_query)
-            | Q(patient_whatsapp__icontains=patient_query)
-            | Q(patient_email__icontains=patient_query)
-            | Q(order__order_code__icontains=patient_query)
-        )
+        cases = case_search.filter_patient(cases, patient_query)
     if date_from:
         cases = cases.filter(created_at__date__gte=date_from)
     if date_to:
@@ -63,35 +60,27 @@ def workflow_dashboard(request):
     if form_family:
         cases = cases.filter(form_family=form_family)
 
-    revenue_paise = (
-        WorkflowPayment.objects
-        .filter(case__in=cases, status=WorkflowPayment.Status.COMPLETED)
-        .aggregate(total=Sum("amount_paise"))
-        .get("total")
-        or 0
-    )
-    stats = {
-        "total": cases.count(),
-        "completed": cases.filter(current_status=WorkflowCase.Status.COMPLETED).count(),
-        "failed": cases.filter(current_status=WorkflowCase.Status.FAILED).count(),
-        "payment_pending": cases.filter(payment_status=WorkflowCase.PaymentStatus.PENDING).count(),
-        "submitted": cases.filter(current_status__in=[
-            WorkflowCase.Status.SUBMITTED,
-            WorkflowCase.Status.REPORT_PROCESSING,
-            WorkflowCase.Status.REPORT_GENERATED,
-            WorkflowCase.Status.REPORT_SENT,
-            WorkflowCase.Status.COMPLETED,
-        ]).count(),
-        "revenue_rupees": revenue_paise / 100,
-    }
+    stats = _dashboard_stats(cases, request.GET)
+    page = _keyset_page(cases, after=request.GET.get("after", ""), before=request.GET.get("before", ""))
+    page_filters = request.GET.copy()
+    for cursor_param in ("after", "before"):
+        page_filters.pop(cursor_param, None)
+    base_query = page_filters.urlencode()
+
+    def page_url(cursor_param, cursor):
+        query = f"{base_query}&" if base_query else ""
+        return f"?{query}{cursor_param}={cursor}"
 
     return render(
         request,
         "paid/workflow_dashboard.html",
         {
-            "cases": cases[:100],
+            "cases": page["cases"],
             "stats": stats,
             "filters": request.GET,
+            "next_page_url": page_url("after", page["next_cursor"]) if page["next_cursor"] else "",
+            "prev_page_url": page_url("before", page["prev_cursor"]) if page["prev_cursor"] else "",
+            "first_page_url": f"?{base_query}" if page["prev_cursor"] else "",
             "status_choices": WorkflowCase.Status.choices,
             "payment_choices": WorkflowCase.PaymentStatus.choices,
             "family_choices": WorkflowCase.FormFamily.choices,
@@ -101,19 +90,110 @@ def workflow_dashboard(request):
     )
 
 
+def _dashboard_stats(cases, params):
+    """All dashboard counters in one conditional-aggregation query, cached briefly per filter set."""
+    ttl = getattr(settings, "WORKFLOW_DASHBOARD_STATS_CACHE_SECONDS", 0)
+    cache_key = ""
+    if ttl > 0:
+        filter_items = sorted((k, v) for k, v in params.items() if k not in {"after", "before"} and v)
+        digest = hashlib.sha256(repr(filter_items).encode("utf-8")).hexdigest()
+        cache_key = f"workflow_dashboard_stats:{digest}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    totals = cases.order_by().aggregate(
+        total=Count("pk"),
+        completed=Count("pk", filter=Q(current_status=WorkflowCase.Status.COMPLETED)),
+        failed=Count("pk", filter=Q(current_status=WorkflowCase.Status.FAILED)),
+        payment_pending=Count("pk", filter=Q(payment_status=WorkflowCase.PaymentStatus.PENDING)),
+        submitted=Count("pk", filter=Q(current_status__in=[
+            WorkflowCase.Status.SUBMITTED,
+            WorkflowCase.Status.REPORT_PROCESSING,
+            WorkflowCase.Status.REPORT_GENERATED,
+            WorkflowCase.Status.REPORT_SENT,
+            WorkflowCase.Status.COMPLETED,
+        ])),
+        revenue_paise=Sum("payment__amount_paise", filter=Q(payment__status=WorkflowPayment.Status.COMPLETED)),
+    )
+    revenue_paise = totals.pop("revenue_paise") or 0
+    stats = {**totals, "revenue_rupees": revenue_paise / 100}
+    if cache_key:
+        cache.set(cache_key, stats, ttl)
+    return stats
+
+
+def _encode_cursor(case) -> str:
+    raw = f"{case.created_at.isoformat()}|{case.pk}"
+    return urlsafe_base64_encode(raw.encode("utf-8"))
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, pk = urlsafe_base64_decode(cursor).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def _keyset_page(cases, *, after: str = "", before: str = "", page_size: int = DASHBOARD_PAGE_SIZE):
+    """
+    Keyset pagination on (created_at, id), newest first. Each page is a
+    range read on the created_at index, so deep pages cost the same as the first.
+    """
+    newest_first = cases.order_by("-created_at", "-pk")
+    after_key = _decode_cursor(after) if after else None
+    before_key = _decode_cursor(before) if before and not after_key else None
+
+    if before_key:
+        created_at, pk = before_key
+        rows = list(
+            cases.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by("created_at", "pk")[:page_size + 1]
+        )
+        has_newer = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        has_older = True
+    else:
+        if after_key:
+            created_at, pk = after_key
+            newest_first = newest_first.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        rows = list(newest_first[:page_size + 1])
+        has_older = len(rows) > page_size
+        rows = rows[:page_size]
+        has_newer = bool(after_key)
+
+    return {
+        "cases": rows,
+        "next_cursor": _encode_cursor(rows[-1]) if rows and has_older else "",
+        "prev_cursor": _encode_cursor(rows[0]) if rows and has_newer else "",
+    }
+
+
 @staff_member_required
+@replica_reads
 def workflow_detail(request, case_code):
     case = get_object_or_404(
         WorkflowCase.objects.select_related("doctor", "order", "legacy_submission", "paid_submission", "report"),
         case_code=case_code,
     )
+    events = list(case.events.all()[:200])
+    deliveries = list(case.delivery_attempts.all().order_by("-created_at"))
+    archive_summary = case.archive_segments.aggregate(events=Sum("event_count"), deliveries=Sum("delivery_count"))
+    show_archived = request.GET.get("archived") == "1" and bool(archive_summary["events"] or archive_summary["deliveries"])
+    if show_archived:
+        archived_events, archived_deliveries = history_archive.load_archived_history(case)
+        events += archived_events
+        deliveries += archived_deliveries
     return render(
         request,
         "paid/workflow_detail.html",
         {
             "case": case,
-            "events": case.events.all()[:200],
-            "deliveries": case.delivery_attempts.all().order_by("-created_at"),
+            "events": events,
+            "deliveries": deliveries,
+            "archive_summary": archive_summary,
+            "show_archived": show_archived,
             "payment": getattr(case, "payment", None),
             "report_tracking": getattr(case, "report_tracking", None),
             **JOURNEY_LOCKED_CONTEXT,
@@ -140,6 +220,8 @@ def workflow_report_delivery(request, case_code):
             patient_email_form = PatientEmailForm()
 
     if request.method == "POST":
+        from .services.reporting import generate_and_store_reports
+
         action = request.POST.get("action")
         if not order or not submission:
             notice = "This workflow does not have a paid order/submission available for report delivery."
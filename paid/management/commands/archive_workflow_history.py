@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paid.services import history_archive
+
+
+class Command(BaseCommand):
+    help = "Compact repetitive workflow events and archive old history of completed/failed cases to .jsonl.gz files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "WORKFLOW_ARCHIVE_AFTER_DAYS", 180),
+            help="Only touch events/delivery attempts older than this many days",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Cases per batch (one short transaction each)")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between batches")
+        parser.add_argument("--skip-compaction", action="store_true", help="Do not collapse FORM_REOPENED/FORM_STARTED runs")
+        parser.add_argument("--skip-archive", action="store_true", help="Only compact; leave history in the database")
+        parser.add_argument("--dry-run", action="store_true", help="Report how many cases would be processed")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=max(0, options["days"]))
+        batch_size = max(1, options["batch_size"])
+
+        if options["dry_run"]:
+            self.stdout.write(
+                f"Cutoff {cutoff:%Y-%m-%d %H:%M}: "
+                f"{history_archive.compaction_candidates(cutoff).count()} cases to compact, "
+                f"{history_archive.archive_candidates(cutoff).count()} cases to archive."
+            )
+            return
+
+        if not options["skip_compaction"]:
+            removed = 0
+            last_case_id = 0
+            while True:
+                case_ids = list(
+                    history_archive.compaction_candidates(cutoff).filter(case_id__gt=last_case_id).order_by("case_id")[:batch_size]
+                )
+                if not case_ids:
+                    break
+                for case_id in case_ids:
+                    removed += history_archive.compact_case_events(case_id, cutoff)
+                last_case_id = case_ids[-1]
+                self._pause(options["sleep"])
+            self.stdout.write(self.style.SUCCESS(f"Compaction removed {removed} repeated events."))
+
+        if not options["skip_archive"]:
+            totals = {"cases": 0, "events": 0, "deliveries": 0}
+            last_case_id = 0
+            while True:
+                case_ids = list(history_archive.archive_candidates(cutoff).filter(pk__gt=last_case_id)[:batch_size])
+                if not case_ids:
+                    break
+                counts = history_archive.archive_cases(case_ids, cutoff)
+                for key in totals:
+                    totals[key] += counts[key]
+                last_case_id = case_ids[-1]
+                self.stdout.write(f"Archived batch ending at case id {last_case_id}: {counts}")
+                self._pause(options["sleep"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Archived {totals['events']} events and {totals['deliveries']} delivery attempts "
+                    f"from {totals['cases']} cases to {history_archive.archive_root()}."
+                )
+            )
+
+    def _pause(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
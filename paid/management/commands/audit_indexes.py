@@ -0,0 +1,114 @@
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from content.models import RegisteredProfessional, Submission
+from paid.models import EsPayEmailLog, EsPayTransaction, WorkflowDeliveryAttempt
+
+SQLITE_SCAN = re.compile(r"\bSCAN (?!CONSTANT ROW)(?:TABLE )?(\w+)(?! USING)(?:\s|$)")
+
+
+def hot_queries():
+    """(label, queryset) for the filters the views run on every request or webhook."""
+    last24 = timezone.now() - timedelta(hours=24)
+    sent_statuses = [
+        WorkflowDeliveryAttempt.Status.SENT,
+        WorkflowDeliveryAttempt.Status.DELIVERED,
+        WorkflowDeliveryAttempt.Status.OPENED,
+    ]
+    return [
+        (
+            "admin dashboard: submissions per role, last 24h",
+            Submission.objects.filter(
+                professional__role=RegisteredProfessional.Role.PEDIATRICIAN, created_at__gte=last24
+            ).values("pk"),
+        ),
+        (
+            "admin export: submissions in date range",
+            Submission.objects.filter(created_at__gte=last24).order_by("-created_at").values("pk"),
+        ),
+        (
+            "admin dashboard: registrations per role, last 24h",
+            RegisteredProfessional.objects.filter(
+                role=RegisteredProfessional.Role.PEDIATRICIAN, created_at__gte=last24
+            ).values("pk"),
+        ),
+        (
+            "razorpay webhook: transaction by gateway order id",
+            EsPayTransaction.objects.filter(gateway_order_id="order_audit").order_by("-created_at")[:1],
+        ),
+        (
+            "assessment link email: duplicate check",
+            EsPayEmailLog.objects.filter(
+                order_id=0,
+                email_type=EsPayEmailLog.EmailType.PAYMENT_LINK,
+                status=EsPayEmailLog.Status.SENT,
+            ).values("pk")[:1],
+        ),
+        (
+            "paid WhatsApp link: duplicate check",
+            WorkflowDeliveryAttempt.objects.filter(
+                case_id=0,
+                channel=WorkflowDeliveryAttempt.Channel.WHATSAPP,
+                provider="aisensy",
+                subject="Paid assessment link",
+                status__in=sent_statuses,
+            ).values("pk")[:1],
+        ),
+    ]
+
+
+def _mysql_full_scans(node, found):
+    if isinstance(node, dict):
+        if node.get("access_type") == "ALL" and node.get("table_name"):
+            found.append(node["table_name"])
+        for value in node.values():
+            _mysql_full_scans(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _mysql_full_scans(value, found)
+    return found
+
+
+def explain(queryset):
+    """Return (plan text, list of tables read with a full scan)."""
+    if connection.vendor == "sqlite":
+        plan = queryset.explain()
+        return plan, SQLITE_SCAN.findall(plan)
+    if connection.vendor == "mysql":
+        plan = queryset.explain(format="json")
+        return plan, _mysql_full_scans(json.loads(plan), [])
+    raise CommandError(f"EXPLAIN parsing is only implemented for SQLite and MySQL, not {connection.vendor}.")
+
+
+class Command(BaseCommand):
+    help = "Run the app's hot queries through EXPLAIN and report the ones that fall back to a full table scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--show-plans", action="store_true", help="Print the full query plan for every query")
+        parser.add_argument("--fail-on-scan", action="store_true", help="Exit with an error if any full scan is found")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database vendor: {connection.vendor}")
+        flagged = []
+        for label, queryset in hot_queries():
+            plan, scans = explain(queryset)
+            if scans:
+                flagged.append(label)
+                self.stdout.write(self.style.WARNING(f"FULL SCAN  {label}: {', '.join(sorted(set(scans)))}"))
+            else:
+                self.stdout.write(f"ok         {label}")
+            if options["show_plans"] or scans:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if flagged and options["fail_on_scan"]:
+            raise CommandError(f"{len(flagged)} hot queries use a full table scan.")
+        if flagged:
+            self.stdout.write(self.style.WARNING(f"{len(flagged)} hot queries use a full table scan."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All hot queries are served by an index."))
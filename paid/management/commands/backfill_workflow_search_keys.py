@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from paid.models import WorkflowCase
+from paid.services import case_search
+
+
+class Command(BaseCommand):
+    help = "Build or refresh WorkflowCaseSearchKey rows used by the workflow dashboard search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Cases loaded per batch")
+        parser.add_argument("--missing-only", action="store_true", help="Only index cases that have no search keys yet")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        cases = WorkflowCase.objects.select_related("doctor", "order").order_by("pk")
+        if options["missing_only"]:
+            cases = cases.filter(search_keys__isnull=True).distinct()
+
+        processed = 0
+        last_pk = 0
+        while True:
+            batch = list(cases.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for case in batch:
+                case_search.refresh_case_keys(case)
+            processed += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Indexed {processed} cases (last id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(f"Search keys refreshed for {processed} workflow cases."))
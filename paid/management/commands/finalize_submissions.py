@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from paid.services import finalization
+
+
+class Command(BaseCommand):
+    help = "Score, render and email submitted paid assessments (staged, retryable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Max submissions per batch")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting after one batch")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = finalization.process_pending_jobs(limit=options["limit"])
+            if counts:
+                summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f"Finalized submissions: {summary}"))
+            if not options["loop"]:
+                if not counts:
+                    self.stdout.write("No submissions waiting for finalization.")
+                return
+            if not counts:
+                time.sleep(options["sleep"])
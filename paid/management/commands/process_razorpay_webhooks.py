@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from paid.services import webhooks
+
+
+class Command(BaseCommand):
+    help = "Apply queued Razorpay webhook events (payment state, revenue split, assessment link)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Max events per batch")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting after one batch")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = webhooks.process_pending_events(limit=options["limit"])
+            if counts:
+                summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f"Processed webhook events: {summary}"))
+            if not options["loop"]:
+                if not counts:
+                    self.stdout.write("No pending webhook events.")
+                return
+            if not counts:
+                time.sleep(options["sleep"])
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from paid.services import delivery_retry
+
+
+class Command(BaseCommand):
+    help = "Retry failed report email deliveries from their stored PDFs, with exponential backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=50, help="Max attempts per batch")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting after one batch")
+        parser.add_argument("--sleep", type=float, default=10.0, help="Seconds between polls when idle (with --loop)")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = delivery_retry.process_due_attempts(limit=options["limit"])
+            if counts:
+                summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+                self.stdout.write(self.style.SUCCESS(f"Retried deliveries: {summary}"))
+            if not options["loop"]:
+                if not counts:
+                    self.stdout.write("No deliveries due for retry.")
+                return
+            if not counts:
+                time.sleep(options["sleep"])
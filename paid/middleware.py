@@ -0,0 +1,19 @@
+from .services import identity_map
+
+
+class IdentityMapMiddleware:
+    """Open a WorkflowCase/order/submission identity map per request and flush its merged saves at the end.
+
+    Email and WhatsApp sends flush earlier, before the message goes out (see services.identity_map).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map.scope():
+            return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        identity_map.discard()
+        return None
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0002_workflowcase_workflowdeliveryattempt_workflowevent_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsPayWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gateway', models.CharField(default='razorpay', max_length=32)),
+                ('event_id', models.CharField(max_length=128, unique=True)),
+                ('event_type', models.CharField(blank=True, max_length=64)),
+                ('gateway_order_id', models.CharField(blank=True, max_length=128)),
+                ('gateway_payment_id', models.CharField(blank=True, max_length=128)),
+                ('payload_json', models.JSONField()),
+                ('base_url', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('RECEIVED', 'Received'), ('PROCESSING', 'Processing'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored'), ('FAILED', 'Failed')], default='RECEIVED', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'es_pay_webhook_events',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='es_pay_webh_status_c12c4f_idx'), models.Index(fields=['gateway_order_id'], name='es_pay_webh_gateway_5791ae_idx')],
+            },
+        ),
+    ]
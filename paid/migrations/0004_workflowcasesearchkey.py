@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0003_espaywebhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowCaseSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('DOCTOR', 'Doctor'), ('PATIENT', 'Patient'), ('PHONE', 'Phone digits')], max_length=8)),
+                ('key', models.CharField(max_length=128)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to='paid.workflowcase')),
+            ],
+            options={
+                'db_table': 'workflow_case_search_keys',
+                'indexes': [models.Index(fields=['scope', 'key', 'case'], name='workflow_ca_scope_0f51a4_idx')],
+                'unique_together': {('case', 'scope', 'key')},
+            },
+        ),
+    ]
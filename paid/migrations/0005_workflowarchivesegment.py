@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0004_workflowcasesearchkey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive_path', models.CharField(max_length=255)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('delivery_count', models.PositiveIntegerField(default=0)),
+                ('first_occurred_at', models.DateTimeField(blank=True, null=True)),
+                ('last_occurred_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_segments', to='paid.workflowcase')),
+            ],
+            options={
+                'db_table': 'workflow_archive_segments',
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+    ]
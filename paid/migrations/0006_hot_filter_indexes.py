@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0005_workflowarchivesegment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='espayemaillog',
+            index=models.Index(fields=['order', 'email_type', 'status'], name='es_pay_emai_order_i_2928f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='espaytransaction',
+            index=models.Index(fields=['gateway_order_id', 'created_at'], name='es_pay_tran_gateway_eb10e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workflowdeliveryattempt',
+            index=models.Index(fields=['case', 'channel', 'provider', 'subject', 'status'], name='workflow_de_case_id_84cdb0_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0006_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowdeliveryattempt',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='workflowdeliveryattempt',
+            name='retry_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='workflowdeliveryattempt',
+            index=models.Index(fields=['next_retry_at'], name='workflow_de_next_re_5962df_idx'),
+        ),
+    ]
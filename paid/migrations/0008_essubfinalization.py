@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paid', '0007_delivery_retry_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsSubFinalization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stage', models.CharField(choices=[('SUBMITTED', 'Submitted'), ('SCORED', 'Scored'), ('RENDERED', 'Rendered'), ('DELIVERED', 'Delivered')], default='SUBMITTED', max_length=16)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='finalization', to='paid.essubsubmission')),
+            ],
+            options={
+                'db_table': 'es_sub_finalizations',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='es_sub_fina_status_496c02_idx')],
+            },
+        ),
+    ]
@@ -277,6 +277,9 @@ class EsPayTransaction(TimestampedModel):
 
     class Meta:
         db_table = "es_pay_transactions"
+        indexes = [
+            models.Index(fields=["gateway_order_id", "created_at"]),
+        ]
 
 
 class EsPayRevenueSplit(models.Model):
@@ -294,6 +297,34 @@ class EsPayRevenueSplit(models.Model):
         db_table = "es_pay_revenue_splits"
 
 
+class EsPayWebhookEvent(TimestampedModel):
+    class Status(models.TextChoices):
+        RECEIVED = "RECEIVED"
+        PROCESSING = "PROCESSING"
+        PROCESSED = "PROCESSED"
+        IGNORED = "IGNORED"
+        FAILED = "FAILED"
+
+    gateway = models.CharField(max_length=32, default="razorpay")
+    event_id = models.CharField(max_length=128, unique=True)
+    event_type = models.CharField(max_length=64, blank=True)
+    gateway_order_id = models.CharField(max_length=128, blank=True)
+    gateway_payment_id = models.CharField(max_length=128, blank=True)
+    payload_json = models.JSONField()
+    base_url = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.RECEIVED)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "es_pay_webhook_events"
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["gateway_order_id"]),
+        ]
+
+
 class EsPayEmailLog(models.Model):
     class EmailType(models.TextChoices):
         PAYMENT_LINK = "PAYMENT_LINK"
@@ -316,6 +347,9 @@ class EsPayEmailLog(models.Model):
 
     class Meta:
         db_table = "es_pay_email_logs"
+        indexes = [
+            models.Index(fields=["order", "email_type", "status"]),
+        ]
 
 
 class EsSubSubmission(TimestampedModel):
@@ -383,6 +417,35 @@ class EsRepReport(models.Model):
         db_table = "es_rep_reports"
 
 
+class EsSubFinalization(TimestampedModel):
+    """Background finalization of a FINAL submission: score, render the PDFs, email them."""
+
+    class Stage(models.TextChoices):
+        SUBMITTED = "SUBMITTED"
+        SCORED = "SCORED"
+        RENDERED = "RENDERED"
+        DELIVERED = "DELIVERED"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING"
+        PROCESSING = "PROCESSING"
+        DONE = "DONE"
+        FAILED = "FAILED"
+
+    submission = models.OneToOneField(EsSubSubmission, on_delete=models.CASCADE, related_name="finalization")
+    stage = models.CharField(max_length=16, choices=Stage.choices, default=Stage.SUBMITTED)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "es_sub_finalizations"
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+
 class WorkflowCase(TimestampedModel):
     class FormFamily(models.TextChoices):
         LEGACY = "LEGACY", "Legacy behavioral"
@@ -535,14 +598,20 @@ class WorkflowDeliveryAttempt(models.Model):
     opened_at = models.DateTimeField(null=True, blank=True)
     error_text = models.TextField(blank=True)
     metadata_json = models.JSONField(null=True, blank=True)
+    # Retry chain for failed report emails (see paid.services.delivery_retry):
+    # 0 for the first try; next_retry_at is set while the retry_deliveries worker still owes a retry.
+    retry_count = models.PositiveSmallIntegerField(default=0)
+    next_retry_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "workflow_delivery_attempts"
         indexes = [
             models.Index(fields=["case", "channel"]),
+            models.Index(fields=["case", "channel", "provider", "subject", "status"]),
             models.Index(fields=["status"]),
             models.Index(fields=["created_at"]),
+            models.Index(fields=["next_retry_at"]),
         ]
 
 
@@ -607,3 +676,45 @@ class WorkflowReport(TimestampedModel):
             models.Index(fields=["status"]),
             models.Index(fields=["generated_at"]),
         ]
+
+
+class WorkflowCaseSearchKey(models.Model):
+    """Normalized lookup keys per case so support search is an indexed prefix/equality match."""
+
+    class Scope(models.TextChoices):
+        DOCTOR = "DOCTOR", "Doctor"
+        PATIENT = "PATIENT", "Patient"
+        PHONE = "PHONE", "Phone digits"
+
+    case = models.ForeignKey(WorkflowCase, on_delete=models.CASCADE, related_name="search_keys")
+    scope = models.CharField(max_length=8, choices=Scope.choices)
+    key = models.CharField(max_length=128)
+
+    class Meta:
+        db_table = "workflow_case_search_keys"
+        unique_together = (("case", "scope", "key"),)
+        indexes = [
+            models.Index(fields=["scope", "key", "case"]),
+        ]
+
+    def __str__(self):
+        return f"{self.case_id} {self.scope}:{self.key}"
+
+
+class WorkflowArchiveSegment(models.Model):
+    """Index of workflow history moved out to a compressed JSON-lines archive file."""
+
+    case = models.ForeignKey(WorkflowCase, on_delete=models.CASCADE, related_name="archive_segments")
+    archive_path = models.CharField(max_length=255)
+    event_count = models.PositiveIntegerField(default=0)
+    delivery_count = models.PositiveIntegerField(default=0)
+    first_occurred_at = models.DateTimeField(null=True, blank=True)
+    last_occurred_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "workflow_archive_segments"
+        ordering = ["created_at", "id"]
+
+    def __str__(self):
+        return f"{self.case_id} {self.archive_path}"
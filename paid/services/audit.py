@@ -3,6 +3,7 @@ import secrets
 from decimal import Decimal
 
 from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
 from content.models import Question, SubmissionAnswer
@@ -19,6 +20,7 @@ from paid.models import (
     WorkflowPayment,
     WorkflowReport,
 )
+from paid.services import case_search, identity_map
 
 
 SESSION_CASE_PREFIX = "workflow_case_"
@@ -77,7 +79,7 @@ def get_session_case(request, doctor_code: str) -> WorkflowCase | None:
     case_code = request.session.get(f"{SESSION_CASE_PREFIX}{doctor_code}")
     if not case_code:
         return None
-    return WorkflowCase.objects.filter(case_code=case_code).first()
+    return identity_map.get(WorkflowCase, case_code=case_code)
 
 
 def _event(
@@ -106,7 +108,7 @@ def _event(
         metadata_json=metadata or {},
     )
     case.last_event_at = timezone.now()
-    case.save(update_fields=["last_event_at", "updated_at"])
+    identity_map.save(case, ["last_event_at", "updated_at"])
 
 
 def transition(
@@ -147,7 +149,7 @@ def transition(
         case.failure_stage = stage
         case.failure_reason = failure_reason or message
         update_fields.extend(["failure_stage", "failure_reason"])
-    case.save(update_fields=update_fields)
+    identity_map.save(case, update_fields)
 
     WorkflowEvent.objects.create(
         case=case,
@@ -176,6 +178,8 @@ def record_delivery(
     error_text: str = "",
     metadata: dict | None = None,
     email_log=None,
+    retry_count: int = 0,
+    next_retry_at=None,
 ):
     now = timezone.now()
     kwargs = {}
@@ -196,6 +200,8 @@ def record_delivery(
         error_text=error_text or "",
         metadata_json=metadata or {},
         email_log=email_log,
+        retry_count=retry_count,
+        next_retry_at=next_retry_at,
         **kwargs,
     )
     _event(
@@ -208,6 +214,122 @@ def record_delivery(
     return attempt
 
 
+def bulk_create_with_ids(model, objs: list) -> list:
+    """bulk_create that always leaves primary keys set (MySQL cannot return them from one INSERT)."""
+    if not objs:
+        return objs
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    with transaction.atomic():
+        for obj in objs:
+            obj.save(force_insert=True)
+    return objs
+
+
+def record_deliveries(entries: list[dict]) -> list[WorkflowDeliveryAttempt]:
+    """
+    Batch form of record_delivery(): each entry carries `case` plus the
+    record_delivery keyword arguments. Attempts and their
+    DELIVERY_ATTEMPT_RECORDED events are inserted per batch and each case's
+    last_event_at is touched once. A single entry goes through
+    record_delivery(), which needs no batch transaction.
+    """
+    if len(entries) == 1:
+        entry = dict(entries[0])
+        return [record_delivery(entry.pop("case"), **entry)]
+
+    now = timezone.now()
+    attempts = []
+    for entry in entries:
+        status = entry["status"]
+        attempts.append(
+            WorkflowDeliveryAttempt(
+                case=entry["case"],
+                channel=entry["channel"],
+                recipient=entry.get("recipient") or "",
+                subject=entry.get("subject") or "",
+                status=status,
+                provider=entry.get("provider") or "",
+                provider_message_id=entry.get("provider_message_id") or "",
+                error_text=entry.get("error_text") or "",
+                metadata_json=entry.get("metadata") or {},
+                email_log=entry.get("email_log"),
+                retry_count=entry.get("retry_count", 0),
+                next_retry_at=entry.get("next_retry_at"),
+                sent_at=now if status in {WorkflowDeliveryAttempt.Status.SENT, WorkflowDeliveryAttempt.Status.SIMULATED} else None,
+                delivered_at=now if status == WorkflowDeliveryAttempt.Status.DELIVERED else None,
+                opened_at=now if status == WorkflowDeliveryAttempt.Status.OPENED else None,
+            )
+        )
+    if not attempts:
+        return attempts
+
+    with transaction.atomic():
+        bulk_create_with_ids(WorkflowDeliveryAttempt, attempts)
+        WorkflowEvent.objects.bulk_create(
+            WorkflowEvent(
+                case=attempt.case,
+                event_type="DELIVERY_ATTEMPT_RECORDED",
+                stage="DELIVERY",
+                status_from=attempt.case.current_status,
+                status_to="",
+                actor_type=WorkflowEvent.ActorType.SYSTEM,
+                message=f"{attempt.channel} delivery {attempt.status}",
+                metadata_json={"attempt_id": attempt.id, "recipient": attempt.recipient, **attempt.metadata_json},
+            )
+            for attempt in attempts
+        )
+        cases = {attempt.case.pk: attempt.case for attempt in attempts}
+        for case in cases.values():
+            case.last_event_at = now
+            identity_map.save(case, ["last_event_at", "updated_at"])
+    return attempts
+
+
+def record_delivery_result(
+    attempt: WorkflowDeliveryAttempt,
+    *,
+    status: str,
+    recipient: str = "",
+    provider: str = "",
+    provider_message_id: str = "",
+    error_text: str = "",
+    email_log=None,
+    next_retry_at=None,
+):
+    """Finish an attempt that was recorded as QUEUED (a scheduled retry) once the send outcome is known."""
+    now = timezone.now()
+    attempt.status = status
+    attempt.recipient = recipient or attempt.recipient
+    attempt.provider = provider or attempt.provider
+    attempt.provider_message_id = provider_message_id or ""
+    attempt.error_text = error_text or ""
+    attempt.email_log = email_log
+    attempt.next_retry_at = next_retry_at
+    if status in {WorkflowDeliveryAttempt.Status.SENT, WorkflowDeliveryAttempt.Status.SIMULATED}:
+        attempt.sent_at = now
+    attempt.save(
+        update_fields=[
+            "status",
+            "recipient",
+            "provider",
+            "provider_message_id",
+            "error_text",
+            "email_log",
+            "next_retry_at",
+            "sent_at",
+        ]
+    )
+    _event(
+        attempt.case,
+        "DELIVERY_ATTEMPT_RECORDED",
+        stage="DELIVERY",
+        message=f"{attempt.channel} delivery {status} (retry {attempt.retry_count})",
+        metadata={"attempt_id": attempt.id, "recipient": attempt.recipient, **(attempt.metadata_json or {})},
+    )
+    return attempt
+
+
 def create_legacy_case(
     *,
     doctor,
@@ -222,7 +344,7 @@ def create_legacy_case(
 ):
     access_hash = token_hash(token)
     if access_hash:
-        existing = WorkflowCase.objects.filter(access_token_hash=access_hash).first()
+        existing = identity_map.get(WorkflowCase, access_token_hash=access_hash)
         if existing:
             _set_session_case(request, doctor.unique_doctor_code, existing)
             return existing
@@ -258,6 +380,8 @@ def create_legacy_case(
         status=WorkflowPayment.Status.NOT_REQUIRED,
     )
     WorkflowReport.objects.create(case=case)
+    identity_map.register(case)
+    case_search.refresh_case_keys(case)
     _event(
         case,
         "FORM_CREATED",
@@ -291,7 +415,7 @@ def create_legacy_case(
 
 
 def create_paid_case(*, order: EsPayOrder, request=None, token: str | None = None, source: str = "", delivery_url: str = ""):
-    existing = WorkflowCase.objects.filter(order=order).first()
+    existing = identity_map.get(WorkflowCase, order=order)
     if existing:
         return existing
 
@@ -335,6 +459,8 @@ def create_paid_case(*, order: EsPayOrder, request=None, token: str | None = Non
         gateway="dummy" if order.final_amount_paise > 0 else "",
     )
     WorkflowReport.objects.create(case=case)
+    identity_map.register(case)
+    case_search.refresh_case_keys(case)
     _event(
         case,
         "FORM_CREATED",
@@ -367,17 +493,17 @@ def create_paid_case(*, order: EsPayOrder, request=None, token: str | None = Non
 
 
 def case_for_order(order: EsPayOrder) -> WorkflowCase:
-    case = WorkflowCase.objects.filter(order=order).first()
-    if case:
-        return case
-    return create_paid_case(order=order, source="backfill")
+    case = identity_map.get(WorkflowCase, order=order) or create_paid_case(order=order, source="backfill")
+    if case.order_id == order.pk:
+        case.order = order
+    return case
 
 
 def case_for_token(token: str) -> WorkflowCase | None:
     access_hash = token_hash(token)
     if not access_hash:
         return None
-    return WorkflowCase.objects.filter(access_token_hash=access_hash).first()
+    return identity_map.get(WorkflowCase, access_token_hash=access_hash)
 
 
 def mark_opened(case: WorkflowCase | None, *, request=None, actor_type=WorkflowEvent.ActorType.PATIENT, message="Form link opened"):
@@ -422,7 +548,8 @@ def update_patient_contact(case: WorkflowCase | None, *, patient_name="", patien
         case.patient_email = patient_email
         update_fields.append("patient_email")
     if len(update_fields) > 1:
-        case.save(update_fields=update_fields)
+        identity_map.save(case, update_fields)
+        case_search.refresh_case_keys(case, update_fields)
         _event(
             case,
             "PATIENT_DETAILS_UPDATED",
@@ -441,7 +568,7 @@ def mark_in_progress(case: WorkflowCase | None, *, request=None, completed: int
         case.total_questions = total
         case.completed_questions = completed
         case.completion_percent = _percent(completed, total)
-        case.save(update_fields=["total_questions", "completed_questions", "completion_percent", "updated_at"])
+        identity_map.save(case, ["total_questions", "completed_questions", "completion_percent", "updated_at"])
     if case.current_status not in {WorkflowCase.Status.SUBMITTED, WorkflowCase.Status.REPORT_GENERATED, WorkflowCase.Status.REPORT_SENT, WorkflowCase.Status.COMPLETED}:
         transition(case, WorkflowCase.Status.IN_PROGRESS, "FORM_STARTED", stage="PATIENT_COMPLETION", actor_type=WorkflowEvent.ActorType.PATIENT)
     return case
@@ -456,7 +583,8 @@ def attach_legacy_submission(case: WorkflowCase | None, submission, *, patient_n
     answer_count = SubmissionAnswer.objects.filter(submission=submission).count()
     case.completed_questions = answer_count or case.total_questions
     case.completion_percent = Decimal("100.00")
-    case.save(update_fields=["legacy_submission", "patient_name", "patient_email", "completed_questions", "completion_percent", "updated_at"])
+    identity_map.save(case, ["legacy_submission", "patient_name", "patient_email", "completed_questions", "completion_percent", "updated_at"])
+    case_search.refresh_case_keys(case)
     report_track, _ = WorkflowReport.objects.get_or_create(case=case)
     report_track.legacy_submission = submission
     report_track.status = WorkflowReport.Status.COMPLETED
@@ -477,7 +605,8 @@ def attach_paid_submission(case: WorkflowCase | None, submission: EsSubSubmissio
     case.completed_questions = answer_count
     case.total_questions = total
     case.completion_percent = _percent(answer_count, total)
-    case.save(update_fields=["paid_submission", "patient_name", "completed_questions", "total_questions", "completion_percent", "updated_at"])
+    identity_map.save(case, ["paid_submission", "patient_name", "completed_questions", "total_questions", "completion_percent", "updated_at"])
+    case_search.refresh_case_keys(case)
     report_track, _ = WorkflowReport.objects.get_or_create(case=case)
     report_track.paid_submission = submission
     report_track.save(update_fields=["paid_submission", "updated_at"])
@@ -489,7 +618,7 @@ def mark_paid_submitted(case: WorkflowCase | None, submission: EsSubSubmission):
         return None
     attach_paid_submission(case, submission)
     case.completion_percent = Decimal("100.00")
-    case.save(update_fields=["completion_percent", "updated_at"])
+    identity_map.save(case, ["completion_percent", "updated_at"])
     transition(case, WorkflowCase.Status.SUBMITTED, "FORM_SUBMITTED", stage="PATIENT_COMPLETION", actor_type=WorkflowEvent.ActorType.PATIENT)
     return case
 
@@ -498,7 +627,7 @@ def mark_payment_pending(case: WorkflowCase | None, order: EsPayOrder, transacti
     if not case:
         return None
     case.payment_status = WorkflowCase.PaymentStatus.PENDING
-    case.save(update_fields=["payment_status", "updated_at"])
+    identity_map.save(case, ["payment_status", "updated_at"])
     payment, _ = WorkflowPayment.objects.get_or_create(case=case, defaults={"order": order})
     payment.order = order
     payment.transaction = transaction or payment.transaction
@@ -518,7 +647,7 @@ def mark_payment_completed(case: WorkflowCase | None, order: EsPayOrder, transac
     now = timezone.now()
     case.payment_status = WorkflowCase.PaymentStatus.COMPLETED
     case.payment_completed_at = case.payment_completed_at or now
-    case.save(update_fields=["payment_status", "payment_completed_at", "updated_at"])
+    identity_map.save(case, ["payment_status", "payment_completed_at", "updated_at"])
     payment, _ = WorkflowPayment.objects.get_or_create(case=case, defaults={"order": order})
     payment.order = order
     payment.transaction = transaction or payment.transaction
@@ -539,7 +668,7 @@ def mark_payment_failed(case: WorkflowCase | None, order: EsPayOrder, transactio
         return None
     now = timezone.now()
     case.payment_status = WorkflowCase.PaymentStatus.FAILED
-    case.save(update_fields=["payment_status", "updated_at"])
+    identity_map.save(case, ["payment_status", "updated_at"])
     payment, _ = WorkflowPayment.objects.get_or_create(case=case, defaults={"order": order})
     payment.order = order
     payment.transaction = transaction or payment.transaction
@@ -572,7 +701,7 @@ def mark_report_generated(case: WorkflowCase | None, report: EsRepReport):
     now = timezone.now()
     case.report = report
     case.report_generated_at = case.report_generated_at or now
-    case.save(update_fields=["report", "report_generated_at", "updated_at"])
+    identity_map.save(case, ["report", "report_generated_at", "updated_at"])
     report_track, _ = WorkflowReport.objects.get_or_create(case=case)
     report_track.report = report
     report_track.status = WorkflowReport.Status.COMPLETED
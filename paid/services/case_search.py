@@ -0,0 +1,125 @@
+"""
+Search keys for the workflow support dashboard.
+
+Each case gets normalized keys in WorkflowCaseSearchKey:
+
+* DOCTOR  - tokens of the doctor name snapshot, first/last name, email and doctor code
+* PATIENT - tokens of the patient name and email, the case code and the order code
+* PHONE   - every suffix (4+ digits) of the patient WhatsApp digits, the full
+            normalized number included
+
+Searches are indexed prefix matches per query token (all tokens must match).
+A prefix match on the phone suffixes finds any run of digits in the number, so
+"98112", "3344" and "+91 98112 23344" all find the same case.
+
+DOCTOR keys also change when the doctor is edited; paid.signals calls
+refresh_doctor_case_keys() when a RegisteredProfessional's name, email or code
+changes on save.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Q
+
+from paid.models import WorkflowCase, WorkflowCaseSearchKey
+
+# Fields whose change requires the case's keys to be rebuilt.
+SEARCH_FIELDS = {"case_code", "doctor", "doctor_name_snapshot", "patient_name", "patient_whatsapp", "patient_email", "order"}
+# RegisteredProfessional fields that feed the DOCTOR keys of the doctor's cases.
+DOCTOR_SEARCH_FIELDS = ("first_name", "last_name", "email", "unique_doctor_code")
+KEY_MAX_LENGTH = 128
+MIN_PHONE_DIGITS = 4
+PHONE_DIGITS = 10
+_TOKEN_RE = re.compile(r"[\w@.+-]+")
+_PHONE_QUERY_RE = re.compile(r"[\d\s+()-]+")
+
+
+def tokens(value) -> list[str]:
+    """Casefolded search tokens; emails and codes stay whole ("john.smith@x.com", "wf1a2b3c")."""
+    if not value:
+        return []
+    return [token[:KEY_MAX_LENGTH] for token in _TOKEN_RE.findall(str(value).casefold())]
+
+
+def phone_suffixes(value) -> list[str]:
+    digits = re.sub(r"\D", "", value or "")
+    return [digits[-length:] for length in range(MIN_PHONE_DIGITS, len(digits) + 1)]
+
+
+def case_keys(case: WorkflowCase) -> set[tuple[str, str]]:
+    Scope = WorkflowCaseSearchKey.Scope
+    doctor = case.doctor
+    keys = set()
+    for value in (
+        case.doctor_name_snapshot,
+        doctor.first_name,
+        doctor.last_name,
+        doctor.email,
+        doctor.unique_doctor_code,
+    ):
+        keys.update((Scope.DOCTOR, token) for token in tokens(value))
+    for value in (
+        case.case_code,
+        case.patient_name,
+        case.patient_email,
+        case.order.order_code if case.order_id else "",
+    ):
+        keys.update((Scope.PATIENT, token) for token in tokens(value))
+    keys.update((Scope.PHONE, suffix) for suffix in phone_suffixes(case.patient_whatsapp))
+    return keys
+
+
+def refresh_case_keys(case: WorkflowCase | None, update_fields=None):
+    """Sync the case's keys with its current fields. Cheap no-op when update_fields touches no searched field."""
+    if not case:
+        return None
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return case
+    wanted = case_keys(case)
+    with transaction.atomic():
+        existing = {
+            (scope, key): pk
+            for pk, scope, key in WorkflowCaseSearchKey.objects.filter(case=case).values_list("pk", "scope", "key")
+        }
+        stale = [pk for scope_key, pk in existing.items() if scope_key not in wanted]
+        if stale:
+            WorkflowCaseSearchKey.objects.filter(pk__in=stale).delete()
+        WorkflowCaseSearchKey.objects.bulk_create(
+            [WorkflowCaseSearchKey(case=case, scope=scope, key=key) for scope, key in wanted if (scope, key) not in existing]
+        )
+    return case
+
+
+def refresh_doctor_case_keys(doctor, batch_size: int = 500) -> int:
+    """Rebuild the keys of every case of doctor (after its name/email/code changed). Returns the case count."""
+    cases = WorkflowCase.objects.filter(doctor=doctor).select_related("order").order_by("pk")
+    refreshed = 0
+    for case in cases.iterator(chunk_size=batch_size):
+        case.doctor = doctor
+        refresh_case_keys(case)
+        refreshed += 1
+    return refreshed
+
+
+def _matching_case_ids(scope: str, token: str):
+    return WorkflowCaseSearchKey.objects.filter(scope=scope, key__startswith=token).values("case_id")
+
+
+def filter_doctor(cases, query: str):
+    for token in tokens(query):
+        cases = cases.filter(pk__in=_matching_case_ids(WorkflowCaseSearchKey.Scope.DOCTOR, token))
+    return cases
+
+
+def filter_patient(cases, query: str):
+    digits = re.sub(r"\D", "", query)
+    if _PHONE_QUERY_RE.fullmatch(query) and len(digits) >= MIN_PHONE_DIGITS:
+        # Hex order/case codes can be all digits, so keep the code prefix match alongside the phone lookup.
+        match = Q(pk__in=_matching_case_ids(WorkflowCaseSearchKey.Scope.PHONE, digits))
+        if len(digits) > PHONE_DIGITS:
+            # A trunk "0" or a country code the stored number lacks: match the national number too.
+            match |= Q(pk__in=_matching_case_ids(WorkflowCaseSearchKey.Scope.PHONE, digits[-PHONE_DIGITS:]))
+        return cases.filter(match | Q(pk__in=_matching_case_ids(WorkflowCaseSearchKey.Scope.PATIENT, digits)))
+    for token in tokens(query):
+        cases = cases.filter(pk__in=_matching_case_ids(WorkflowCaseSearchKey.Scope.PATIENT, token))
+    return cases
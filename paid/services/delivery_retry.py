@@ -0,0 +1,186 @@
+"""
+Retries for failed report emails, run by the retry_deliveries command.
+
+A FAILED report email attempt carries next_retry_at. A worker claims due rows
+with select_for_update(skip_locked=True), so several workers can run side by
+side, and in the same transaction records the retry as a new QUEUED attempt
+(retry_count + 1). That QUEUED row doubles as a lease: its next_retry_at is
+the lease expiry, so if the worker dies mid-send the row becomes due again and
+is retried by someone else.
+
+Retries resend the PDFs already stored for the report (EsRepReport paths)
+through mail_dispatch; nothing is regenerated. Each failure backs off
+exponentially until MAX_ATTEMPTS tries have been made. A newer attempt for the
+same case and subject (e.g. a staff resend) supersedes the chain.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from paid.models import EsRepReport, WorkflowDeliveryAttempt
+from paid.services import audit
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_EMAIL_TYPES = {"PATIENT_REPORT", "DOCTOR_REPORT"}
+MAX_ATTEMPTS = 5
+BASE_DELAY = timedelta(minutes=2)
+MAX_DELAY = timedelta(hours=6)
+# How long a claimed retry may stay QUEUED before another worker takes it over.
+LEASE = timedelta(minutes=10)
+
+
+def next_retry_at(email_type: str, retry_count: int, now=None):
+    """When the failed try number retry_count should be retried, or None if it should not be."""
+    if email_type not in RETRYABLE_EMAIL_TYPES or retry_count + 1 >= MAX_ATTEMPTS:
+        return None
+    return (now or timezone.now()) + min(BASE_DELAY * (2 ** retry_count), MAX_DELAY)
+
+
+def due_attempts(now=None):
+    return WorkflowDeliveryAttempt.objects.filter(
+        channel=WorkflowDeliveryAttempt.Channel.EMAIL,
+        status__in=[WorkflowDeliveryAttempt.Status.FAILED, WorkflowDeliveryAttempt.Status.QUEUED],
+        next_retry_at__lte=now or timezone.now(),
+    ).order_by("next_retry_at", "id")
+
+
+def _superseded(attempt) -> bool:
+    return WorkflowDeliveryAttempt.objects.filter(
+        case_id=attempt.case_id,
+        channel=attempt.channel,
+        subject=attempt.subject,
+        id__gt=attempt.id,
+    ).exists()
+
+
+def _claim(attempt_pk):
+    """Lock a due attempt and record its retry as a QUEUED attempt. Returns the new attempt or None."""
+    now = timezone.now()
+    with transaction.atomic():
+        attempt = due_attempts(now).select_for_update(skip_locked=True).filter(pk=attempt_pk).first()
+        if not attempt:
+            return None
+        if attempt.status == WorkflowDeliveryAttempt.Status.QUEUED:
+            attempt.status = WorkflowDeliveryAttempt.Status.FAILED
+            attempt.error_text = "Retry worker did not finish before its lease expired."
+        attempt.next_retry_at = None
+        attempt.save(update_fields=["status", "error_text", "next_retry_at"])
+
+        email_type = (attempt.metadata_json or {}).get("email_type", "")
+        if _superseded(attempt) or next_retry_at(email_type, attempt.retry_count, now) is None:
+            return None
+        return WorkflowDeliveryAttempt.objects.create(
+            case_id=attempt.case_id,
+            channel=attempt.channel,
+            recipient=attempt.recipient,
+            subject=attempt.subject,
+            status=WorkflowDeliveryAttempt.Status.QUEUED,
+            provider=attempt.provider,
+            retry_count=attempt.retry_count + 1,
+            next_retry_at=now + LEASE,
+            metadata_json={**(attempt.metadata_json or {}), "retry_of": attempt.id},
+        )
+
+
+def _report_message(case, email_type):
+    """Rebuild the email from the stored report PDFs. Returns (message, report, error)."""
+    from paid.views import _paid_doctor_report_message, _paid_patient_report_message, _read_report_pdf
+
+    order = case.order
+    report = case.report
+    if order and not report and case.paid_submission_id:
+        report = EsRepReport.objects.filter(submission_id=case.paid_submission_id).first()
+    if not order or not report:
+        return None, None, "No stored report for this case."
+    try:
+        patient_pdf = _read_report_pdf(report.patient_pdf_path)
+        if email_type == "DOCTOR_REPORT":
+            message = _paid_doctor_report_message(order, report, patient_pdf, _read_report_pdf(report.doctor_pdf_path), case)
+        else:
+            message = _paid_patient_report_message(order, report, patient_pdf, case)
+    except OSError as exc:
+        return None, report, f"Stored report PDF could not be read: {exc}"
+    if not message:
+        return None, report, "No recipient email on the order."
+    return message, report, ""
+
+
+def _deliver(retry: WorkflowDeliveryAttempt) -> str:
+    from paid.services.mail_dispatch import send_messages
+    from paid.services.mailer import log_email
+
+    case = retry.case
+    email_type = (retry.metadata_json or {}).get("email_type", "")
+    message, report, error = _report_message(case, email_type)
+    if not message:
+        # Nothing a later retry could fix without staff action; end the chain.
+        audit.record_delivery_result(retry, status=WorkflowDeliveryAttempt.Status.FAILED, error_text=error)
+        if report is None:
+            audit.mark_report_failed(case, error)
+        else:
+            audit.mark_report_sent(
+                case,
+                to_patient=email_type == "PATIENT_REPORT",
+                to_doctor=email_type == "DOCTOR_REPORT",
+                patient_status=WorkflowDeliveryAttempt.Status.FAILED,
+                doctor_status=WorkflowDeliveryAttempt.Status.FAILED,
+            )
+        return retry.status
+
+    result = send_messages([message])[0]
+    email_log = log_email(
+        message.order,
+        email_type,
+        message.to_email,
+        message.subject,
+        status=result.status,
+        error_text="" if result.ok else str(result.meta),
+        sendgrid_message_id=result.meta if result.ok else "",
+    )
+    audit.record_delivery_result(
+        retry,
+        status=result.status,
+        recipient=message.to_email,
+        provider=result.provider,
+        provider_message_id=result.meta if result.ok else "",
+        error_text="" if result.ok else str(result.meta),
+        email_log=email_log,
+        next_retry_at=None if result.ok else next_retry_at(email_type, retry.retry_count),
+    )
+    if result.ok:
+        stamp_field = "emailed_to_parent_at" if email_type == "PATIENT_REPORT" else "emailed_to_doctor_at"
+        setattr(report, stamp_field, timezone.now())
+        report.save(update_fields=[stamp_field])
+    audit.mark_report_sent(
+        case,
+        to_patient=email_type == "PATIENT_REPORT",
+        to_doctor=email_type == "DOCTOR_REPORT",
+        patient_status=result.status if email_type == "PATIENT_REPORT" else "",
+        doctor_status=result.status if email_type == "DOCTOR_REPORT" else "",
+    )
+    return result.status
+
+
+def process_attempt(attempt_pk) -> str | None:
+    """Claim and retry one due attempt. Returns the retry's status, or None if there was nothing to do."""
+    retry = _claim(attempt_pk)
+    if not retry:
+        return None
+    try:
+        return _deliver(retry)
+    except Exception:
+        # The retry stays QUEUED and is picked up again once its lease expires.
+        logger.exception("[Delivery retry] attempt %s failed", retry.pk)
+        return "ERROR"
+
+
+def process_due_attempts(limit: int = 50) -> dict:
+    counts = {}
+    for attempt_pk in list(due_attempts().values_list("pk", flat=True)[:limit]):
+        status = process_attempt(attempt_pk)
+        if status:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
@@ -0,0 +1,139 @@
+"""
+Staged finalization of paid submissions, run by the finalize_submissions command.
+
+patient_submit_final only flips the submission to FINAL and enqueues an
+EsSubFinalization row inside its transaction. A worker then moves the row
+through its stages, persisting the stage after each one so a retry resumes
+where the last attempt stopped:
+
+* SUBMITTED -> SCORED: compute_submission_scores (replaces earlier scores).
+* SCORED -> RENDERED: generate_and_store_reports (overwrites the stored PDFs).
+* RENDERED -> DELIVERED: email the stored PDFs; types already SENT for the
+  order are skipped. Failed sends are left to delivery_retry.
+
+Claiming follows the webhook inbox: select_for_update(skip_locked=True), a
+bounded number of attempts, and stale PROCESSING rows are picked up again.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from paid.models import EsSubFinalization
+from paid.services import audit
+from paid.services.scoring import compute_submission_scores
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# A worker that died mid-job leaves it PROCESSING; pick it up again after this.
+STALE_PROCESSING_AFTER = timedelta(minutes=10)
+READY_STAGES = (EsSubFinalization.Stage.RENDERED, EsSubFinalization.Stage.DELIVERED)
+
+
+def enqueue(submission) -> EsSubFinalization:
+    job, _ = EsSubFinalization.objects.get_or_create(submission=submission)
+    return job
+
+
+def pending_jobs():
+    stale_before = timezone.now() - STALE_PROCESSING_AFTER
+    return EsSubFinalization.objects.filter(
+        Q(status=EsSubFinalization.Status.PENDING)
+        | Q(status=EsSubFinalization.Status.FAILED, attempts__lt=MAX_ATTEMPTS)
+        | Q(status=EsSubFinalization.Status.PROCESSING, updated_at__lt=stale_before)
+    ).order_by("created_at", "id")
+
+
+def _claim(job_pk):
+    with transaction.atomic():
+        job = pending_jobs().select_for_update(skip_locked=True).filter(pk=job_pk).first()
+        if not job:
+            return None
+        job.status = EsSubFinalization.Status.PROCESSING
+        job.attempts += 1
+        job.save(update_fields=["status", "attempts", "updated_at"])
+        return job
+
+
+def _advance(job, stage):
+    job.stage = stage
+    job.save(update_fields=["stage", "updated_at"])
+
+
+def _score(job, submission, case):
+    with transaction.atomic():
+        compute_submission_scores(submission)
+    _advance(job, EsSubFinalization.Stage.SCORED)
+
+
+def _render(job, submission, case):
+    # ReportLab/pypdf load here, in the finalize worker, not with the URLconf.
+    from paid.services.reporting import generate_and_store_reports
+
+    audit.mark_report_processing(case)
+    try:
+        report, _patient_pdf, _doctor_pdf = generate_and_store_reports(submission)
+    except Exception as exc:
+        audit.mark_report_failed(case, str(exc))
+        raise
+    audit.mark_report_generated(case, report)
+    _advance(job, EsSubFinalization.Stage.RENDERED)
+
+
+def _deliver(job, submission, case):
+    from paid.views import _read_report_pdf, _send_report_emails
+
+    report = submission.esrepreport
+    _send_report_emails(
+        submission.order,
+        report,
+        _read_report_pdf(report.patient_pdf_path),
+        _read_report_pdf(report.doctor_pdf_path),
+        workflow_case=case,
+    )
+    _advance(job, EsSubFinalization.Stage.DELIVERED)
+
+
+STAGES = (
+    (EsSubFinalization.Stage.SUBMITTED, _score),
+    (EsSubFinalization.Stage.SCORED, _render),
+    (EsSubFinalization.Stage.RENDERED, _deliver),
+)
+
+
+def process_job(job_pk) -> str | None:
+    """Claim one job and run its remaining stages. Returns the final status, or None if another worker has it."""
+    job = _claim(job_pk)
+    if not job:
+        return None
+
+    submission = job.submission
+    try:
+        case = audit.case_for_order(submission.order)
+        for stage, run in STAGES:
+            if job.stage == stage:
+                run(job, submission, case)
+    except Exception as exc:
+        logger.exception("[Finalization] submission %s failed at stage %s", submission.pk, job.stage)
+        job.status = EsSubFinalization.Status.FAILED
+        job.last_error = str(exc)
+        job.save(update_fields=["status", "last_error", "updated_at"])
+        return job.status
+
+    job.status = EsSubFinalization.Status.DONE
+    job.last_error = ""
+    job.completed_at = timezone.now()
+    job.save(update_fields=["status", "last_error", "completed_at", "updated_at"])
+    return job.status
+
+
+def process_pending_jobs(limit: int = 20) -> dict:
+    counts = {}
+    for job_pk in list(pending_jobs().values_list("pk", flat=True)[:limit]):
+        status = process_job(job_pk)
+        if status:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
@@ -0,0 +1,198 @@
+"""
+Retention for workflow_events / workflow_delivery_attempts.
+
+Two passes, both run in bounded batches of cases with one short transaction per batch:
+
+* compact_case_events(): runs of consecutive FORM_REOPENED / FORM_STARTED events
+  older than the cutoff collapse into the first event of the run, which
+  keeps the run length and last timestamp in its metadata.
+* archive_cases(): for COMPLETED / FAILED cases, events and delivery attempts
+  older than the cutoff are written to a gzip JSON-lines file under
+  WORKFLOW_ARCHIVE_DIR and deleted. A WorkflowArchiveSegment row per case
+  points at the file so workflow_detail can load the history on demand.
+"""
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from paid.models import WorkflowArchiveSegment, WorkflowCase, WorkflowDeliveryAttempt, WorkflowEvent
+
+logger = logging.getLogger(__name__)
+
+COLLAPSIBLE_EVENT_TYPES = ("FORM_REOPENED", "FORM_STARTED")
+ARCHIVABLE_STATUSES = (WorkflowCase.Status.COMPLETED, WorkflowCase.Status.FAILED)
+
+
+def archive_root() -> Path:
+    return Path(getattr(settings, "WORKFLOW_ARCHIVE_DIR", Path(settings.BASE_DIR) / "archives" / "workflow"))
+
+
+def _row(instance) -> dict:
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _instance(model, row: dict):
+    """Rebuild an unsaved model instance from an archived row so templates can render it unchanged."""
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in row:
+            values[field.attname] = field.to_python(row[field.attname])
+    return model(**values)
+
+
+# ---------------------------------------------------------------------------
+# Compaction
+# ---------------------------------------------------------------------------
+
+def compaction_candidates(cutoff):
+    """Case ids with at least two collapsible events older than cutoff."""
+    return (
+        WorkflowEvent.objects.filter(event_type__in=COLLAPSIBLE_EVENT_TYPES, occurred_at__lt=cutoff)
+        .order_by()
+        .values("case_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("case_id", flat=True)
+    )
+
+
+def compact_case_events(case_id, cutoff) -> int:
+    """Collapse repeated runs for one case; returns the number of events removed."""
+    events = list(
+        WorkflowEvent.objects.filter(case_id=case_id, occurred_at__lt=cutoff).order_by("occurred_at", "id")
+    )
+    keep_updates = []
+    delete_ids = []
+    run = []
+
+    def close_run():
+        if len(run) > 1:
+            head = run[0]
+            previous = (head.metadata_json or {}).get("collapsed_count", 1)
+            extra = sum((event.metadata_json or {}).get("collapsed_count", 1) for event in run[1:])
+            head.metadata_json = {
+                **(head.metadata_json or {}),
+                "collapsed_count": previous + extra,
+                "last_occurred_at": run[-1].occurred_at.isoformat(),
+            }
+            head.message = f"{head.event_type} x{previous + extra} (collapsed)"
+            keep_updates.append(head)
+            delete_ids.extend(event.id for event in run[1:])
+
+    for event in events:
+        if run and event.event_type == run[0].event_type and event.event_type in COLLAPSIBLE_EVENT_TYPES:
+            run.append(event)
+            continue
+        close_run()
+        run = [event] if event.event_type in COLLAPSIBLE_EVENT_TYPES else []
+    close_run()
+
+    if not delete_ids:
+        return 0
+    with transaction.atomic():
+        WorkflowEvent.objects.bulk_update(keep_updates, ["message", "metadata_json"])
+        WorkflowEvent.objects.filter(id__in=delete_ids).delete()
+    return len(delete_ids)
+
+
+# ---------------------------------------------------------------------------
+# Archival
+# ---------------------------------------------------------------------------
+
+def archive_candidates(cutoff):
+    return (
+        WorkflowCase.objects.filter(current_status__in=ARCHIVABLE_STATUSES)
+        .filter(
+            Q(pk__in=WorkflowEvent.objects.filter(occurred_at__lt=cutoff).values("case_id"))
+            | Q(pk__in=WorkflowDeliveryAttempt.objects.filter(created_at__lt=cutoff).values("case_id"))
+        )
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def _write_archive(relative_path: str, lines: list[dict]):
+    """Write atomically: temp file, fsync, rename. A crash never leaves a half-written archive."""
+    target = archive_root() / relative_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".tmp")
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as handle:
+            for line in lines:
+                handle.write(json.dumps(line, cls=DjangoJSONEncoder).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, target)
+
+
+def archive_cases(case_ids: list, cutoff) -> dict:
+    """Move old events/deliveries of the given cases into one archive file. Returns counts."""
+    events = list(
+        WorkflowEvent.objects.filter(case_id__in=case_ids, occurred_at__lt=cutoff).order_by("case_id", "occurred_at", "id")
+    )
+    deliveries = list(
+        WorkflowDeliveryAttempt.objects.filter(case_id__in=case_ids, created_at__lt=cutoff).order_by("case_id", "created_at", "id")
+    )
+    if not events and not deliveries:
+        return {"events": 0, "deliveries": 0, "cases": 0}
+
+    now = timezone.now()
+    relative_path = f"{now:%Y/%m}/workflow-history-{now:%Y%m%dT%H%M%S%f}-{case_ids[0]}.jsonl.gz"
+    lines = [{"kind": "event", "case_id": e.case_id, "row": _row(e)} for e in events]
+    lines += [{"kind": "delivery", "case_id": d.case_id, "row": _row(d)} for d in deliveries]
+    _write_archive(relative_path, lines)
+
+    per_case = {}
+    for e in events:
+        per_case.setdefault(e.case_id, {"events": 0, "deliveries": 0, "times": []})
+        per_case[e.case_id]["events"] += 1
+        per_case[e.case_id]["times"].append(e.occurred_at)
+    for d in deliveries:
+        per_case.setdefault(d.case_id, {"events": 0, "deliveries": 0, "times": []})
+        per_case[d.case_id]["deliveries"] += 1
+        per_case[d.case_id]["times"].append(d.created_at)
+
+    with transaction.atomic():
+        WorkflowArchiveSegment.objects.bulk_create(
+            WorkflowArchiveSegment(
+                case_id=case_id,
+                archive_path=relative_path,
+                event_count=counts["events"],
+                delivery_count=counts["deliveries"],
+                first_occurred_at=min(counts["times"]),
+                last_occurred_at=max(counts["times"]),
+            )
+            for case_id, counts in per_case.items()
+        )
+        WorkflowEvent.objects.filter(id__in=[e.id for e in events]).delete()
+        WorkflowDeliveryAttempt.objects.filter(id__in=[d.id for d in deliveries]).delete()
+    return {"events": len(events), "deliveries": len(deliveries), "cases": len(per_case)}
+
+
+def load_archived_history(case: WorkflowCase) -> tuple[list, list]:
+    """(events, deliveries) from the case's archive files as unsaved model instances, newest first."""
+    events, deliveries = [], []
+    for path in sorted(set(case.archive_segments.values_list("archive_path", flat=True))):
+        try:
+            with gzip.open(archive_root() / path, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    record = json.loads(line)
+                    if record.get("case_id") != case.pk:
+                        continue
+                    if record.get("kind") == "event":
+                        events.append(_instance(WorkflowEvent, record["row"]))
+                    elif record.get("kind") == "delivery":
+                        deliveries.append(_instance(WorkflowDeliveryAttempt, record["row"]))
+        except OSError:
+            logger.exception("[Workflow archive] could not read %s", path)
+    events.sort(key=lambda e: (e.occurred_at, e.id), reverse=True)
+    deliveries.sort(key=lambda d: (d.created_at, d.id), reverse=True)
+    return events, deliveries
@@ -0,0 +1,135 @@
+"""
+Request-scoped identity map / unit of work for the hot workflow rows.
+
+Inside a scope (opened per request by paid.middleware.IdentityMapMiddleware):
+
+* get(Model, **lookup) loads a row at most once; repeated lookups, by the same
+  or a different key, return the same instance.
+* save(instance, update_fields) records the fields as dirty instead of
+  issuing an UPDATE; the scope flushes one UPDATE per instance with the merged
+  field list, in one transaction, when the request finishes. A save made
+  inside an atomic block is written straight away (with any fields already
+  pending for that row) so it commits or rolls back with the block.
+* flush() writes the pending saves now. Email and WhatsApp sends call it
+  first (mail_dispatch.send_messages, the paid WhatsApp link), so a failed
+  write fails the request before anything has reached the patient and a
+  retry does not send twice.
+
+Outside a scope (management commands, webhook worker, shell) both calls fall
+through to a plain query / save, so callers do not need to care which mode
+they run in. If the view raises, pending saves are discarded; if a flush
+fails, the error propagates and the request fails.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models, router, transaction
+
+_current = ContextVar("paid_identity_map", default=None)
+
+
+def _lookup_value(value):
+    return ("pk", value.pk) if isinstance(value, models.Model) else value
+
+
+class IdentityMap:
+    def __init__(self):
+        self._instances = {}  # (model label, pk) -> instance
+        self._aliases = {}  # (model label, lookup) -> (model label, pk)
+        self._dirty = {}  # (model label, pk) -> set of field names
+        self.hits = 0
+        self.loads = 0
+
+    @staticmethod
+    def _key(instance):
+        return (instance._meta.label, instance.pk)
+
+    def add(self, instance):
+        """Register a loaded/created instance; returns the canonical instance for its row."""
+        if instance is None or instance.pk is None:
+            return instance
+        return self._instances.setdefault(self._key(instance), instance)
+
+    def get(self, model, **lookup):
+        alias = (model._meta.label, tuple(sorted((k, _lookup_value(v)) for k, v in lookup.items())))
+        key = self._aliases.get(alias)
+        if key in self._instances:
+            self.hits += 1
+            return self._instances[key]
+        instance = model.objects.filter(**lookup).first()
+        self.loads += 1
+        if instance is None:
+            return None
+        instance = self.add(instance)
+        self._aliases[alias] = self._key(instance)
+        return instance
+
+    def save(self, instance, update_fields):
+        instance = self.add(instance)
+        key = self._key(instance)
+        self._dirty.setdefault(key, set()).update(update_fields)
+        using = router.db_for_write(type(instance), instance=instance)
+        if transaction.get_connection(using).in_atomic_block:
+            self._write(key, self._dirty.pop(key))
+
+    def discard(self):
+        self._dirty.clear()
+
+    def _write(self, key, fields):
+        self._instances[key].save(update_fields=sorted(fields))
+
+    def flush(self):
+        dirty, self._dirty = self._dirty, {}
+        if len(dirty) == 1:
+            self._write(*dirty.popitem())
+        elif dirty:
+            with transaction.atomic():
+                for key, fields in dirty.items():
+                    self._write(key, fields)
+
+
+def active() -> IdentityMap | None:
+    return _current.get()
+
+
+def get(model, **lookup):
+    unit = active()
+    if unit is None:
+        return model.objects.filter(**lookup).first()
+    return unit.get(model, **lookup)
+
+
+def register(instance):
+    unit = active()
+    return unit.add(instance) if unit is not None else instance
+
+
+def save(instance, update_fields):
+    unit = active()
+    if unit is None:
+        instance.save(update_fields=update_fields)
+    else:
+        unit.save(instance, update_fields)
+
+
+def flush():
+    unit = active()
+    if unit is not None:
+        unit.flush()
+
+
+def discard():
+    unit = active()
+    if unit is not None:
+        unit.discard()
+
+
+@contextmanager
+def scope():
+    unit = IdentityMap()
+    token = _current.set(unit)
+    try:
+        yield unit
+        unit.flush()
+    finally:
+        _current.reset(token)
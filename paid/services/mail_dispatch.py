@@ -0,0 +1,319 @@
+"""
+Batched report / link email dispatch.
+
+Callers queue OutgoingEmail objects on a MailBatch and send them together:
+
+* SendGrid: messages with identical subject, body and attachments are sent as
+  one /mail/send call with a personalization per recipient (each recipient
+  still gets a separate email), so a shared PDF is uploaded once. Distinct
+  messages (e.g. the doctor and patient report) are sent concurrently on a
+  small thread pool, each call bounded by MAIL_DISPATCH_TIMEOUT.
+* SMTP fallback: every message in the batch goes over one backend connection
+  instead of one connect/login per EmailMultiAlternatives.send().
+* Logging: EsPayEmailLog and WorkflowDeliveryAttempt rows for the batch are
+  inserted together once sending is done. Failed report emails are scheduled
+  for paid.services.delivery_retry.
+"""
+import base64
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+from content.outbound import sendgrid_send
+from paid.models import EsPayEmailLog
+from paid.services import audit, delivery_retry, identity_map
+
+logger = logging.getLogger(__name__)
+
+SIMULATED_EMAIL_BACKENDS = {
+    "django.core.mail.backends.console.EmailBackend",
+    "django.core.mail.backends.locmem.EmailBackend",
+    "django.core.mail.backends.filebased.EmailBackend",
+    "django.core.mail.backends.dummy.EmailBackend",
+}
+# SendGrid accepts at most 1000 personalizations per request.
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class OutgoingEmail:
+    to_email: str
+    subject: str
+    html: str
+    attachments: list = field(default_factory=list)  # [(filename, pdf bytes)]
+    text: str = "Please see attached report."
+    # Logging context; email_type/order feed EsPayEmailLog, workflow_case feeds WorkflowDeliveryAttempt.
+    email_type: str = ""
+    order: object = None
+    workflow_case: object = None
+    metadata: dict = field(default_factory=dict)
+
+    def content_key(self) -> tuple:
+        return (
+            self.subject,
+            self.html,
+            self.text,
+            tuple((name, hashlib.sha256(payload).hexdigest()) for name, payload in self.attachments),
+        )
+
+
+@dataclass
+class DispatchResult:
+    message: OutgoingEmail
+    ok: bool
+    meta: str
+    provider: str
+    email_log: EsPayEmailLog | None = None
+
+    @property
+    def status(self) -> str:
+        return "SENT" if self.ok else "FAILED"
+
+
+def _from_email() -> str:
+    return (
+        getattr(settings, "DEFAULT_FROM_EMAIL", "")
+        or getattr(settings, "SERVER_EMAIL", "")
+        or "no-reply@emoscreen.local"
+    )
+
+
+def _sendgrid_group(messages: list[OutgoingEmail]) -> tuple[bool, str]:
+    """Send messages that share content as one SendGrid request."""
+    from sendgrid.helpers.mail import (
+        Attachment,
+        Disposition,
+        Email,
+        FileContent,
+        FileName,
+        FileType,
+        Mail,
+        Personalization,
+        To,
+    )
+
+    first = messages[0]
+    mail = Mail(
+        from_email=Email(_from_email(), getattr(settings, "REPORT_FROM_NAME", "")),
+        subject=first.subject,
+        html_content=first.html,
+    )
+    for message in messages:
+        personalization = Personalization()
+        personalization.add_to(To(message.to_email))
+        mail.add_personalization(personalization)
+    for fname, payload in first.attachments:
+        mail.add_attachment(
+            Attachment(
+                FileContent(base64.b64encode(payload).decode("utf-8")),
+                FileName(fname),
+                FileType("application/pdf"),
+                Disposition("attachment"),
+            )
+        )
+
+    resp = sendgrid_send(mail)
+    ok = 200 <= resp.status_code < 300
+    if not ok:
+        logger.error("[Mail dispatch] SendGrid send failed status=%s body=%s", resp.status_code, resp.text[:500])
+        return False, f"status:{resp.status_code}"
+    return True, resp.headers.get("X-Message-Id", "") or f"status:{resp.status_code}"
+
+
+def _smtp_messages(messages: list[OutgoingEmail]) -> list[tuple[bool, str]]:
+    """Send each message over a single backend connection; returns (ok, meta) per message."""
+    backend_path = getattr(settings, "EMAIL_BACKEND", "")
+    if backend_path in SIMULATED_EMAIL_BACKENDS:
+        logger.error("[Mail dispatch] EMAIL_BACKEND=%s does not deliver externally", backend_path)
+        return [(False, f"simulated-backend:{backend_path}")] * len(messages)
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.exception("[Mail dispatch] could not open email backend connection")
+        return [(False, str(exc))] * len(messages)
+
+    outcomes = []
+    try:
+        for message in messages:
+            email = EmailMultiAlternatives(
+                subject=message.subject,
+                body=message.text,
+                from_email=_from_email(),
+                to=[message.to_email],
+                connection=connection,
+            )
+            email.attach_alternative(message.html, "text/html")
+            for fname, payload in message.attachments:
+                email.attach(filename=fname, content=payload, mimetype="application/pdf")
+            try:
+                sent = connection.send_messages([email])
+            except Exception as exc:
+                logger.exception("[Mail dispatch] SMTP send error for %s", message.to_email)
+                outcomes.append((False, str(exc)))
+                continue
+            if sent:
+                outcomes.append((True, "smtp:sent"))
+            else:
+                logger.error("[Mail dispatch] SMTP backend returned sent=0 for %s", message.to_email)
+                outcomes.append((False, "smtp:no_delivery"))
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            logger.warning("[Mail dispatch] error closing email backend connection", exc_info=True)
+    return outcomes
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, getattr(settings, "MAIL_DISPATCH_MAX_WORKERS", 4)),
+                    thread_name_prefix="mail-dispatch",
+                )
+    return _executor
+
+
+def _sendgrid_outcome(messages: list[OutgoingEmail]) -> tuple[bool, str]:
+    try:
+        return _sendgrid_group(messages)
+    except Exception:
+        logger.exception("[Mail dispatch] SendGrid error; falling back to email backend")
+        return False, ""
+
+
+def _sendgrid_outcomes(chunks: list[list[OutgoingEmail]]) -> list[tuple[bool, str | None]]:
+    """
+    Send each chunk as one SendGrid request, concurrently when there is more than one.
+    Returns (ok, meta) per chunk; meta is None for a call that timed out.
+    """
+    if len(chunks) == 1:
+        return [_sendgrid_outcome(chunks[0])]
+
+    timeout = getattr(settings, "MAIL_DISPATCH_TIMEOUT", 30)
+    executor = _get_executor()
+    futures = [executor.submit(_sendgrid_outcome, chunk) for chunk in chunks]
+    deadline = time.monotonic() + timeout
+    outcomes = []
+    for chunk, future in zip(chunks, futures):
+        try:
+            outcomes.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeoutError:
+            logger.error("[Mail dispatch] SendGrid call for %s timed out after %ss", chunk[0].to_email, timeout)
+            outcomes.append((False, None))
+    return outcomes
+
+
+def send_messages(messages: list[OutgoingEmail]) -> list[DispatchResult]:
+    """Send a batch and return one DispatchResult per message, in input order. Nothing is logged."""
+    # Deferred identity-map saves are written first, so a failed write cannot follow a delivered email.
+    identity_map.flush()
+    results: list[DispatchResult | None] = [None] * len(messages)
+    smtp_indexes = []
+
+    if getattr(settings, "SENDGRID_API_KEY", ""):
+        groups: dict[tuple, list[int]] = {}
+        for index, message in enumerate(messages):
+            groups.setdefault(message.content_key(), []).append(index)
+        chunks = [
+            indexes[start:start + SENDGRID_MAX_PERSONALIZATIONS]
+            for indexes in groups.values()
+            for start in range(0, len(indexes), SENDGRID_MAX_PERSONALIZATIONS)
+        ]
+        outcomes = _sendgrid_outcomes([[messages[i] for i in chunk] for chunk in chunks])
+        for chunk, (ok, meta) in zip(chunks, outcomes):
+            if ok:
+                for i in chunk:
+                    results[i] = DispatchResult(messages[i], True, meta, "sendgrid")
+            elif meta is None:
+                # The request may still land; falling back to SMTP could deliver twice.
+                for i in chunk:
+                    results[i] = DispatchResult(messages[i], False, "sendgrid:timeout", "sendgrid")
+            else:
+                smtp_indexes.extend(chunk)
+    else:
+        logger.warning("[Mail dispatch] SENDGRID_API_KEY missing; using Django email backend")
+        smtp_indexes = list(range(len(messages)))
+
+    if smtp_indexes:
+        smtp_indexes.sort()
+        outcomes = _smtp_messages([messages[i] for i in smtp_indexes])
+        for i, (ok, meta) in zip(smtp_indexes, outcomes):
+            results[i] = DispatchResult(messages[i], ok, meta, "local-email-backend")
+    return results
+
+
+def record_results(results: list[DispatchResult]) -> list[DispatchResult]:
+    """Write EsPayEmailLog and WorkflowDeliveryAttempt rows for a sent batch in bulk."""
+    logged = [r for r in results if r.message.order is not None and r.message.email_type]
+    logs = [
+        EsPayEmailLog(
+            order=r.message.order,
+            email_type=r.message.email_type,
+            to_email=r.message.to_email,
+            subject=r.message.subject,
+            sendgrid_message_id=r.meta if r.ok else "",
+            status=r.status,
+            error_text="" if r.ok else str(r.meta),
+        )
+        for r in logged
+    ]
+    audit.bulk_create_with_ids(EsPayEmailLog, logs)
+    for result, log in zip(logged, logs):
+        result.email_log = log
+
+    audit.record_deliveries([
+        {
+            "case": r.message.workflow_case,
+            "channel": "EMAIL",
+            "recipient": r.message.to_email,
+            "subject": r.message.subject,
+            "status": r.status,
+            "provider": r.provider,
+            "provider_message_id": r.meta if r.ok else "",
+            "error_text": "" if r.ok else str(r.meta),
+            "metadata": {"email_type": r.message.email_type, **r.message.metadata},
+            "email_log": r.email_log,
+            "next_retry_at": None if r.ok else delivery_retry.next_retry_at(r.message.email_type, 0),
+        }
+        for r in results
+        if r.message.workflow_case is not None
+    ])
+    return results
+
+
+class MailBatch:
+    """Queue messages with add(), then send() them together and log the batch."""
+
+    def __init__(self):
+        self.messages: list[OutgoingEmail] = []
+
+    def add(self, message: OutgoingEmail) -> OutgoingEmail:
+        self.messages.append(message)
+        return message
+
+    def send(self, *, record: bool = True) -> list[DispatchResult]:
+        messages, self.messages = self.messages, []
+        if not messages:
+            return []
+        results = send_messages(messages)
+        if record:
+            try:
+                record_results(results)
+            except Exception as exc:
+                print("Workflow audit error (mail batch):", exc)
+        return results
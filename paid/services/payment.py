@@ -8,6 +8,8 @@ from typing import Any
 import requests
 from django.conf import settings
 
+from content.outbound import get_client
+
 
 class RazorpayError(Exception):
     pass
@@ -58,12 +60,14 @@ class RazorpayAdapter:
             "payment_capture": 1,
             "notes": notes or {},
         }
-        response = requests.post(
-            f"{self.api_base}/orders",
-            headers={**self._auth_header(), "Content-Type": "application/json"},
-            data=json.dumps(payload),
-            timeout=20,
-        )
+        try:
+            response = get_client("razorpay").post(
+                f"{self.api_base}/orders",
+                headers={**self._auth_header(), "Content-Type": "application/json"},
+                data=json.dumps(payload),
+            )
+        except requests.RequestException as exc:
+            raise RazorpayError(f"Razorpay order create failed: {exc}") from exc
         if response.status_code >= 400:
             raise RazorpayError(f"Razorpay order create failed: {response.status_code} {response.text}")
 
@@ -0,0 +1,330 @@
+"""
+Storage for paid report PDFs.
+
+EsRepReport.patient_pdf_path/doctor_pdf_path hold a storage key such as
+"3f/a2/ORD123/patient.pdf". The first two levels come from a hash of the order
+code, so no directory (or S3 listing prefix) grows with the number of orders.
+Rows written before keys existed hold absolute file paths; those are always
+read from the local disk, whatever the configured backend.
+
+REPORT_STORAGE_BACKEND picks where keys live:
+
+* "local" (default): files under REPORT_STORAGE_ROOT (MEDIA_ROOT/paid_reports).
+  A write goes to a temp file in the target directory and is os.replace()d into
+  place, so a download or email never reads half a PDF.
+* "s3": an S3-compatible bucket (AWS, MinIO, ...) over the shared outbound
+  session, path-style and SigV4 signed. A PUT replaces the object atomically.
+
+serve() answers a download:
+
+* local with REPORT_DOWNLOAD_OFFLOAD="nginx": X-Accel-Redirect to
+  REPORT_ACCEL_PREFIX + key; "sendfile": X-Sendfile with the file path. The
+  web server then streams the file and handles Range/conditional requests.
+* local without offload: Django streams the file itself, with ETag and
+  Last-Modified validators (304/412) and single byte ranges (206/416).
+* s3: a redirect to a short-lived presigned GET URL; S3 handles the rest.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from content.outbound import get_client
+
+PDF_CONTENT_TYPE = "application/pdf"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def report_keys(order_code: str) -> dict:
+    digest = hashlib.sha256(order_code.encode("utf-8")).hexdigest()
+    base = f"{digest[:2]}/{digest[2:4]}/{order_code}"
+    return {
+        "patient": f"{base}/patient.pdf",
+        "doctor": f"{base}/doctor.pdf",
+    }
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _byte_range(request, size: int, etag: str, last_modified: int):
+    """Inclusive (start, end) of a single requested byte range, or None to send the whole file."""
+    header = request.META.get("HTTP_RANGE", "")
+    if not header or request.method not in ("GET", "HEAD"):
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range not in (etag, http_date(last_modified)):
+        return None
+    # Multiple ranges and malformed headers get the whole file, which RFC 9110 allows.
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _file_response(request, path: Path, filename: str):
+    stat = os.stat(path)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        else:
+            if byte_range is None:
+                response = FileResponse(open(path, "rb"), as_attachment=True, filename=filename,
+                                        content_type=PDF_CONTENT_TYPE)
+            else:
+                start, end = byte_range
+                with open(path, "rb") as handle:
+                    handle.seek(start)
+                    response = HttpResponse(handle.read(end - start + 1), status=206, content_type=PDF_CONTENT_TYPE)
+                response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+                response["Content-Disposition"] = content_disposition_header(True, filename)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+class LocalReportStorage:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        # Absolute (pre-key) paths replace the root when joined.
+        return self.root / key
+
+    def save(self, key: str, data: bytes) -> str:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return key
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as handle:
+            return handle.read()
+
+    def exists(self, key: str) -> bool:
+        return bool(key) and self.path(key).is_file()
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def serve(self, request, key: str, filename: str):
+        path = self.path(key)
+        offload = getattr(settings, "REPORT_DOWNLOAD_OFFLOAD", "")
+        if offload == "nginx":
+            try:
+                relative = path.relative_to(self.root).as_posix()
+            except ValueError:
+                return _file_response(request, path, filename)
+            response = HttpResponse(content_type=PDF_CONTENT_TYPE)
+            prefix = getattr(settings, "REPORT_ACCEL_PREFIX", "/protected/paid_reports/").rstrip("/")
+            response["X-Accel-Redirect"] = f"{prefix}/{quote(relative)}"
+        elif offload == "sendfile":
+            response = HttpResponse(content_type=PDF_CONTENT_TYPE)
+            response["X-Sendfile"] = str(path)
+        else:
+            return _file_response(request, path, filename)
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+def _hmac_sha256(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _canonical_query(query: dict) -> str:
+    return "&".join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(query.items()))
+
+
+class S3ReportStorage:
+    def __init__(self, *, bucket: str, endpoint_url: str, region: str, access_key: str, secret_key: str,
+                 prefix: str = "", url_expiry: int = 300):
+        self.bucket = bucket
+        self.endpoint_url = (endpoint_url or f"https://s3.{region}.amazonaws.com").rstrip("/")
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.prefix = prefix
+        self.url_expiry = url_expiry
+
+    def _object_url(self, key: str) -> str:
+        path = "/".join(quote(part, safe="-_.~") for part in f"{self.bucket}/{self.prefix}{key}".split("/"))
+        return f"{self.endpoint_url}/{path}"
+
+    def _signature(self, now: datetime, method: str, url: str, query: dict, headers: dict, payload_hash: str):
+        """SigV4 over the request. headers must be lower-case and include host. Returns (signed headers, signature)."""
+        date = now.strftime("%Y%m%d")
+        signed = sorted(headers)
+        canonical_request = "\n".join([
+            method,
+            urlsplit(url).path,
+            _canonical_query(query),
+            "".join(f"{name}:{str(headers[name]).strip()}\n" for name in signed),
+            ";".join(signed),
+            payload_hash,
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            now.strftime("%Y%m%dT%H%M%SZ"),
+            self._scope(now),
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        signing_key = ("AWS4" + self.secret_key).encode("utf-8")
+        for part in (date, self.region, "s3", "aws4_request"):
+            signing_key = _hmac_sha256(signing_key, part)
+        return ";".join(signed), hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _scope(self, now: datetime) -> str:
+        return f"{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+
+    def _request(self, method: str, key: str, data: bytes = b"", headers: dict | None = None):
+        url = self._object_url(key)
+        now = datetime.now(timezone.utc)
+        payload_hash = hashlib.sha256(data).hexdigest()
+        headers = {
+            "host": urlsplit(url).netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": now.strftime("%Y%m%dT%H%M%SZ"),
+            **(headers or {}),
+        }
+        signed, signature = self._signature(now, method, url, {}, headers, payload_hash)
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{self._scope(now)}, "
+            f"SignedHeaders={signed}, Signature={signature}"
+        )
+        # Every call here is safe to repeat: a retried PUT writes the same bytes again.
+        return get_client("s3").request(method, url, idempotent=True, data=data or None, headers=headers)
+
+    def save(self, key: str, data: bytes) -> str:
+        response = self._request("PUT", key, data, {"content-type": PDF_CONTENT_TYPE})
+        if response.status_code >= 300:
+            raise OSError(f"S3 PUT {key} failed: HTTP {response.status_code} {response.text[:200]}")
+        return key
+
+    def read(self, key: str) -> bytes:
+        response = self._request("GET", key)
+        if response.status_code == 404:
+            raise FileNotFoundError(f"S3 object not found: {key}")
+        if response.status_code >= 300:
+            raise OSError(f"S3 GET {key} failed: HTTP {response.status_code}")
+        return response.content
+
+    def exists(self, key: str) -> bool:
+        if not key:
+            return False
+        response = self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        if response.status_code >= 300:
+            raise OSError(f"S3 HEAD {key} failed: HTTP {response.status_code}")
+        return True
+
+    def delete(self, key: str):
+        response = self._request("DELETE", key)
+        if response.status_code >= 300 and response.status_code != 404:
+            raise OSError(f"S3 DELETE {key} failed: HTTP {response.status_code}")
+
+    def presigned_url(self, key: str, filename: str = "") -> str:
+        url = self._object_url(key)
+        now = datetime.now(timezone.utc)
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{self._scope(now)}",
+            "X-Amz-Date": now.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": str(self.url_expiry),
+            "X-Amz-SignedHeaders": "host",
+        }
+        if filename:
+            query["response-content-disposition"] = content_disposition_header(True, filename)
+        _signed, signature = self._signature(now, "GET", url, query, {"host": urlsplit(url).netloc}, "UNSIGNED-PAYLOAD")
+        query["X-Amz-Signature"] = signature
+        return f"{url}?{_canonical_query(query)}"
+
+    def serve(self, request, key: str, filename: str):
+        response = HttpResponseRedirect(self.presigned_url(key, filename))
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+
+def _local_storage() -> LocalReportStorage:
+    root = getattr(settings, "REPORT_STORAGE_ROOT", "") or Path(settings.MEDIA_ROOT) / "paid_reports"
+    return LocalReportStorage(root)
+
+
+def get_storage(key: str = ""):
+    """The configured backend, or the local disk for absolute (pre-key) paths."""
+    if key and os.path.isabs(key):
+        return _local_storage()
+    if getattr(settings, "REPORT_STORAGE_BACKEND", "local") == "s3":
+        return S3ReportStorage(
+            bucket=settings.REPORT_S3_BUCKET,
+            endpoint_url=getattr(settings, "REPORT_S3_ENDPOINT_URL", ""),
+            region=getattr(settings, "REPORT_S3_REGION", "us-east-1"),
+            access_key=settings.REPORT_S3_ACCESS_KEY_ID,
+            secret_key=settings.REPORT_S3_SECRET_ACCESS_KEY,
+            prefix=getattr(settings, "REPORT_S3_PREFIX", ""),
+            url_expiry=getattr(settings, "REPORT_S3_URL_EXPIRY", 300),
+        )
+    return _local_storage()
+
+
+def save_report(key: str, data: bytes) -> str:
+    return get_storage(key).save(key, data)
+
+
+def read_report(key: str) -> bytes:
+    return get_storage(key).read(key)
+
+
+def report_exists(key: str) -> bool:
+    return get_storage(key).exists(key)
+
+
+def serve_report(request, key: str, filename: str):
+    return get_storage(key).serve(request, key, filename)
@@ -1,14 +1,17 @@
 import io
-import os
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 from django.conf import settings
+from django.utils import timezone
 from pypdf import PdfReader, PdfWriter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 from paid.models import (
@@ -20,12 +23,15 @@ from paid.models import (
     EsSubAnswer,
     EsSubScaleScore,
 )
+from paid.services import report_storage
 
 BRAND_LOGO_FILENAME = "logo_eq_final.jpeg"
 BRAND_GREEN = colors.HexColor("#4caf50")
 BRAND_BLUE = colors.HexColor("#0b2a4d")
 TABLE_BORDER = colors.HexColor("#d6d6d6")
 FOOTER_BG = colors.HexColor("#f3f3f3")
+ROW_STRIPE = colors.HexColor("#efefef")
+PAGE_FURNITURE_FORM = "page_furniture"
 
 
 def build_pdf_password(prefix_source: str, phone: str) -> str:
@@ -34,15 +40,6 @@ def build_pdf_password(prefix_source: str, phone: str) -> str:
     return f"{source[:4]}{phone_digits[-4:]}"
 
 
-def report_paths(order_code: str):
-    base = Path(settings.MEDIA_ROOT) / "paid_reports" / order_code
-    os.makedirs(base, exist_ok=True)
-    return {
-        "patient": str(base / "patient.pdf"),
-        "doctor": str(base / "doctor.pdf"),
-    }
-
-
 def _encrypt_pdf(raw_pdf: bytes, password: str) -> bytes:
     reader = PdfReader(io.BytesIO(raw_pdf))
     writer = PdfWriter()
@@ -69,29 +66,44 @@ def _age_text(dob, assessment_date):
     return f"{rem} months"
 
 
-def _question_rows(submission):
-    question_qs = EsCfgQuestion.objects.filter(form=submission.form).order_by("global_order", "question_order")
-    answers = {a.question_id: a for a in EsSubAnswer.objects.filter(submission=submission)}
-    options = {o.option_code: o for o in EsCfgOption.objects.all()}
+@dataclass(frozen=True)
+class ReportData:
+    """
+    Everything both report variants render, loaded once per submission by
+    load_report_data(). Header fields keep the EsSubSubmission attribute names.
+    """
+
+    child_name: str
+    child_dob: object
+    assessment_date: object
+    gender: str
+    completed_by: str
+    total_score: object
+    total_score_max_display: object
+    has_concerns: bool
+    question_rows: tuple  # (sr, question text, response label)
+    risk_rows: tuple  # (scale label, score, max score, risk percent) for scales in the doctor table
+    ace_items: tuple
+    templates: tuple  # ((report_type, EsCfgReportTemplate), ...)
+
+    def template(self, report_type) -> EsCfgReportTemplate | None:
+        return dict(self.templates).get(report_type)
+
 
+def _question_rows(questions, answers, options):
     rows = []
-    for q in question_qs:
-        ans = answers.get(q.question_code)
-        if not ans:
+    for q in questions:
+        raw = answers.get(q.question_code)
+        if raw is None:
             continue
-        raw = str(ans.value_json)
         opt = options.get(raw)
         label = opt.label if opt else raw
         rows.append((len(rows) + 1, q.question_text, label))
     return rows
 
 
-def _ace_items(submission):
-    answers = {a.question_id: str(a.value_json) for a in EsSubAnswer.objects.filter(submission=submission)}
-    question_map = {q.question_code: q for q in EsCfgQuestion.objects.filter(form=submission.form)}
-    option_map = {o.option_code: o for o in EsCfgOption.objects.all()}
-
-    ace_lists = EsCfgDerivedList.objects.filter(form=submission.form, name__icontains="ace")
+def _ace_items(questions, answers, options, ace_lists):
+    question_map = {q.question_code: q for q in questions}
     items = []
     for dl in ace_lists:
         expected = str(dl.filter_response_value or "").strip().lower()
@@ -102,7 +114,7 @@ def _ace_items(submission):
                 continue
             if section_code and q.section_id != section_code:
                 continue
-            opt = option_map.get(raw)
+            opt = options.get(raw)
             candidates = {raw.lower()}
             if opt:
                 candidates.add(str(opt.value).strip().lower())
@@ -112,20 +124,55 @@ def _ace_items(submission):
     return list(dict.fromkeys(items))
 
 
-def _header_band(submission):
-    age = _age_text(submission.child_dob, submission.assessment_date)
+def load_report_data(submission) -> ReportData:
+    """Load a submission's answers, options, scores, ACE lists and templates in a fixed set of queries."""
+    answers = {
+        question_id: str(value)
+        for question_id, value in EsSubAnswer.objects.filter(submission=submission).values_list("question_id", "value_json")
+    }
+    questions = list(
+        EsCfgQuestion.objects.filter(form_id=submission.form_id).order_by("global_order", "question_order")
+    )
+    # Only the options the answers point at, not the whole option table.
+    options = {o.option_code: o for o in EsCfgOption.objects.filter(option_code__in=set(answers.values()))}
+    ace_lists = list(EsCfgDerivedList.objects.filter(form_id=submission.form_id, name__icontains="ace"))
+    risk_rows = tuple(
+        (s.scale.label, s.score, s.max_score, s.risk_percent)
+        for s in EsSubScaleScore.objects.filter(submission=submission, included_in_doctor_table=True).select_related("scale")
+    )
+    templates = {}
+    for t in EsCfgReportTemplate.objects.filter(form_id=submission.form_id, report_type__in=("patient", "doctor")):
+        templates.setdefault(t.report_type, t)
+
+    return ReportData(
+        child_name=submission.child_name,
+        child_dob=submission.child_dob,
+        assessment_date=submission.assessment_date,
+        gender=submission.gender,
+        completed_by=submission.completed_by,
+        total_score=submission.total_score,
+        total_score_max_display=submission.total_score_max_display,
+        has_concerns=bool(submission.has_concerns),
+        question_rows=tuple(_question_rows(questions, answers, options)),
+        risk_rows=risk_rows,
+        ace_items=tuple(_ace_items(questions, answers, options, ace_lists)),
+        templates=tuple(templates.items()),
+    )
+
+
+def _header_band(data):
+    age = _age_text(data.child_dob, data.assessment_date)
     left = (
-        f"Child Name: {submission.child_name or ''}<br/>"
+        f"Child Name: {data.child_name or ''}<br/>"
         f"Child Age: {age}<br/>"
-        f"Child Gender: {submission.gender or ''}<br/>"
-        f"Completed By: {submission.completed_by or ''}"
+        f"Child Gender: {data.gender or ''}<br/>"
+        f"Completed By: {data.completed_by or ''}"
     )
-    right = f"Date: {submission.assessment_date or ''}"
+    right = f"Date: {data.assessment_date or ''}"
     return left, right
 
 
-def _disclaimer_html(form, report_type):
-    t = _report_template(form, report_type)
+def _disclaimer_html(t: EsCfgReportTemplate | None):
     if t and t.disclaimer_html:
         return t.disclaimer_html
     return (
@@ -150,11 +197,9 @@ def _normalize_paragraph_html(text: str) -> str:
     return cleaned
 
 
-def _report_template(form, report_type):
-    return EsCfgReportTemplate.objects.filter(form=form, report_type=report_type).first()
-
-
+@lru_cache(maxsize=32)
 def _resolve_logo_path(logo_value: str) -> str | None:
+    """Resolved once per process per value; a logo added later needs a restart."""
     if not logo_value:
         return None
 
@@ -180,6 +225,12 @@ def _resolve_logo_path(logo_value: str) -> str | None:
     return None
 
 
+@lru_cache(maxsize=8)
+def _logo_image(path: str) -> ImageReader:
+    # One reader per process, so the file is read and decoded once, not per page or per report.
+    return ImageReader(path)
+
+
 def _draw_page_footer(canvas, doc, template: EsCfgReportTemplate | None):
     canvas.saveState()
     page_width, _page_height = A4
@@ -217,7 +268,7 @@ def _draw_page_footer(canvas, doc, template: EsCfgReportTemplate | None):
     canvas.restoreState()
 
 
-def _draw_page_header(canvas, doc, template: EsCfgReportTemplate | None, submission, report_type: str):
+def _draw_page_header(canvas, doc, template: EsCfgReportTemplate | None, data: ReportData, report_type: str):
     canvas.saveState()
     page_width, page_height = A4
     text_left = 8 * mm
@@ -235,7 +286,7 @@ def _draw_page_header(canvas, doc, template: EsCfgReportTemplate | None, submiss
     logo_y = top_y - 17 * mm
     if logo_path:
         canvas.drawImage(
-            logo_path,
+            _logo_image(logo_path),
             text_left,
             logo_y,
             width=112 * mm,
@@ -244,7 +295,7 @@ def _draw_page_header(canvas, doc, template: EsCfgReportTemplate | None, submiss
             mask="auto",
         )
 
-    header_left, header_right = _header_band(submission)
+    header_left, header_right = _header_band(data)
     band_top = logo_y - 6 * mm
     band_height = 30 * mm
     canvas.setFillColor(BRAND_GREEN)
@@ -264,8 +315,21 @@ def _draw_page_header(canvas, doc, template: EsCfgReportTemplate | None, submiss
     canvas.restoreState()
 
 
-def _build_pdf(report_type: str, submission) -> bytes:
-    template = _report_template(submission.form, report_type)
+def _draw_page_furniture(canvas, doc, template: EsCfgReportTemplate | None, data: ReportData, report_type: str):
+    """
+    Header and footer are identical on every page of a report, so they are
+    drawn into a form XObject on the first page and each page references it.
+    """
+    if not canvas.hasForm(PAGE_FURNITURE_FORM):
+        canvas.beginForm(PAGE_FURNITURE_FORM)
+        _draw_page_header(canvas, doc, template, data, report_type)
+        _draw_page_footer(canvas, doc, template)
+        canvas.endForm()
+    canvas.doForm(PAGE_FURNITURE_FORM)
+
+
+def _build_pdf(report_type: str, data: ReportData) -> bytes:
+    template = data.template(report_type)
     styles = getSampleStyleSheet()
     h_style = ParagraphStyle("h", parent=styles["Heading2"], fontName="Times-Bold", fontSize=13, textColor=BRAND_BLUE, spaceBefore=10, spaceAfter=8)
     body = ParagraphStyle("body", parent=styles["BodyText"], fontName="Times-Roman", fontSize=12, leading=16)
@@ -316,7 +380,7 @@ def _build_pdf(report_type: str, submission) -> bytes:
             Paragraph("Response", table_cell_bold),
         ]
     ]
-    for idx, q, a in _question_rows(submission):
+    for idx, q, a in data.question_rows:
         response_rows.append([
             Paragraph(str(idx), table_cell),
             Paragraph(str(q), table_cell),
@@ -336,16 +400,14 @@ def _build_pdf(report_type: str, submission) -> bytes:
         ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
         ("VALIGN", (0, 0), (-1, -1), "TOP"),
         ("ALIGN", (0, 1), (0, -1), "CENTER"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [None, ROW_STRIPE]),
     ]))
-    for row_idx in range(1, len(response_rows)):
-        if row_idx % 2 == 0:
-            rt.setStyle(TableStyle([("BACKGROUND", (0, row_idx), (-1, row_idx), colors.HexColor("#efefef"))]))
     story.append(rt)
 
     if report_type == "doctor":
         story.append(Spacer(1, 8))
         story.append(Paragraph(
-            f"Total score for this filled questionnaire is {submission.total_score or 0} / {submission.total_score_max_display or 0}",
+            f"Total score for this filled questionnaire is {data.total_score or 0} / {data.total_score_max_display or 0}",
             body,
         ))
 
@@ -354,11 +416,11 @@ def _build_pdf(report_type: str, submission) -> bytes:
             Paragraph("Score", table_cell_bold),
             Paragraph("Risk Factor (%)", table_cell_bold),
         ]]
-        for s in EsSubScaleScore.objects.filter(submission=submission, included_in_doctor_table=True).select_related("scale"):
+        for label, score, max_score, risk_percent in data.risk_rows:
             risk_rows.append([
-                Paragraph(str(s.scale.label), table_cell),
-                Paragraph(f"{s.score}/{s.max_score}", table_cell),
-                Paragraph(f"{s.risk_percent:.2f}", table_cell),
+                Paragraph(str(label), table_cell),
+                Paragraph(f"{score}/{max_score}", table_cell),
+                Paragraph(f"{risk_percent:.2f}", table_cell),
             ])
         if len(risk_rows) > 1:
             story.append(Paragraph("The results fall into moderate to high risk for the following disorders:", body))
@@ -377,7 +439,7 @@ def _build_pdf(report_type: str, submission) -> bytes:
             ]))
             story.append(risk_table)
 
-        ace = _ace_items(submission)
+        ace = data.ace_items
         if ace:
             story.append(Spacer(1, 8))
             story.append(Paragraph("ACE:", h_style))
@@ -386,17 +448,16 @@ def _build_pdf(report_type: str, submission) -> bytes:
 
         summary = (
             "As per the report, some concerns are observed in the child. This requires thorough evaluation & an urgent referral and support of a family EQ coach."
-            if submission.has_concerns
+            if data.has_concerns
             else "As per the report, no major concerns have been observed in the child. However, close monitoring for changes in behaviour & a follow-up with you is advised after 3 months to review."
         )
         story.append(Spacer(1, 8))
         story.append(Paragraph(summary, body))
 
     story.append(Spacer(1, 10))
-    story.append(Paragraph(_normalize_paragraph_html(_disclaimer_html(submission.form, report_type)), body))
+    story.append(Paragraph(_normalize_paragraph_html(_disclaimer_html(template)), body))
     def _on_page(canvas, doc):
-        _draw_page_header(canvas, doc, template, submission, report_type)
-        _draw_page_footer(canvas, doc, template)
+        _draw_page_furniture(canvas, doc, template, data, report_type)
 
     doc.build(story, onFirstPage=_on_page, onLaterPages=_on_page)
     return buf.getvalue()
@@ -409,20 +470,20 @@ def generate_and_store_reports(submission):
     patient_pwd = build_pdf_password(submission.child_name or order.patient_name, order.patient_whatsapp)
     doctor_pwd = build_pdf_password(doctor.email, doctor.whatsapp or "")
 
-    patient_pdf = _encrypt_pdf(_build_pdf("patient", submission), patient_pwd)
-    doctor_pdf = _encrypt_pdf(_build_pdf("doctor", submission), doctor_pwd)
+    data = load_report_data(submission)
+    patient_pdf = _encrypt_pdf(_build_pdf("patient", data), patient_pwd)
+    doctor_pdf = _encrypt_pdf(_build_pdf("doctor", data), doctor_pwd)
 
-    paths = report_paths(order.order_code)
-    with open(paths["patient"], "wb") as f:
-        f.write(patient_pdf)
-    with open(paths["doctor"], "wb") as f:
-        f.write(doctor_pdf)
+    keys = report_storage.report_keys(order.order_code)
+    report_storage.save_report(keys["patient"], patient_pdf)
+    report_storage.save_report(keys["doctor"], doctor_pdf)
 
     report, _ = EsRepReport.objects.update_or_create(
         submission=submission,
         defaults={
-            "patient_pdf_path": paths["patient"],
-            "doctor_pdf_path": paths["doctor"],
+            "patient_pdf_path": keys["patient"],
+            "doctor_pdf_path": keys["doctor"],
+            "generated_at": timezone.now(),
             "patient_pdf_password_hint": f"{(submission.child_name or order.patient_name)[:4]} + last 4 digits of patient WhatsApp",
             "doctor_pdf_password_hint": f"{(doctor.email or '')[:4]} + last 4 digits of doctor WhatsApp",
         },
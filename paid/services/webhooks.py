@@ -0,0 +1,152 @@
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from paid.models import EsPayOrder, EsPayTransaction, EsPayWebhookEvent
+from paid.services import audit
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_SUCCESS_EVENTS = {"payment.captured", "order.paid"}
+RAZORPAY_FAILURE_EVENTS = {"payment.failed"}
+MAX_ATTEMPTS = 5
+# A worker that died mid-event leaves it PROCESSING; pick it up again after this.
+STALE_PROCESSING_AFTER = timedelta(minutes=10)
+
+
+def razorpay_event_id(headers, body: bytes) -> str:
+    """Razorpay sends a stable id per event (reused on retries); hash the body if it is missing."""
+    event_id = (headers.get("X-Razorpay-Event-Id") or "").strip()
+    if event_id:
+        return event_id
+    return f"sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def record_razorpay_event(*, event_id: str, payload: dict, base_url: str = ""):
+    """Persist a verified webhook delivery. Returns (event, created); replays return the existing row."""
+    payload_root = payload.get("payload", {})
+    payment_entity = payload_root.get("payment", {}).get("entity", {})
+    order_entity = payload_root.get("order", {}).get("entity", {})
+    return EsPayWebhookEvent.objects.get_or_create(
+        event_id=event_id,
+        defaults={
+            "gateway": "razorpay",
+            "event_type": payload.get("event", ""),
+            "gateway_order_id": payment_entity.get("order_id") or order_entity.get("id", ""),
+            "gateway_payment_id": payment_entity.get("id", ""),
+            "payload_json": payload,
+            "base_url": base_url,
+        },
+    )
+
+
+def pending_events():
+    stale_before = timezone.now() - STALE_PROCESSING_AFTER
+    return EsPayWebhookEvent.objects.filter(
+        Q(status=EsPayWebhookEvent.Status.RECEIVED)
+        | Q(status=EsPayWebhookEvent.Status.FAILED, attempts__lt=MAX_ATTEMPTS)
+        | Q(status=EsPayWebhookEvent.Status.PROCESSING, updated_at__lt=stale_before)
+    ).order_by("created_at", "id")
+
+
+def _claim(event_pk):
+    with transaction.atomic():
+        event = pending_events().select_for_update(skip_locked=True).filter(pk=event_pk).first()
+        if not event:
+            return None
+        event.status = EsPayWebhookEvent.Status.PROCESSING
+        event.attempts += 1
+        event.save(update_fields=["status", "attempts", "updated_at"])
+        return event
+
+
+def _apply_razorpay_event(event: EsPayWebhookEvent):
+    """
+    Apply the payment state change. Safe to run more than once for the same
+    event and for out-of-order events: a captured payment is never downgraded
+    and the audit transitions only fire on an actual status change.
+    Returns (outcome, order) where order is set when the assessment link should go out.
+    """
+    with transaction.atomic():
+        tx = (
+            EsPayTransaction.objects.select_for_update()
+            .filter(gateway_order_id=event.gateway_order_id)
+            .order_by("-created_at")
+            .first()
+        )
+        if not tx:
+            return "transaction_not_found", None
+
+        if event.event_type in RAZORPAY_FAILURE_EVENTS and tx.status == EsPayTransaction.Status.FAILED:
+            # Redelivered failure: already recorded and audited.
+            return "no_change", None
+
+        order = EsPayOrder.objects.select_for_update().get(pk=tx.order_id)
+        was_success = tx.status == EsPayTransaction.Status.SUCCESS
+        tx.gateway_payment_id = event.gateway_payment_id or tx.gateway_payment_id
+        tx.raw_payload_json = event.payload_json
+        if event.event_type in RAZORPAY_SUCCESS_EVENTS:
+            tx.status = EsPayTransaction.Status.SUCCESS
+        elif event.event_type in RAZORPAY_FAILURE_EVENTS and not was_success:
+            tx.status = EsPayTransaction.Status.FAILED
+        tx.save(update_fields=["gateway_payment_id", "raw_payload_json", "status", "updated_at"])
+
+        if tx.status == EsPayTransaction.Status.SUCCESS:
+            from paid.views import _create_revenue_split
+
+            if order.status != EsPayOrder.Status.PAID:
+                order.status = EsPayOrder.Status.PAID
+                order.paid_at = order.paid_at or timezone.now()
+                order.save(update_fields=["status", "paid_at", "updated_at"])
+            _create_revenue_split(tx)
+            if not was_success:
+                audit.mark_payment_completed(audit.case_for_order(order), order, tx)
+            return "payment_completed", order
+
+        if tx.status == EsPayTransaction.Status.FAILED:
+            audit.mark_payment_failed(audit.case_for_order(order), order, tx, "Razorpay webhook marked payment failed.")
+            return "payment_failed", None
+    return "no_change", None
+
+
+def process_event(event_pk) -> str | None:
+    """Claim, apply and notify for one inbox row. Returns the final status, or None if another worker has it."""
+    event = _claim(event_pk)
+    if not event:
+        return None
+
+    try:
+        outcome, order = _apply_razorpay_event(event)
+        if order is not None:
+            # Runs after the state change commits; the sender dedupes on
+            # EsPayEmailLog / WorkflowDeliveryAttempt so retries do not resend.
+            from paid.views import _send_assessment_link_email
+
+            _send_assessment_link_email(order, None, audit.case_for_order(order), base_url=event.base_url)
+    except Exception as exc:
+        logger.exception("[Razorpay webhook] event %s failed", event.event_id)
+        event.status = EsPayWebhookEvent.Status.FAILED
+        event.last_error = str(exc)
+        event.save(update_fields=["status", "last_error", "updated_at"])
+        return event.status
+
+    event.status = (
+        EsPayWebhookEvent.Status.IGNORED if outcome == "transaction_not_found" else EsPayWebhookEvent.Status.PROCESSED
+    )
+    event.last_error = "" if event.status == EsPayWebhookEvent.Status.PROCESSED else outcome
+    event.processed_at = timezone.now()
+    event.save(update_fields=["status", "last_error", "processed_at", "updated_at"])
+    return event.status
+
+
+def process_pending_events(limit: int = 100) -> dict:
+    counts = {}
+    for event_pk in list(pending_events().values_list("pk", flat=True)[:limit]):
+        status = process_event(event_pk)
+        if status:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
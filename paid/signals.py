@@ -0,0 +1,27 @@
+"""Keep workflow search keys in step with edits to the doctor they snapshot."""
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from content.models import RegisteredProfessional
+
+from .services import case_search
+
+
+@receiver(pre_save, sender=RegisteredProfessional)
+def remember_doctor_search_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(case_search.DOCTOR_SEARCH_FIELDS).intersection(update_fields):
+        return
+    instance._search_fields_before = (
+        RegisteredProfessional.objects.filter(pk=instance.pk).values(*case_search.DOCTOR_SEARCH_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=RegisteredProfessional)
+def refresh_doctor_search_keys(sender, instance, raw=False, **kwargs):
+    before = instance.__dict__.pop("_search_fields_before", None)
+    if raw or not before:
+        return
+    if any(before[field] != getattr(instance, field) for field in case_search.DOCTOR_SEARCH_FIELDS):
+        case_search.refresh_doctor_case_keys(instance)
@@ -15,6 +15,7 @@ urlpatterns = [
     path("p/<str:order_code>/review/", views.patient_review, name="patient_review"),
     path("p/<str:order_code>/submit/", views.patient_submit_final, name="patient_submit_final"),
     path("p/<str:order_code>/thank-you/", views.patient_thank_you, name="patient_thank_you"),
+    path("p/<str:order_code>/status/", views.patient_finalization_status, name="patient_finalization_status"),
     path("p/<str:order_code>/report/<str:kind>/", views.download_report, name="download_report"),
     path("payments/razorpay/webhook/", views.razorpay_webhook, name="razorpay_webhook"),
     path("support/workflows/", audit_views.workflow_dashboard, name="workflow_dashboard"),
@@ -2,15 +2,18 @@ import secrets
 import json
 from datetime import timedelta
 from decimal import Decimal
+from functools import partial
+from urllib.parse import urljoin
 
 from django.conf import settings
-from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.html import escape
 from django.utils import timezone
 from django.db import transaction
 from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 
 from content.models import RegisteredProfessional
@@ -18,23 +21,26 @@ from content.utils import _aisensy_send, normalize_phone, whatsapp_link
 from content.views import _gate_google_and_email
 
 from .forms import DemographicsForm, PaidPrescriptionForm, PatientEmailForm
-from .models import EsCfgOption, EsCfgQuestion, EsCfgSection, EsPayEmailLog, EsPayOrder, EsPayRevenueSplit, EsPayTransaction, EsRepReport, EsSubAnswer, EsSubSubmission, WorkflowDeliveryAttempt
+from .models import EsCfgOption, EsCfgQuestion, EsCfgSection, EsPayEmailLog, EsPayOrder, EsPayRevenueSplit, EsPayTransaction, EsRepReport, EsSubAnswer, EsSubFinalization, EsSubSubmission, WorkflowDeliveryAttempt
 from .services.mailer import _sendgrid_send_with_attachments, log_email
 from .services.payment import RazorpayAdapter, RazorpayError
-from .services.reporting import build_pdf_password, generate_and_store_reports
-from .services.scoring import compute_submission_scores
 from .services.tokens import build_order_token_payload, hash_token, sign_payload, unsign_payload
-from .services import audit
+from .services import audit, finalization, identity_map, mail_dispatch, report_storage, webhooks
 from .pricing import calculate_order_amounts, revenue_split_amounts
 
 
 JOURNEY_LOCKED_CONTEXT = {"hide_journey_nav": True}
 
+def _order_submission(order):
+    """The order's submission, loaded once per request through the identity map."""
+    return identity_map.get(EsSubSubmission, order_id=order.pk)
+
+
 def _paid_order_is_final(order) -> bool:
-    return (
-        order.status == EsPayOrder.Status.SUBMITTED
-        or EsSubSubmission.objects.filter(order=order, status=EsSubSubmission.Status.FINAL).exists()
-    )
+    if order.status == EsPayOrder.Status.SUBMITTED:
+        return True
+    submission = _order_submission(order)
+    return bool(submission and submission.status == EsSubSubmission.Status.FINAL)
 
 
 @require_http_methods(["GET", "POST"])
@@ -411,39 +417,18 @@ def razorpay_webhook(request):
     except json.JSONDecodeError:
         return HttpResponseBadRequest("Invalid JSON")
 
-    event = payload.get("event", "")
-    payload_root = payload.get("payload", {})
-    payment_entity = payload_root.get("payment", {}).get("entity", {})
-    order_entity = payload_root.get("order", {}).get("entity", {})
-    gateway_order_id = payment_entity.get("order_id") or order_entity.get("id", "")
-    payment_id = payment_entity.get("id", "")
-
-    tx = EsPayTransaction.objects.filter(gateway_order_id=gateway_order_id).order_by("-created_at").first()
-    if not tx:
-        return JsonResponse({"ok": True, "ignored": "transaction_not_found"})
-
-    tx.gateway_payment_id = payment_id or tx.gateway_payment_id
-    tx.raw_payload_json = payload
-    if event in {"payment.captured", "order.paid"}:
-        tx.status = EsPayTransaction.Status.SUCCESS
-    elif event in {"payment.failed"}:
-        tx.status = EsPayTransaction.Status.FAILED
-    tx.save(update_fields=["gateway_payment_id", "raw_payload_json", "status", "updated_at"])
-
-    if tx.status == EsPayTransaction.Status.SUCCESS:
-        order = tx.order
-        if order.status != EsPayOrder.Status.PAID:
-            order.status = EsPayOrder.Status.PAID
-            order.paid_at = timezone.now()
-            order.save(update_fields=["status", "paid_at", "updated_at"])
-        _create_revenue_split(tx)
-        workflow_case = audit.case_for_order(order)
-        audit.mark_payment_completed(workflow_case, order, tx)
-        _send_assessment_link_email(order, request, workflow_case)
-    elif tx.status == EsPayTransaction.Status.FAILED:
-        audit.mark_payment_failed(audit.case_for_order(tx.order), tx.order, tx, "Razorpay webhook marked payment failed.")
-
-    return JsonResponse({"ok": True})
+    # Persist and acknowledge; Razorpay retries reuse the event id, so a replay
+    # just returns the stored row. process_razorpay_webhooks applies the event
+    # (RAZORPAY_WEBHOOK_INLINE applies it here instead, for local development);
+    # process_event skips rows that are already done or claimed by the worker.
+    event, created = webhooks.record_razorpay_event(
+        event_id=webhooks.razorpay_event_id(request.headers, request.body),
+        payload=payload,
+        base_url=request.build_absolute_uri("/"),
+    )
+    if getattr(settings, "RAZORPAY_WEBHOOK_INLINE", False):
+        transaction.on_commit(partial(webhooks.process_event, event.pk), robust=True)
+    return JsonResponse({"ok": True, "duplicate": not created})
 
 
 @require_http_methods(["GET"])
@@ -474,14 +459,17 @@ def patient_form(request, order_code):
     workflow_case = audit.case_for_order(order)
     audit.mark_opened(workflow_case, request=request, message="Paid assessment form opened")
 
-    submission, _ = EsSubSubmission.objects.get_or_create(
-        order=order,
-        defaults={
-            "form": order.form,
-            "config_version": order.form.version,
-            "child_name": order.patient_name,
-        },
-    )
+    submission = _order_submission(order)
+    if submission is None:
+        submission, _ = EsSubSubmission.objects.get_or_create(
+            order=order,
+            defaults={
+                "form": order.form,
+                "config_version": order.form.version,
+                "child_name": order.patient_name,
+            },
+        )
+        submission = identity_map.register(submission)
     if submission.status == EsSubSubmission.Status.FINAL:
         return redirect("paid:patient_thank_you", order_code=order.order_code)
 
@@ -554,7 +542,9 @@ def patient_form(request, order_code):
 
 def patient_review(request, order_code):
     order = get_object_or_404(EsPayOrder, order_code=order_code)
-    submission = get_object_or_404(EsSubSubmission, order=order)
+    submission = _order_submission(order)
+    if submission is None:
+        raise Http404("Submission not found")
     if submission.status == EsSubSubmission.Status.FINAL:
         return redirect("paid:patient_thank_you", order_code=order.order_code)
     section_order_map = {
@@ -588,68 +578,100 @@ def patient_review(request, order_code):
 
 
 @require_http_methods(["POST"])
-@transaction.atomic
 def patient_submit_final(request, order_code):
     order = get_object_or_404(EsPayOrder, order_code=order_code)
-    submission = get_object_or_404(EsSubSubmission, order=order)
+    submission = _order_submission(order)
+    if submission is None:
+        raise Http404("Submission not found")
     workflow_case = audit.case_for_order(order)
     if submission.status == EsSubSubmission.Status.FINAL:
         return redirect("paid:patient_thank_you", order_code=order.order_code)
 
-    compute_submission_scores(submission)
-    submission.status = EsSubSubmission.Status.FINAL
-    submission.save(update_fields=["status", "updated_at"])
-    order.status = EsPayOrder.Status.SUBMITTED
-    order.submitted_at = timezone.now()
-    order.save(update_fields=["status", "submitted_at", "updated_at"])
-    audit.mark_paid_submitted(workflow_case, submission)
-    audit.mark_report_processing(workflow_case)
-
-    try:
-        report, patient_pdf, doctor_pdf = generate_and_store_reports(submission)
-    except Exception as exc:
-        audit.mark_report_failed(workflow_case, str(exc))
-        raise
-    audit.mark_report_generated(workflow_case, report)
-    _send_report_emails(order, report, patient_pdf, doctor_pdf, workflow_case=workflow_case)
+    # Only the state change runs here; scoring, PDFs and email are staged in finalization.
+    with transaction.atomic():
+        claimed = (
+            EsSubSubmission.objects.filter(pk=submission.pk)
+            .exclude(status=EsSubSubmission.Status.FINAL)
+            .update(status=EsSubSubmission.Status.FINAL, updated_at=timezone.now())
+        )
+        if claimed:
+            submission.status = EsSubSubmission.Status.FINAL
+            order.status = EsPayOrder.Status.SUBMITTED
+            order.submitted_at = timezone.now()
+            order.save(update_fields=["status", "submitted_at", "updated_at"])
+            audit.mark_paid_submitted(workflow_case, submission)
+            job = finalization.enqueue(submission)
+            if getattr(settings, "PAID_FINALIZE_INLINE", False):
+                # Claimed with SKIP LOCKED, so a running worker never processes the same job twice.
+                transaction.on_commit(partial(finalization.process_job, job.pk), robust=True)
 
     return redirect("paid:patient_thank_you", order_code=order.order_code)
 
 
+@never_cache
+def patient_finalization_status(request, order_code):
+    """Polled by the thank-you page; one indexed lookup, no report rendering."""
+    job = (
+        EsSubFinalization.objects.filter(submission__order__order_code=order_code)
+        .values("stage", "status")
+        .first()
+    )
+    if job is None:
+        ready = EsRepReport.objects.filter(submission__order__order_code=order_code).exists()
+        job = {"stage": EsSubFinalization.Stage.DELIVERED if ready else "", "status": EsSubFinalization.Status.DONE if ready else ""}
+    return JsonResponse(
+        {
+            "stage": job["stage"],
+            "status": job["status"],
+            "report_ready": job["stage"] in finalization.READY_STAGES,
+            "failed": job["status"] == EsSubFinalization.Status.FAILED,
+        }
+    )
+
+
 def download_report(request, order_code, kind):
     order = get_object_or_404(EsPayOrder, order_code=order_code)
-    submission = get_object_or_404(EsSubSubmission, order=order)
+    submission = _order_submission(order)
+    if submission is None:
+        raise Http404("Submission not found")
 
     if kind == "doctor" and not getattr(request.user, "is_staff", False):
         gate = _gate_google_and_email(request, order.doctor, request.get_full_path())
         if gate is not None:
             return gate
 
-    # Always regenerate from latest code/config before download so stale PDFs are replaced.
-    generate_and_store_reports(submission)
-    report = get_object_or_404(EsRepReport, submission=submission)
-    audit.mark_report_generated(audit.case_for_order(order), report)
-
     if kind == "patient":
-        fpath = report.patient_pdf_path
         filename = f"{order.order_code}_patient_report.pdf"
     elif kind == "doctor":
-        fpath = report.doctor_pdf_path
         filename = f"{order.order_code}_doctor_report.pdf"
     else:
         raise Http404("Unknown report type")
 
+    # Serve the stored PDF so ETag/Range stay valid across requests; regenerate only when it is
+    # missing or older than the submission.
+    report = EsRepReport.objects.filter(submission=submission).first()
+    key = getattr(report, f"{kind}_pdf_path", "")
+    if report is None or report.generated_at < submission.updated_at or not report_storage.report_exists(key):
+        from .services.reporting import generate_and_store_reports
+
+        report, _patient_pdf, _doctor_pdf = generate_and_store_reports(submission)
+        audit.mark_report_generated(audit.case_for_order(order), report)
+        key = getattr(report, f"{kind}_pdf_path")
+
     audit.mark_download(audit.case_for_order(order), kind)
-    return FileResponse(open(fpath, "rb"), as_attachment=True, filename=filename)
+    return report_storage.serve_report(request, key, filename)
 
 
 def patient_thank_you(request, order_code):
     order = get_object_or_404(EsPayOrder, order_code=order_code)
-    submission = EsSubSubmission.objects.filter(order=order).first()
+    submission = _order_submission(order)
     report = EsRepReport.objects.filter(submission=submission).first() if submission else None
+    job = EsSubFinalization.objects.filter(submission=submission).first() if submission else None
 
     patient_password = ""
     if submission and report:
+        from .services.reporting import build_pdf_password
+
         patient_password = build_pdf_password(submission.child_name or order.patient_name, order.patient_whatsapp)
 
     return render(
@@ -659,6 +681,8 @@ def patient_thank_you(request, order_code):
             "order": order,
             "submission": submission,
             "report": report,
+            "report_delivered": report is not None and (job is None or job.stage == EsSubFinalization.Stage.DELIVERED),
+            "finalization_failed": job is not None and job.status == EsSubFinalization.Status.FAILED,
             "patient_password": patient_password,
             **JOURNEY_LOCKED_CONTEXT,
         },
@@ -723,11 +747,12 @@ def _is_basic_detail_question(question):
     return any(marker in collapsed for marker in basic_markers)
 
 
-def _send_assessment_link_email(order, request, workflow_case=None):
+def _send_assessment_link_email(order, request, workflow_case=None, base_url=""):
     if not order.patient_email and not order.patient_whatsapp:
         return None
 
-    link = request.build_absolute_uri(reverse("paid:patient_form", args=[order.order_code]))
+    form_path = reverse("paid:patient_form", args=[order.order_code])
+    link = request.build_absolute_uri(form_path) if request is not None else urljoin(base_url, form_path)
     subject = "EmoScreen Assessment Link"
     email_log = None
 
@@ -810,6 +835,7 @@ def _send_paid_assessment_link_whatsapp(order, link, workflow_case=None):
     campaign = getattr(settings, "AISENSY_PAID_ASSESSMENT_CAMPAIGN_NAME", "mha_order_processing")
     param_count = getattr(settings, "AISENSY_PAID_ASSESSMENT_PARAM_COUNT", 2)
     recipient = normalize_phone(order.patient_whatsapp)
+    identity_map.flush()  # deferred saves land before the message goes out
     ok = _aisensy_send(
         recipient,
         order.patient_name or "Parent",
@@ -853,8 +879,7 @@ def _email_provider():
 
 
 def _read_report_pdf(path):
-    with open(path, "rb") as handle:
-        return handle.read()
+    return report_storage.read_report(path)
 
 
 def _paid_child_name(order, report=None):
@@ -897,101 +922,94 @@ def _paid_doctor_report_body(order, report):
     )
 
 
-def _send_paid_patient_report_email(order, report, patient_pdf: bytes, workflow_case=None):
+def _paid_patient_report_message(order, report, patient_pdf: bytes, workflow_case=None):
     if not order.patient_email:
-        return "", False
-
-    subject = "Patient Report for EmoScreen"
-    ok, meta = _sendgrid_send_with_attachments(
-        order.patient_email,
-        subject,
-        _paid_patient_report_body(order, report),
-        [("patient_report.pdf", patient_pdf)],
-    )
-    delivery_status = _delivery_status(ok, meta)
-    email_log = log_email(
-        order,
-        "PATIENT_REPORT",
-        order.patient_email,
-        subject,
-        status=delivery_status,
-        error_text="" if ok else str(meta),
-        sendgrid_message_id=meta if ok else "",
+        return None
+    return mail_dispatch.OutgoingEmail(
+        to_email=order.patient_email,
+        subject="Patient Report for EmoScreen",
+        html=_paid_patient_report_body(order, report),
+        attachments=[("patient_report.pdf", patient_pdf)],
+        email_type="PATIENT_REPORT",
+        order=order,
+        workflow_case=workflow_case,
     )
-    if workflow_case:
-        audit.record_delivery(
-            workflow_case,
-            channel="EMAIL",
-            recipient=order.patient_email,
-            subject=subject,
-            status=delivery_status,
-            provider=_email_provider(),
-            provider_message_id=meta if ok else "",
-            error_text="" if ok else str(meta),
-            metadata={"email_type": "PATIENT_REPORT"},
-            email_log=email_log,
-        )
-    if ok and report:
-        report.emailed_to_parent_at = timezone.now()
-        report.save(update_fields=["emailed_to_parent_at"])
-    return delivery_status, True
 
 
-def _send_paid_doctor_report_email(order, report, patient_pdf: bytes, doctor_pdf: bytes, workflow_case=None):
+def _paid_doctor_report_message(order, report, patient_pdf: bytes, doctor_pdf: bytes, workflow_case=None):
     doctor_email = order.doctor.email
     if not doctor_email:
+        return None
+    return mail_dispatch.OutgoingEmail(
+        to_email=doctor_email,
+        subject="Doctor Report for EmoScreen",
+        html=_paid_doctor_report_body(order, report),
+        attachments=[("doctor_report.pdf", doctor_pdf), ("patient_report.pdf", patient_pdf)],
+        email_type="DOCTOR_REPORT",
+        order=order,
+        workflow_case=workflow_case,
+    )
+
+
+def _dispatch_report_messages(report, messages):
+    """Send report emails as one batch (one logging pass) and stamp the report for each delivered copy."""
+    batch = mail_dispatch.MailBatch()
+    for message in messages:
+        batch.add(message)
+    results = batch.send()
+    if report:
+        stamp_fields = {"PATIENT_REPORT": "emailed_to_parent_at", "DOCTOR_REPORT": "emailed_to_doctor_at"}
+        update_fields = []
+        for result in results:
+            field_name = stamp_fields.get(result.message.email_type)
+            if result.ok and field_name:
+                setattr(report, field_name, timezone.now())
+                update_fields.append(field_name)
+        if update_fields:
+            report.save(update_fields=update_fields)
+    return {result.message.email_type: result.status for result in results}
+
+
+def _send_paid_patient_report_email(order, report, patient_pdf: bytes, workflow_case=None):
+    message = _paid_patient_report_message(order, report, patient_pdf, workflow_case)
+    if not message:
         return "", False
+    return _dispatch_report_messages(report, [message])["PATIENT_REPORT"], True
 
-    subject = "Doctor Report for EmoScreen"
-    ok, meta = _sendgrid_send_with_attachments(
-        doctor_email,
-        subject,
-        _paid_doctor_report_body(order, report),
-        [("doctor_report.pdf", doctor_pdf), ("patient_report.pdf", patient_pdf)],
-    )
-    delivery_status = _delivery_status(ok, meta)
-    email_log = log_email(
-        order,
-        "DOCTOR_REPORT",
-        doctor_email,
-        subject,
-        status=delivery_status,
-        error_text="" if ok else str(meta),
-        sendgrid_message_id=meta if ok else "",
-    )
-    if workflow_case:
-        audit.record_delivery(
-            workflow_case,
-            channel="EMAIL",
-            recipient=doctor_email,
-            subject=subject,
-            status=delivery_status,
-            provider=_email_provider(),
-            provider_message_id=meta if ok else "",
-            error_text="" if ok else str(meta),
-            metadata={"email_type": "DOCTOR_REPORT"},
-            email_log=email_log,
-        )
-    if ok and report:
-        report.emailed_to_doctor_at = timezone.now()
-        report.save(update_fields=["emailed_to_doctor_at"])
-    return delivery_status, True
 
+def _send_paid_doctor_report_email(order, report, patient_pdf: bytes, doctor_pdf: bytes, workflow_case=None):
+    message = _paid_doctor_report_message(order, report, patient_pdf, doctor_pdf, workflow_case)
+    if not message:
+        return "", False
+    return _dispatch_report_messages(report, [message])["DOCTOR_REPORT"], True
 
-def _send_report_emails(order, report, patient_pdf: bytes, doctor_pdf: bytes, workflow_case=None):
-    patient_status = ""
-    doctor_status = ""
-    attempted_patient = False
-    attempted_doctor = False
 
-    patient_status, attempted_patient = _send_paid_patient_report_email(order, report, patient_pdf, workflow_case)
-    doctor_status, attempted_doctor = _send_paid_doctor_report_email(order, report, patient_pdf, doctor_pdf, workflow_case)
+def _send_report_emails(order, report, patient_pdf: bytes, doctor_pdf: bytes, workflow_case=None):
+    """Email both reports; a report type already SENT for this order is not sent again, so retries are safe."""
+    already_sent = set(
+        EsPayEmailLog.objects.filter(
+            order=order,
+            email_type__in=[EsPayEmailLog.EmailType.PATIENT_REPORT, EsPayEmailLog.EmailType.DOCTOR_REPORT],
+            status=EsPayEmailLog.Status.SENT,
+        ).values_list("email_type", flat=True)
+    )
+    messages = [
+        message
+        for message in (
+            _paid_patient_report_message(order, report, patient_pdf, workflow_case),
+            _paid_doctor_report_message(order, report, patient_pdf, doctor_pdf, workflow_case),
+        )
+        if message and message.email_type not in already_sent
+    ]
+    if not messages:
+        return
+    statuses = _dispatch_report_messages(report, messages)
     audit.mark_report_sent(
         workflow_case,
-        to_patient=attempted_patient,
-        to_doctor=attempted_doctor,
-        patient_status=patient_status,
-        doctor_status=doctor_status,
+        to_patient="PATIENT_REPORT" in statuses,
+        to_doctor="DOCTOR_REPORT" in statuses,
+        patient_status=statuses.get("PATIENT_REPORT", ""),
+        doctor_status=statuses.get("DOCTOR_REPORT", ""),
     )
 
 
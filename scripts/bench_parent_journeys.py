@@ -0,0 +1,469 @@
+"""
+Load-test / benchmark harness for the legacy and paid parent journeys.
+
+Seeds a throwaway database (legacy catalog, the paid catalog from
+emoscreen_config_schema.xlsx, N doctors and M historical submissions), then
+drives both parent journeys through the Django test client from a pool of
+concurrent workers:
+
+    legacy: share_landing -> parent_language_select -> screening_form (GET + POST)
+    paid:   patient_entry -> dummy payment -> patient_form -> patient_review
+            -> patient_submit_final
+
+SendGrid / AiSensy keys are blanked and EMAIL_BACKEND is locmem, so no
+external sender is ever reached. Reports p50/p95/p99 latency and queries per
+request for every step, plus journey throughput.
+
+Examples:
+    python scripts/bench_parent_journeys.py --iterations 20 --workers 4
+    python scripts/bench_parent_journeys.py --write-baseline
+    python scripts/bench_parent_journeys.py --baseline docs/benchmarks/parent_journeys_baseline.json
+
+Exit code is 1 when a step's --gate percentile or the flow throughput
+regresses against the baseline by more than --tolerance, or a step issues
+more queries than recorded. Latency baselines are machine specific; re-record
+with --write-baseline when moving to different hardware.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import secrets
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emoscreen.settings")
+
+DEFAULT_BASELINE = BASE_DIR / "docs" / "benchmarks" / "parent_journeys_baseline.json"
+CATALOG_XLSX = BASE_DIR / "emoscreen_config_schema.xlsx"
+LEGACY_QUESTION_COUNT = 20
+CLINIC_PHONE = "9876500000"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=5, help="Doctors to seed")
+    parser.add_argument("--submissions", type=int, default=200, help="Historical legacy submissions to seed")
+    parser.add_argument("--iterations", type=int, default=30, help="Journeys to run per flow")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent client workers")
+    parser.add_argument("--warmup", type=int, default=2, help="Unrecorded journeys per flow before measuring")
+    parser.add_argument("--flows", default="legacy,paid", help="Comma separated: legacy,paid")
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="Run against the DB configured in .env instead of a throwaway SQLite file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed latency/throughput regression as a fraction (default 0.5)")
+    parser.add_argument("--slack-ms", type=float, default=10.0,
+                        help="Absolute latency slack added on top of --tolerance, absorbs jitter on fast steps")
+    parser.add_argument("--gate", choices=["p50_ms", "p95_ms", "p99_ms"], default="p50_ms",
+                        help="Per-step latency percentile compared against the baseline")
+    parser.add_argument("--output", type=Path, help="Also write the JSON result here")
+    return parser.parse_args()
+
+
+def bootstrap(args, workdir):
+    if not args.use_configured_db:
+        os.environ["DB_ENGINE"] = "sqlite"
+        os.environ["SQLITE_PATH"] = str(Path(workdir) / "bench.sqlite3")
+
+    from django.conf import settings
+
+    db = settings.DATABASES["default"]
+    if db["ENGINE"].endswith("sqlite3"):
+        # Concurrent writers on one SQLite file: wait for locks and take the
+        # write lock up front instead of failing on upgrade.
+        db.setdefault("OPTIONS", {}).update({
+            "timeout": 30,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "PRAGMA journal_mode=WAL;",
+        })
+    django.setup()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def seed(args):
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from content.constants import TERMS_VERSION
+    from content.models import (
+        Language, Option, OptionI18n, Question, QuestionI18n, RedFlag, RedFlagI18n,
+        RegisteredProfessional, Submission,
+    )
+    from paid.models import EsCfgForm
+
+    call_command("migrate", verbosity=0, interactive=False)
+
+    if not args.use_configured_db or not EsCfgForm.objects.exists():
+        call_command("ingest_paid_emoscreen_config", str(CATALOG_XLSX), stdout=io.StringIO())
+
+    lang, _ = Language.objects.get_or_create(
+        lang_code="en", defaults={"lang_name_english": "English", "lang_name_native": "English"}
+    )
+    for idx in range(1, LEGACY_QUESTION_COUNT + 1):
+        rf, _ = RedFlag.objects.get_or_create(
+            red_flag_code=f"BENCH_RF_{idx:02d}", defaults={"education_url_slug": f"bench-rf-{idx:02d}"}
+        )
+        RedFlagI18n.objects.get_or_create(red_flag=rf, lang=lang, defaults={"parent_label": f"Benchmark red flag {idx}"})
+        q, _ = Question.objects.get_or_create(
+            question_code=f"BENCH_Q_{idx:02d}", defaults={"display_order": 9000 + idx, "active": True}
+        )
+        QuestionI18n.objects.get_or_create(question=q, lang=lang, defaults={"question_text": f"Benchmark question {idx}?"})
+        for order, (suffix, triggers) in enumerate((("YES", True), ("NO", False)), start=1):
+            opt, _ = Option.objects.get_or_create(
+                option_code=f"BENCH_Q_{idx:02d}_{suffix}",
+                defaults={
+                    "question": q,
+                    "display_order": order,
+                    "triggers_red_flag": triggers,
+                    "red_flag": rf if triggers else None,
+                },
+            )
+            OptionI18n.objects.get_or_create(option=opt, lang=lang, defaults={"option_text": suffix.title()})
+
+    doctors = []
+    for idx in range(args.doctors):
+        doctor, _ = RegisteredProfessional.objects.update_or_create(
+            unique_doctor_code=f"BENCH{idx:03d}",
+            defaults={
+                "role": RegisteredProfessional.Role.PEDIATRICIAN,
+                "salutation": "Dr",
+                "first_name": "Bench",
+                "last_name": f"Doctor {idx}",
+                "email": f"bench.doctor{idx}@example.com",
+                "whatsapp": f"91{CLINIC_PHONE}",
+                "appointment_booking_number": f"91{CLINIC_PHONE}",
+                "clinic_address": "Benchmark Clinic",
+                "terms_accepted_at": timezone.now(),
+                "terms_version": TERMS_VERSION,
+            },
+        )
+        doctors.append(doctor)
+
+    existing = Submission.objects.filter(report_code__startswith="BH").count()
+    Submission.objects.bulk_create(
+        [
+            Submission(
+                report_code=f"BH{idx:08d}",
+                professional=doctors[idx % len(doctors)],
+                lang=lang,
+                flags_count=idx % 4,
+                email_to=doctors[idx % len(doctors)].email,
+            )
+            for idx in range(existing, args.submissions)
+        ],
+        batch_size=500,
+    )
+    return doctors
+
+
+def create_paid_order(doctor):
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from paid.models import EsCfgForm, EsPayOrder
+    from paid.services import audit
+    from paid.services.tokens import build_order_token_payload, hash_token, sign_payload
+
+    form = EsCfgForm.objects.filter(is_active=True).order_by("age_min_months").first()
+    order = EsPayOrder.objects.create(
+        order_code=f"BN{secrets.token_hex(5).upper()}",
+        doctor=doctor,
+        form=form,
+        price_variant="INR_1",
+        base_amount_paise=100,
+        discount_paise=0,
+        final_amount_paise=100,
+        patient_name="Bench Child",
+        patient_whatsapp="919811223344",
+        status=EsPayOrder.Status.PAYMENT_PENDING,
+        link_token_hash="pending",
+        link_expires_at=timezone.now() + timedelta(days=7),
+        created_ip="127.0.0.1",
+        user_agent="bench_parent_journeys",
+    )
+    token = sign_payload(build_order_token_payload(order, doctor.unique_doctor_code))
+    order.link_token_hash = hash_token(token)
+    order.status = EsPayOrder.Status.LINK_SENT
+    order.save(update_fields=["link_token_hash", "status", "updated_at"])
+    entry_path = reverse(
+        "paid:patient_entry",
+        args=[order.order_code, doctor.unique_doctor_code, order.form_id, order.final_amount_paise, token],
+    )
+    audit.create_paid_case(order=order, token=token, source="benchmark", delivery_url=entry_path)
+    return order, entry_path
+
+
+def paid_answers(order):
+    from paid.models import EsCfgOption, EsCfgQuestion
+    from paid.views import _is_basic_detail_question
+
+    first_option = {}
+    for opt in EsCfgOption.objects.order_by("option_order"):
+        first_option.setdefault(opt.option_set_id, opt.option_code)
+    data = {}
+    for q in EsCfgQuestion.objects.filter(form=order.form):
+        if _is_basic_detail_question(q):
+            continue
+        data[f"q_{q.question_code}"] = first_option.get(q.option_set_id, "1")
+    return data
+
+
+class Recorder:
+    def __init__(self, client):
+        self.client = client
+        self.samples = []
+
+    def call(self, step, method, path, data=None, expect=(200, 302)):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, data or {})
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        if response.status_code not in expect:
+            raise RuntimeError(f"{step}: unexpected HTTP {response.status_code} for {path}")
+        self.samples.append((step, elapsed_ms, len(ctx.captured_queries)))
+        return response
+
+
+# Read from the page itself: the test client's response.context comes from the global
+# template_rendered signal, so with concurrent workers it can hold another thread's token.
+SUBMISSION_TOKEN_RE = re.compile(rb'name="submission_token" value="([^"]+)"')
+
+
+def legacy_journey(doctor, seq):
+    from django.test import Client
+    from django.urls import reverse
+
+    from content.models import Question
+
+    code = doctor.unique_doctor_code
+    rec = Recorder(Client())
+    rec.call("legacy.share_landing", "get", reverse("content:share_landing", args=[code]))
+    rec.call("legacy.share_landing.post", "post", reverse("content:share_landing", args=[code]),
+             {"clinic_phone": CLINIC_PHONE, "parent_phone": "9811223344"})
+    rec.call("legacy.parent_language_select", "get", reverse("content:parent_language_select", args=[code]))
+    form_path = reverse("content:screening_form", args=[code, "en"])
+    form_page = rec.call("legacy.screening_form", "get", form_path)
+    data = {
+        "submission_token": SUBMISSION_TOKEN_RE.search(form_page.content).group(1).decode(),
+        "patient_name": f"Bench Child {seq}",
+        "parent_phone": "9811223344",
+        "patient_email": f"bench.parent{seq}@example.com",
+        "dob": "2020-01-01",
+        "gender": "male",
+    }
+    for idx, question_code in enumerate(Question.objects.filter(active=True).values_list("question_code", flat=True)):
+        suffix = "YES" if (idx + seq) % 5 == 0 else "NO"
+        data[question_code] = f"{question_code}_{suffix}"
+    rec.call("legacy.screening_form.post", "post", form_path, data)
+    return rec.samples
+
+
+def paid_journey(doctor, seq):
+    from django.test import Client
+    from django.urls import reverse
+
+    order, entry_path = create_paid_order(doctor)
+    code = order.order_code
+    rec = Recorder(Client())
+    rec.call("paid.patient_entry", "get", entry_path)
+    rec.call("paid.patient_entry.post", "post", entry_path, {"patient_email": f"bench.paid{seq}@example.com"})
+    rec.call("paid.patient_payment", "get", reverse("paid:patient_payment", args=[code]))
+    rec.call("paid.patient_payment.post", "post", reverse("paid:patient_payment", args=[code]),
+             {"dummy_payment_action": "success"})
+    form_path = reverse("paid:patient_form", args=[code])
+    rec.call("paid.patient_form", "get", form_path)
+    data = {
+        "child_name": f"Bench Child {seq}",
+        "child_dob": "2023-01-01",
+        "assessment_date": "2024-01-01",
+        "gender": "female",
+        "completed_by": "Parent",
+        "consent_given": "on",
+        **paid_answers(order),
+    }
+    rec.call("paid.patient_form.post", "post", form_path, data, expect=(302,))
+    rec.call("paid.patient_review", "get", reverse("paid:patient_review", args=[code]))
+    rec.call("paid.patient_submit_final", "post", reverse("paid:patient_submit_final", args=[code]), expect=(302,))
+    return rec.samples
+
+
+def run_flow(name, journey, doctors, args):
+    from django.db import connections
+
+    def task(seq):
+        try:
+            started = time.perf_counter()
+            samples = journey(doctors[seq % len(doctors)], seq)
+            return samples, (time.perf_counter() - started) * 1000
+        finally:
+            connections.close_all()
+
+    # Template compilation, URL resolver and first-connection costs are paid
+    # here rather than showing up as outliers in the measured run.
+    for seq in range(args.warmup):
+        journey(doctors[seq % len(doctors)], -1 - seq)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(task, range(args.iterations)))
+    wall = time.perf_counter() - started
+
+    steps = {}
+    for samples, _ in results:
+        for step, ms, queries in samples:
+            bucket = steps.setdefault(step, {"ms": [], "queries": []})
+            bucket["ms"].append(ms)
+            bucket["queries"].append(queries)
+    journey_ms = [ms for _, ms in results]
+    requests_total = sum(len(samples) for samples, _ in results)
+    return {
+        "journeys": len(results),
+        "requests": requests_total,
+        "wall_seconds": round(wall, 3),
+        "journeys_per_second": round(len(results) / wall, 3) if wall else 0.0,
+        "requests_per_second": round(requests_total / wall, 3) if wall else 0.0,
+        "journey_ms": _summary(journey_ms),
+        "steps": {
+            step: {
+                **_summary(bucket["ms"]),
+                "queries": round(sum(bucket["queries"]) / len(bucket["queries"]), 2),
+            }
+            for step, bucket in steps.items()
+        },
+    }
+
+
+def _summary(values):
+    return {
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+    }
+
+
+def compare(result, baseline, tolerance, gate, slack_ms):
+    failures = []
+    for flow, current in result["flows"].items():
+        base = baseline.get("flows", {}).get(flow)
+        if not base:
+            continue
+        floor = base["journeys_per_second"] * (1 - tolerance)
+        if current["journeys_per_second"] < floor:
+            failures.append(
+                f"{flow}: throughput {current['journeys_per_second']}/s below {floor:.3f}/s "
+                f"(baseline {base['journeys_per_second']}/s)"
+            )
+        for step, stats in current["steps"].items():
+            base_step = base["steps"].get(step)
+            if not base_step:
+                continue
+            ceiling = base_step[gate] * (1 + tolerance) + slack_ms
+            if stats[gate] > ceiling:
+                failures.append(f"{step}: {gate} {stats[gate]} above {ceiling:.2f} (baseline {base_step[gate]})")
+            if stats["queries"] > base_step["queries"]:
+                failures.append(f"{step}: {stats['queries']} queries/request, baseline {base_step['queries']}")
+    return failures
+
+
+def print_report(result):
+    for flow, data in result["flows"].items():
+        print(
+            f"\n[{flow}] {data['journeys']} journeys / {data['requests']} requests in {data['wall_seconds']}s "
+            f"-> {data['journeys_per_second']} journeys/s, {data['requests_per_second']} req/s"
+        )
+        print(f"  journey p50={data['journey_ms']['p50_ms']}ms p95={data['journey_ms']['p95_ms']}ms "
+              f"p99={data['journey_ms']['p99_ms']}ms")
+        print(f"  {'step':<32}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>10}")
+        for step, stats in data["steps"].items():
+            print(f"  {step:<32}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['queries']:>10}")
+
+
+def main():
+    args = parse_args()
+    flows = [f.strip() for f in args.flows.split(",") if f.strip()]
+    unknown = set(flows) - {"legacy", "paid"}
+    if unknown:
+        raise SystemExit(f"Unknown flow(s): {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="emoscreen-bench-") as workdir:
+        bootstrap(args, workdir)
+
+        from django.test.utils import override_settings, setup_test_environment
+
+        setup_test_environment()
+        stubbed = override_settings(
+            ALLOWED_HOSTS=["testserver"],
+            SENDGRID_API_KEY="",
+            AISENSY_API_KEY="",
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            PAYMENT_GATEWAY="dummy",
+            MEDIA_ROOT=str(Path(workdir) / "media"),
+        )
+        with stubbed:
+            doctors = seed(args)
+            journeys = {"legacy": legacy_journey, "paid": paid_journey}
+            result = {
+                "config": {
+                    "doctors": args.doctors,
+                    "submissions": args.submissions,
+                    "iterations": args.iterations,
+                    "workers": args.workers,
+                    "warmup": args.warmup,
+                },
+                "flows": {},
+            }
+            # The views print provider fallbacks for every send; keep the report readable.
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                for flow in flows:
+                    result["flows"][flow] = run_flow(flow, journeys[flow], doctors, args)
+
+    print_report(result)
+    payload = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(payload + "\n", encoding="utf-8")
+
+    if args.write_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(payload + "\n", encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --write-baseline to record one.")
+        return 0
+
+    failures = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance, args.gate, args.slack_ms)
+    if failures:
+        print("\nREGRESSIONS:")
+        for line in failures:
+            print(f"  - {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
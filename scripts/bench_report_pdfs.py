@@ -0,0 +1,421 @@
+"""
+Micro-benchmarks for report PDF generation and encryption.
+
+Covers the legacy canvas builders (content.pdf_utils) and the paid platypus
+renderer (paid.services.reporting.load_report_data / _build_pdf / _encrypt_pdf) with realistic
+payloads: empty, short, long and Hindi (Devanagari, needs the Noto fonts in
+PDF_FONT_DIR) red-flag lists, every paid form in
+emoscreen_config_schema.xlsx and a synthetic 100-question form whose
+response table spans several pages.
+
+Each scenario is timed per phase:
+
+    db         SQL execution time inside the paid renderer (0 for legacy builders)
+    layout     drawing / flowable layout (build time minus the other phases)
+    serialize  Canvas.save(), i.e. writing the PDF byte stream
+    encrypt    pypdf re-write with password
+    disk_write write + fsync of the encrypted bytes
+
+A second, untimed pass runs each scenario under tracemalloc to record the
+peak Python allocation; peak RSS for the whole run is reported as well.
+
+Font embedding: the Hindi legacy reports are compared with the English ones
+carrying the same number of red flags. Non-Latin reports should stay within
+FONT_TARGET of the English render time and PDF size. Point --font-dir at the
+Noto TTFs (default PDF_FONT_DIR); without them the Hindi text falls back to
+Helvetica and the comparison is flagged as not meaningful.
+
+Results are printed and written as JSON so runs can be diffed across commits:
+
+    python scripts/bench_report_pdfs.py --repeat 10 --output /tmp/pdf_bench.json
+    python scripts/bench_report_pdfs.py --compare /tmp/pdf_bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emoscreen.settings")
+
+CATALOG_XLSX = BASE_DIR / "emoscreen_config_schema.xlsx"
+PHASES = ("db", "layout", "serialize", "encrypt", "disk_write", "total")
+# Non-Latin scenario -> English scenario with the same number of red flags.
+FONT_PAIRS = {
+    "legacy.patient.hindi": "legacy.patient.short",
+    "legacy.doctor.hindi": "legacy.doctor.short",
+}
+FONT_TARGET = 0.20
+# Render time for the font comparison; disk_write is dominated by fsync and swamps the difference.
+RENDER_PHASES = ("layout", "serialize", "encrypt")
+LONG_LABEL = (
+    "Persistent difficulty with sleep, appetite or toileting that interferes with daily routines "
+    "and has not improved over the last several weeks despite changes at home"
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario")
+    parser.add_argument("--only", help="Comma separated scenario name prefixes to run")
+    parser.add_argument("--output", type=Path, help="Write the JSON result here")
+    parser.add_argument("--compare", type=Path, help="Previous JSON result to print deltas against")
+    parser.add_argument("--font-dir", type=Path, help="Directory with the Noto Sans TTFs (default PDF_FONT_DIR)")
+    return parser.parse_args()
+
+
+class PhaseClock:
+    """Accumulates wall time for the phases of one render."""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.raw_pdfs = []
+
+    def add(self, phase, seconds):
+        self.totals[phase] += seconds
+
+    def wrap(self, phase, func, keep_input=False):
+        def timed(*args, **kwargs):
+            if keep_input:
+                self.raw_pdfs.append(args[0])
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - started)
+        return timed
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add("db", time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def instrumented(clock):
+    """Time Canvas.save and both encrypt helpers without changing their behaviour."""
+    from django.db import connection
+    from reportlab.pdfgen import canvas
+
+    from content import pdf_utils
+    from paid.services import reporting
+
+    originals = [
+        (canvas.Canvas, "save", canvas.Canvas.save),
+        (pdf_utils, "_encrypt", pdf_utils._encrypt),
+        (reporting, "_encrypt_pdf", reporting._encrypt_pdf),
+    ]
+    canvas.Canvas.save = clock.wrap("serialize", canvas.Canvas.save)
+    pdf_utils._encrypt = clock.wrap("encrypt", pdf_utils._encrypt, keep_input=True)
+    reporting._encrypt_pdf = clock.wrap("encrypt", reporting._encrypt_pdf, keep_input=True)
+    try:
+        with connection.execute_wrapper(clock.db_wrapper):
+            yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def write_to_disk(clock, workdir, name, data):
+    started = time.perf_counter()
+    path = Path(workdir) / f"{name}.pdf"
+    with open(path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    clock.add("disk_write", time.perf_counter() - started)
+
+
+def legacy_scenarios():
+    from content.pdf_utils import build_doctor_report_pdf_bytes, build_patient_report_pdf_bytes
+
+    payloads = {
+        "none": [],
+        "short": ["Frequent tantrums", "Poor eye contact", "Speech delay"],
+        "long": [f"{LONG_LABEL} ({idx})" for idx in range(1, 41)],
+        "hindi": ["बार-बार गुस्सा और आक्रामकता", "नए अनुभवों का सामना करते समय चिंता", "आसानी से ध्यान भटक जाता है"],
+    }
+    scenarios = {}
+    for size, labels in payloads.items():
+        common = {
+            "patient_name": "आरव" if size == "hindi" else "Aarav Benchmark",
+            "parent_phone": "919811223344",
+            "report_code": f"BENCH{size.upper()}",
+            "rf_labels": labels,
+        }
+        scenarios[f"legacy.patient.{size}"] = (
+            lambda common=common: build_patient_report_pdf_bytes(**common)[0]
+        )
+        scenarios[f"legacy.doctor.{size}"] = (
+            lambda common=common, labels=labels: build_doctor_report_pdf_bytes(
+                doctor_full_name="Dr Bench Doctor",
+                doctor_first_name="Bench",
+                doctor_id="BENCH001",
+                doctor_whatsapp="919876500000",
+                education_links=[f"https://example.com/education/rf-{i}" for i in range(len(labels))],
+                **common,
+            )[0]
+        )
+    return scenarios
+
+
+def seed_paid(workdir):
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from content.models import RegisteredProfessional
+    from paid.models import (
+        EsCfgForm, EsCfgOption, EsCfgOptionSet, EsCfgQuestion, EsCfgSection, EsPayOrder,
+        EsSubAnswer, EsSubSubmission,
+    )
+    from paid.services.scoring import compute_submission_scores
+
+    call_command("migrate", verbosity=0, interactive=False)
+    call_command("ingest_paid_emoscreen_config", str(CATALOG_XLSX), stdout=io.StringIO())
+
+    # Synthetic 100-question form so the response table runs over several pages.
+    option_set = EsCfgOptionSet.objects.filter(option_set_code="FREQ_3").first() or EsCfgOptionSet.objects.first()
+    form = EsCfgForm.objects.create(
+        form_code="BENCH_100Q", title="Benchmark 100 question form", age_min_months=0,
+        age_max_months=216, version="bench", is_active=False,
+    )
+    section = EsCfgSection.objects.create(
+        section_code="BENCH_100Q_S1", form=form, section_key="bench", title="Benchmark", display_order=1,
+    )
+    EsCfgQuestion.objects.bulk_create([
+        EsCfgQuestion(
+            question_code=f"BENCH_100Q_{idx:03d}", form=form, section=section, question_key=f"q{idx}",
+            question_order=idx, global_order=idx, question_type="SELECT_ONE", option_set=option_set,
+            question_text=f"{idx}. How often does the child show this behaviour? {LONG_LABEL}.",
+            is_required=True, is_scored=True,
+        )
+        for idx in range(1, 101)
+    ])
+
+    doctor = RegisteredProfessional.objects.create(
+        role=RegisteredProfessional.Role.PEDIATRICIAN, first_name="Bench", last_name="Doctor",
+        email="bench.pdf@example.com", whatsapp="919876500000", unique_doctor_code="BENCHPDF",
+    )
+    options = list(EsCfgOption.objects.order_by("option_order"))
+    submissions = {}
+    for form in EsCfgForm.objects.order_by("form_code"):
+        order = EsPayOrder.objects.create(
+            order_code=f"BP{secrets.token_hex(5).upper()}", doctor=doctor, form=form, price_variant="INR_1",
+            patient_name="Aarav Benchmark", patient_whatsapp="919811223344", status=EsPayOrder.Status.SUBMITTED,
+            link_token_hash="bench", link_expires_at=timezone.now() + timedelta(days=7),
+        )
+        submission = EsSubSubmission.objects.create(
+            order=order, form=form, config_version=form.version, child_name="Aarav Benchmark",
+            child_dob=date(2015, 6, 1), assessment_date=date(2024, 1, 15), gender="male",
+            completed_by="Parent", consent_given=True, status=EsSubSubmission.Status.FINAL,
+        )
+        answers = []
+        for idx, q in enumerate(EsCfgQuestion.objects.filter(form=form)):
+            choices = [o for o in options if o.option_set_id == q.option_set_id]
+            if choices:
+                picked = choices[idx % len(choices)]
+                answers.append(EsSubAnswer(
+                    submission=submission, question=q, value_json=picked.option_code,
+                    score_value=picked.score_value if q.is_scored else None,
+                ))
+            else:
+                answers.append(EsSubAnswer(submission=submission, question=q, value_json="Benchmark answer"))
+        EsSubAnswer.objects.bulk_create(answers)
+        compute_submission_scores(submission)
+        submissions[form.form_code] = submission
+    return submissions
+
+
+def paid_scenarios(submissions):
+    # Go through the module so instrumented() sees the patched _encrypt_pdf.
+    from paid.services import reporting
+
+    scenarios = {}
+    for form_code, submission in submissions.items():
+        for report_type in ("patient", "doctor"):
+            scenarios[f"paid.{report_type}.{form_code}"] = (
+                lambda report_type=report_type, submission=submission: reporting._encrypt_pdf(
+                    reporting._build_pdf(report_type, reporting.load_report_data(submission)),
+                    reporting.build_pdf_password(submission.child_name, submission.order.patient_whatsapp),
+                )
+            )
+    return scenarios
+
+
+def run_scenario(name, render, repeat, workdir):
+    from pypdf import PdfReader
+
+    # The first render in the process also pays for font registration and style setup.
+    started = time.perf_counter()
+    render()
+    first_render = time.perf_counter() - started
+
+    runs = []
+    encrypted = b""
+    pages = 0
+    for _ in range(repeat):
+        clock = PhaseClock()
+        started = time.perf_counter()
+        with instrumented(clock):
+            encrypted = render()
+        build_total = time.perf_counter() - started
+        write_to_disk(clock, workdir, name, encrypted)
+        totals = clock.totals
+        pages = sum(len(PdfReader(io.BytesIO(raw)).pages) for raw in clock.raw_pdfs)
+        totals["layout"] = max(0.0, build_total - totals["db"] - totals["serialize"] - totals["encrypt"])
+        totals["total"] = build_total + totals["disk_write"]
+        runs.append(dict(totals))
+
+    tracemalloc.start()
+    render()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_render_ms": round(first_render * 1000, 3),
+        "phases_ms": {
+            phase: {
+                "min": round(min(r[phase] for r in runs) * 1000, 3),
+                "median": round(statistics.median(r[phase] for r in runs) * 1000, 3),
+                "mean": round(statistics.fmean(r[phase] for r in runs) * 1000, 3),
+            }
+            for phase in PHASES
+        },
+        "encrypted_bytes": len(encrypted),
+        "pages": pages,
+        "tracemalloc_peak_kb": round(peak / 1024, 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+def render_ms(data):
+    return sum(data["phases_ms"][phase]["median"] for phase in RENDER_PHASES)
+
+
+def font_embedding(scenarios):
+    """Hindi vs English render time and size for FONT_PAIRS, as fractions over the English report."""
+    rows = {}
+    for non_latin, english in FONT_PAIRS.items():
+        if non_latin not in scenarios or english not in scenarios:
+            continue
+        ours, theirs = scenarios[non_latin], scenarios[english]
+        time_delta = render_ms(ours) / render_ms(theirs) - 1
+        size_delta = ours["encrypted_bytes"] / theirs["encrypted_bytes"] - 1
+        rows[non_latin] = {
+            "vs": english,
+            "time_delta": round(time_delta, 4),
+            "size_delta": round(size_delta, 4),
+            "within_target": time_delta <= FONT_TARGET and size_delta <= FONT_TARGET,
+        }
+    return rows
+
+
+def print_report(result, previous=None):
+    prev = (previous or {}).get("scenarios", {})
+    header = (
+        f"{'scenario':<28}{'pages':>6}" + "".join(f"{p:>12}" for p in PHASES)
+        + f"{'first_ms':>10}{'pdf_kb':>9}{'peak_kb':>10}"
+    )
+    print(header)
+    for name, data in result["scenarios"].items():
+        cells = "".join(f"{data['phases_ms'][p]['median']:>12.2f}" for p in PHASES)
+        print(
+            f"{name:<28}{data['pages']:>6}{cells}{data['first_render_ms']:>10.1f}"
+            f"{data['encrypted_bytes'] / 1024:>9.1f}{data['tracemalloc_peak_kb']:>10.0f}"
+        )
+        if name in prev:
+            old = prev[name]["phases_ms"]["total"]["median"]
+            new = data["phases_ms"]["total"]["median"]
+            if old:
+                print(f"{'':<28}{'':>6}  total {((new - old) / old) * 100:+.1f}% vs {previous['meta'].get('git', '?')}")
+    print(f"\npeak RSS: {result['meta']['peak_rss_kb']} kB (median ms per phase)")
+
+    if result.get("font_embedding"):
+        print(f"\nNon-Latin vs English (target: within {FONT_TARGET:.0%} on {'+'.join(RENDER_PHASES)} time and size)")
+        for name, row in result["font_embedding"].items():
+            verdict = "ok" if row["within_target"] else "OVER TARGET"
+            print(f"  {name:<26} time {row['time_delta']:+.1%}  size {row['size_delta']:+.1%}  vs {row['vs']}  {verdict}")
+        if result["meta"].get("hindi_fonts_missing"):
+            print("  (Devanagari font missing: the Hindi text used Helvetica, so these numbers do not measure embedding)")
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="emoscreen-pdf-bench-") as workdir:
+        os.environ["DB_ENGINE"] = "sqlite"
+        os.environ["SQLITE_PATH"] = str(Path(workdir) / "bench.sqlite3")
+        django.setup()
+
+        from django.test.utils import override_settings
+
+        import pypdf
+        import reportlab
+
+        from content.pdf_fonts import SCRIPT_FONT_FILES, missing_regular_fonts
+
+        font_settings = {"PDF_FONT_DIR": args.font_dir} if args.font_dir else {}
+        with override_settings(MEDIA_ROOT=str(Path(workdir) / "media"), **font_settings):
+            missing_fonts = [path.name for path in missing_regular_fonts()]
+            # The Hindi scenarios only exercise Devanagari.
+            hindi_fonts_missing = SCRIPT_FONT_FILES["devanagari"][0] in missing_fonts
+            scenarios = legacy_scenarios()
+            scenarios.update(paid_scenarios(seed_paid(workdir)))
+            if args.only:
+                prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+                scenarios = {k: v for k, v in scenarios.items() if k.startswith(prefixes)}
+
+            result = {"meta": {}, "scenarios": {}}
+            for name, render in scenarios.items():
+                result["scenarios"][name] = run_scenario(name, render, args.repeat, workdir)
+            result["font_embedding"] = font_embedding(result["scenarios"])
+
+    result["meta"] = {
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "pypdf": pypdf.__version__,
+        "repeat": args.repeat,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "missing_fonts": missing_fonts,
+        "hindi_fonts_missing": hindi_fonts_missing,
+    }
+
+    previous = None
+    if args.compare and args.compare.exists():
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+    print_report(result, previous)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
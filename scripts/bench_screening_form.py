@@ -0,0 +1,186 @@
+"""
+Benchmark for the legacy screening form GET with and without the question block cache.
+
+Seeds a throwaway SQLite database with a legacy catalog (--questions questions
+with --options options each, in English and Hindi) and a clinic, then times
+GET /form/<code>/<lang>/ through the Django test client:
+
+    uncached  SCREENING_FORM_CACHE_SECONDS=0: questions are loaded and the
+              whole form is rendered through the template engine every time
+    cached    content.screening_cache serves the rendered question block;
+              only the page shell (header, CSRF and submission token) renders
+
+Per mode and language it reports p50/p95 request latency, the template
+render time inside the request (page plus question block) and queries.
+
+    python scripts/bench_screening_form.py --requests 200
+    python scripts/bench_screening_form.py --questions 60 --output /tmp/form_bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "emoscreen.settings")
+
+LANGS = (("en", "English", "English"), ("hi", "Hindi", "हिन्दी"))
+MODES = ("uncached", "cached")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=40, help="Active legacy questions to seed")
+    parser.add_argument("--options", type=int, default=4, help="Options per question")
+    parser.add_argument("--requests", type=int, default=100, help="Measured GETs per mode and language")
+    parser.add_argument("--warmup", type=int, default=5, help="Unrecorded GETs per mode and language")
+    parser.add_argument("--output", type=Path, help="Also write the JSON result here")
+    return parser.parse_args()
+
+
+def seed(args):
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from content.constants import TERMS_VERSION
+    from content.models import Language, Option, OptionI18n, Question, QuestionI18n, RegisteredProfessional
+
+    call_command("migrate", verbosity=0, interactive=False)
+    langs = [
+        Language.objects.create(lang_code=code, lang_name_english=english, lang_name_native=native)
+        for code, english, native in LANGS
+    ]
+    for idx in range(1, args.questions + 1):
+        question = Question.objects.create(question_code=f"BENCH_Q_{idx:03d}", display_order=idx, active=True)
+        for lang in langs:
+            QuestionI18n.objects.create(
+                question=question, lang=lang,
+                question_text=f"[{lang.lang_code}] Does the child often show benchmark behaviour number {idx}?",
+            )
+        for order in range(1, args.options + 1):
+            option = Option.objects.create(
+                option_code=f"BENCH_Q_{idx:03d}_O{order}", question=question, display_order=order,
+            )
+            OptionI18n.objects.bulk_create([
+                OptionI18n(option=option, lang=lang, option_text=f"[{lang.lang_code}] Choice {order}")
+                for lang in langs
+            ])
+
+    return RegisteredProfessional.objects.create(
+        unique_doctor_code="BENCHFORM", role=RegisteredProfessional.Role.PEDIATRICIAN, salutation="Dr",
+        first_name="Bench", last_name="Doctor", email="bench.form@example.com", whatsapp="919876500000",
+        appointment_booking_number="919876500000", clinic_address="Benchmark Clinic",
+        terms_accepted_at=timezone.now(), terms_version=TERMS_VERSION,
+    )
+
+
+@contextlib.contextmanager
+def timed_templates(spent):
+    """Add the time spent in the view's render() and the question block render to spent[0]."""
+    from content import screening_cache, views
+
+    def timing(fn):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                spent[0] += time.perf_counter() - started
+        return wrapper
+
+    originals = (views.render, screening_cache.render_to_string)
+    views.render = timing(views.render)
+    screening_cache.render_to_string = timing(screening_cache.render_to_string)
+    try:
+        yield
+    finally:
+        views.render, screening_cache.render_to_string = originals
+
+
+def run_mode(mode, path, args):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings
+
+    cache.clear()
+    client = Client()
+    ttl = 0 if mode == "uncached" else 86400
+    total_ms, template_ms, queries = [], [], []
+    with override_settings(SCREENING_FORM_CACHE_SECONDS=ttl):
+        for _ in range(args.warmup):
+            client.get(path)
+        for _ in range(args.requests):
+            spent = [0.0]
+            with timed_templates(spent), CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(path)
+                elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f"{mode}: unexpected HTTP {response.status_code} for {path}")
+            total_ms.append(elapsed * 1000)
+            template_ms.append(spent[0] * 1000)
+            queries.append(len(ctx.captured_queries))
+    return {
+        "p50_ms": round(statistics.median(total_ms), 3),
+        "p95_ms": round(sorted(total_ms)[int(0.95 * (len(total_ms) - 1))], 3),
+        "template_p50_ms": round(statistics.median(template_ms), 3),
+        "queries": round(statistics.fmean(queries), 2),
+        "bytes": len(response.content),
+    }
+
+
+def print_report(result):
+    print(f"{'scenario':<18}{'p50_ms':>10}{'p95_ms':>10}{'template_ms':>13}{'queries':>9}{'bytes':>9}")
+    for name, data in result["scenarios"].items():
+        print(f"{name:<18}{data['p50_ms']:>10.2f}{data['p95_ms']:>10.2f}{data['template_p50_ms']:>13.2f}"
+              f"{data['queries']:>9.1f}{data['bytes']:>9}")
+    for code, _english, _native in LANGS:
+        before = result["scenarios"][f"{code}.uncached"]
+        after = result["scenarios"][f"{code}.cached"]
+        if before["template_p50_ms"]:
+            saved = 1 - after["template_p50_ms"] / before["template_p50_ms"]
+            print(f"\n{code}: template render {saved * 100:.0f}% less, "
+                  f"{before['queries'] - after['queries']:.0f} fewer queries per GET", end="")
+    print()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="emoscreen-form-bench-") as workdir:
+        os.environ["DB_ENGINE"] = "sqlite"
+        os.environ["SQLITE_PATH"] = str(Path(workdir) / "bench.sqlite3")
+        django.setup()
+
+        from django.test.utils import override_settings
+        from django.urls import reverse
+
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            doctor = seed(args)
+            result = {
+                "meta": {"questions": args.questions, "options": args.options, "requests": args.requests},
+                "scenarios": {},
+            }
+            for code, _english, _native in LANGS:
+                path = reverse("content:screening_form", args=[doctor.unique_doctor_code, code])
+                for mode in MODES:
+                    result["scenarios"][f"{code}.{mode}"] = run_mode(mode, path, args)
+
+    print_report(result)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,11 +16,16 @@ echo "📦 Installing dependencies"
 pip install --upgrade pip
 pip install -r requirements.txt
 
+echo "🔤 Fetching PDF fonts"
+python manage.py fetch_pdf_fonts
+PDF_FONTS_REQUIRED=true python manage.py check
+
 echo "🗄 Running migrations"
 python manage.py migrate --noinput
 
 echo "🎨 Collecting static files"
 python manage.py collectstatic --noinput
+python manage.py static_transfer_report
 
 # =====================================================
 # 🔽 INGESTION COMMANDS CAN BE ADDED BELOW 🔽
@@ -30,7 +35,21 @@ python manage.py collectstatic --noinput
 # python scripts/custom_ingest.py
 # =====================================================
 
+echo "⚙️ Installing background worker units"
+WORKER_USER="$(systemctl show -p User --value gunicorn-EmoScreen_new)"
+WORKER_USER="${WORKER_USER:-$(whoami)}"
+for unit in scripts/systemd/*.service; do
+  sed "s/@USER@/${WORKER_USER}/" "$unit" | sudo tee "/etc/systemd/system/$(basename "$unit")" > /dev/null
+done
+sudo systemctl daemon-reload
+
 echo "🔄 Restarting Gunicorn"
 sudo systemctl restart gunicorn-EmoScreen_new
 
+echo "🔄 Restarting background workers"
+for unit in scripts/systemd/*.service; do
+  sudo systemctl enable "$(basename "$unit")"
+  sudo systemctl restart "$(basename "$unit")"
+done
+
 echo "✅ Deployment finished successfully"